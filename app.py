@@ -1,7 +1,24 @@
-import csv
+import os
+import tempfile
+import time
 import tkinter as tk
 from tkinter import filedialog as fd
+from loader import load_blocks_table, load_machine
 from turing_machine import TuringMachine
+from worker import FRAMES_PER_SECOND, SimulationWorker
+
+CELL_WIDTH = 36  # Ancho en píxeles de una celda de la cinta
+CELL_HEIGHT = 32  # Alto en píxeles de una celda de la cinta
+TAPE_PADDING = 10  # Margen vertical alrededor de la cinta
+
+# Velocidades de avance automático en pasos por frame (None: todos los que entren en el frame)
+STANDARD_SPEED = 0.1  # Unos 3 pasos por segundo
+FAST_SPEED = 100
+VERY_FAST_SPEED = None
+
+SNAPSHOT_EXTENSION = ".tmsnap"  # Extensión sugerida para las fotos de la máquina
+HUD_INTERVAL = 0.5  # Segundos entre actualizaciones del panel de rendimiento
+HUD_TOP = 5  # Estados y bloques más usados que muestra el panel
 
 class TuringMachineGUI:
     def __init__(self):
@@ -25,9 +42,11 @@ class TuringMachineGUI:
         self.blocks = self.load_blocks("blocks.csv")
         self.halted = False
         self.auto_stepping = False  # Controla si el avance automático está activo
-        self.auto_speed = 5000  # Intervalo en milisegundos para el avance automático
+        self.worker = None  # SimulationWorker que ejecuta la máquina durante el avance automático
+        self.render_time = 0.0  # Segundos dibujando frames durante el avance automático
+        self.hud_sample = None  # (momento, pasos) de la última actualización del panel de rendimiento
+        self.trace_file = None  # Archivo temporal de la traza de esta sesión (se borra al cerrar)
 
-        self.tape_labels = []
         self.create_tape_display()
 
         # Crear un nuevo frame para los botones
@@ -38,6 +57,10 @@ class TuringMachineGUI:
         self.step_button = tk.Button(self.bottom_frame, text="Siguiente Paso", command=self.execute_step)
         self.step_button.grid(row=2, column=0, sticky="ew", pady=10)  # Expandirse horizontalmente
 
+        # Botón para retroceder (sólo con la traza activada)
+        self.back_button = tk.Button(self.bottom_frame, text="Paso Anterior", command=self.step_back)
+        self.back_button.grid(row=2, column=2, sticky="ew", pady=10)
+
         # Botón para avanzar automáticamente
         self.auto_button = tk.Button(self.bottom_frame, text="Avanzar Automáticamente", command=self.start_auto_step)
         self.auto_button.grid(row=2, column=1, sticky="ew", pady=10)
@@ -47,8 +70,8 @@ class TuringMachineGUI:
         self.fast_button.grid(row=2, column=3, sticky="ew", pady=10)
 
         # Botón para avanzar muy rápidamente
-        self.fast_button = tk.Button(self.bottom_frame, text="Avanzar Automáticamente Muy Rápido", command=self.start_very_fast_step)
-        self.fast_button.grid(row=2, column=4, sticky="ew", pady=10)
+        self.very_fast_button = tk.Button(self.bottom_frame, text="Avanzar Automáticamente Muy Rápido", command=self.start_very_fast_step)
+        self.very_fast_button.grid(row=2, column=4, sticky="ew", pady=10)
 
         # Crear un nuevo frame para el boton del CSV
         self.middle_frame = tk.Frame(self.root)
@@ -58,6 +81,25 @@ class TuringMachineGUI:
         self.load_csv_button = tk.Button(self.middle_frame, text="Cargar CSV de Transiciones", command=self.load_csv)
         self.load_csv_button.grid(row=1, column=0, pady=10, sticky="ew")
 
+        # Botones para guardar la configuración actual en una foto y para saltar a una foto guardada
+        self.save_snapshot_button = tk.Button(self.middle_frame, text="Guardar Foto", command=self.save_snapshot)
+        self.save_snapshot_button.grid(row=1, column=2, pady=10, padx=5, sticky="ew")
+        self.load_snapshot_button = tk.Button(self.middle_frame, text="Cargar Foto", command=self.load_snapshot)
+        self.load_snapshot_button.grid(row=1, column=3, pady=10, padx=5, sticky="ew")
+
+        # Casilla para registrar la traza de la ejecución y poder retroceder
+        self.trace_var = tk.BooleanVar(value=False)
+        self.trace_check = tk.Checkbutton(self.middle_frame, text="Registrar traza (permite retroceder)",
+                                          variable=self.trace_var, command=self.toggle_trace)
+        self.trace_check.grid(row=1, column=1, pady=10, padx=10, sticky="w")
+
+        # Casilla para mostrar el panel de rendimiento (mientras está activo el motor lleva contadores)
+        self.hud_var = tk.BooleanVar(value=False)
+        self.hud_check = tk.Checkbutton(self.middle_frame, text="Mostrar rendimiento",
+                                        variable=self.hud_var, command=self.toggle_hud)
+        self.hud_check.grid(row=1, column=4, pady=10, padx=10, sticky="w")
+        self.hud_label = tk.Label(self.root, font=("Courier", 11), justify="left", anchor="w")
+
         self.turing_machine.set_tape_update_callback(self.update_tape_visual)
 
     def load_csv(self):
@@ -67,15 +109,18 @@ class TuringMachineGUI:
             filetypes=[("Archivos CSV", "*.csv")]
         )
         if file_path:
+            self.stop_worker()
             try:
-                # Cargar datos desde el archivo CSV con validaciones
-                transitions, tape, initial_state, head_position = self.load_csv_as_dict(file_path)
+                # Cargar (o tomar de la caché) la máquina compilada, con validaciones
+                definition = load_machine(file_path, self.blocks)
+                transitions, tape, initial_state, head_position = definition.as_tuple()
 
                 # Sincronizar con la máquina de Turing
                 self.turing_machine.set_initial_state(initial_state)
-                self.turing_machine.set_tape(tape)
+                self.turing_machine.set_tape(tape, head_position)
                 self.turing_machine.set_transitions(transitions)
-                self.turing_machine.head_position = head_position
+                self.turing_machine.blocks = self.blocks
+                self.turing_machine.compiled = definition.compiled
 
                 # Actualizar el atributo local de la cinta
                 self.tape = tape
@@ -89,6 +134,7 @@ class TuringMachineGUI:
                 self.step_button.config(state="normal")
                 self.auto_button.config(state="normal")
                 self.fast_button.config(state="normal")
+                self.very_fast_button.config(state="normal")
                 self.state_label.config(text="Archivo cargado con éxito. ¡Listo para ejecutar!")
 
                 self.turing_machine.error = False
@@ -99,62 +145,46 @@ class TuringMachineGUI:
             except Exception as e:
                 self.state_label.config(text=f"Error inesperado: {str(e)}")
 
-    def load_csv_as_dict(self, filepath):
-        """Carga un archivo CSV como un diccionario y realiza validaciones."""
-        transitions = {}
-        tape = []  # Por defecto, cinta vacía
-        initial_state = None  # Estado inicial predeterminado
-        head_position = None  # Posición inicial del cabezal
-
-        with open(filepath, mode="r", newline="") as file:
-            reader = csv.reader(file)
-            for row_index, row in enumerate(reader):
-                # Validar la cinta inicial
-                if row[0] == "tape":
-                    tape = list(row[1]) if len(row) > 1 and row[1].strip() else []
-                    if not tape:
-                        raise ValueError(f"La cinta inicial en la línea {row_index + 1} está vacía.")
-
-                # Leer estado inicial
-                elif row[0] == "initial_state":
-                    if len(row) != 2 or not row[1].strip():
-                        raise ValueError(f"El estado inicial está mal definido en la línea {row_index + 1}.")
-                    initial_state = row[1].strip()
-
-                elif row[0] == "head_position":
-                    if len(row) != 2 or not row[1].isdigit():
-                        raise ValueError(f"La posición inicial del cabezal está mal definida en la línea {row_index + 1}.")
-                    head_position = int(row[1])
-                    # Validar que la posición sea válida
-                    if head_position < 0 or head_position >= len(tape):
-                        raise ValueError(f"La posición inicial del cabezal '{head_position}' está fuera de los límites de la cinta.")
-                    print("head_position: " + head_position.__str__())
-
-                # Validar transiciones
-                elif len(row) == 4:  # Debe tener exactamente 4 columnas
-                    key = (row[0], row[1])
-                    print("Key:" + key.__str__())
-                    value = (row[2], row[3])
-                    print("Value:" + value.__str__())
-                    transitions[key] = value
-                    if not row[0].strip() or not row[1].strip() or not row[2].strip() or not row[3].strip():
-                        raise ValueError(f"Estado o símbolo vacío en la línea {row_index + 1}.")
-
-                # Formato inválido
-                else:
-                    raise ValueError(f"Formato inválido en la línea {row_index + 1}: {row}")
-
-        # Validaciones finales
-        if not tape:
-            raise ValueError("No se encontró una línea de cinta ('tape') en el archivo CSV.")
-        if not initial_state:
-            raise ValueError("No se encontró el estado inicial ('initial_state') en el archivo CSV.")
-        if len(str(head_position)) == 0 or head_position == None:
-            raise ValueError("No se encontró la posición inicial del cabezal ('head_position') en el archivo CSV.")
-        if not transitions:
-            raise ValueError("No se encontró transiciones en el archivo CSV.")
-
-        return transitions, tape, initial_state, head_position
+    def save_snapshot(self):
+        """Guarda la configuración actual (estado, cinta, cabezal y pasos) en un archivo de foto."""
+        if not self.turing_machine.transitions:
+            self.state_label.config(text="Cargue un archivo CSV válido antes de guardar una foto.")
+            return
+        file_path = fd.asksaveasfilename(
+            title="Guardar foto de la máquina",
+            defaultextension=SNAPSHOT_EXTENSION,
+            filetypes=[("Fotos de la máquina", "*" + SNAPSHOT_EXTENSION)]
+        )
+        if file_path:
+            self.stop_worker()
+            try:
+                self.turing_machine.save_snapshot(file_path)
+                self.state_label.config(text=f"Foto guardada en el paso {self.turing_machine.steps}.")
+            except OSError as e:
+                self.state_label.config(text=f"Error al guardar la foto: {str(e)}")
+
+    def load_snapshot(self):
+        """Salta directamente a la configuración de una foto guardada (de la máquina cargada)."""
+        if not self.turing_machine.transitions:
+            self.state_label.config(text="Cargue el CSV de la máquina antes de cargar una foto.")
+            return
+        file_path = fd.askopenfilename(
+            title="Seleccionar foto de la máquina",
+            filetypes=[("Fotos de la máquina", "*" + SNAPSHOT_EXTENSION)]
+        )
+        if file_path:
+            self.stop_worker()
+            try:
+                self.turing_machine.load_snapshot(file_path)
+            except (OSError, ValueError) as e:
+                self.state_label.config(text=f"Error al cargar la foto: {str(e)}")
+                return
+            self.update_tape_visual(self.turing_machine.tape, self.turing_machine.head_position)
+            for button in (self.step_button, self.auto_button, self.fast_button, self.very_fast_button):
+                button.config(state="normal")
+            self.state_label.config(
+                text=f"Estado: {self.turing_machine.current_state}, Paso: {self.turing_machine.steps}"
+            )
 
     def update_ui_after_load(self):
         """Actualiza la interfaz después de cargar un archivo CSV."""
@@ -171,44 +201,33 @@ class TuringMachineGUI:
     def clear_tape_display(self):
         """Elimina la representación actual de la cinta y reorganiza el frame."""
         if hasattr(self, 'tape_frame'):
-            for label in self.tape_labels:
-                label.destroy()
-            self.tape_labels = []
             self.tape_frame.destroy()
 
     def create_tape_display(self):
-        """Crea o actualiza la representación visual de la cinta."""
+        """Crea la representación visual de la cinta: un canvas con sólo las celdas visibles."""
         # Crear un nuevo frame para la cinta
         self.tape_frame = tk.Frame(self.root)
         self.tape_frame.grid(row=0, column=0, sticky="nsew")  # Asegurar que ocupe toda la celda del grid
 
-        # Crear el canvas y la barra de desplazamiento
-        self.canvas = tk.Canvas(self.tape_frame, height=50)
-        self.scrollbar = tk.Scrollbar(self.tape_frame, orient="horizontal", command=self.canvas.xview)
-        self.canvas.configure(xscrollcommand=self.scrollbar.set)
+        # Crear el canvas y la barra de desplazamiento; el desplazamiento es virtual (ver scroll_tape)
+        self.canvas = tk.Canvas(self.tape_frame, height=CELL_HEIGHT + 2 * TAPE_PADDING, highlightthickness=0)
+        self.scrollbar = tk.Scrollbar(self.tape_frame, orient="horizontal", command=self.scroll_tape)
 
         self.scrollbar.pack(side="top", fill="x")
         self.canvas.pack(side="top", fill="both", expand=True)
 
-        # Crear un frame interno para la cinta
-        self.cinta_container = tk.Frame(self.canvas)
-        self.canvas.create_window((0, 0), window=self.cinta_container, anchor="nw")
-
-        # Crear etiquetas para cada elemento de la cinta
-        for i, symbol in enumerate(self.tape):
-            bg_color = "yellow" if i == self.head_position else "white"
-            label = tk.Label(self.cinta_container, text=symbol, font=("Arial", 16), width=2, borderwidth=2, relief="solid", bg=bg_color)
-            label.grid(row=0, column=i, padx=2, pady=10)
-            self.tape_labels.append(label)
+        # Conjunto fijo de celdas (rectángulo + texto) que se reutiliza al desplazarse
+        self.tape_cells = []
+        self.shown_cells = []  # Lo último dibujado en cada celda: (símbolo, resaltada)
+        self.view_start = 0  # Índice de la cinta que se muestra en la primera celda
+        self.visible_tape = self.tape
+        self.visible_head = self.head_position
+        self.canvas.bind("<Configure>", self.on_tape_resize)
 
         # Centrar la cinta en la ventana
         self.root.grid_columnconfigure(0, weight=1)
         self.root.grid_rowconfigure(0, weight=1)
 
-        # Actualizar el tamaño del canvas
-        self.cinta_container.update_idletasks()
-        self.canvas.config(scrollregion=self.canvas.bbox("all"))
-
         # Actualizar el texto del estado inicial
         if not hasattr(self, 'state_label'):
             self.state_label = tk.Label(self.root, text=f"Estado: {self.current_state}", font=("Arial", 14), anchor="center")
@@ -216,158 +235,269 @@ class TuringMachineGUI:
         else:
             self.state_label.config(text=f"Estado: {self.current_state}")
 
+    def on_tape_resize(self, event):
+        """Ajusta la cantidad de celdas dibujadas al ancho del canvas."""
+        needed = event.width // CELL_WIDTH + 1
+        while len(self.tape_cells) < needed:
+            x = len(self.tape_cells) * CELL_WIDTH + 2
+            rect = self.canvas.create_rectangle(x, TAPE_PADDING, x + CELL_WIDTH - 4, TAPE_PADDING + CELL_HEIGHT,
+                                                width=2, fill="white", state="hidden")
+            text = self.canvas.create_text(x + (CELL_WIDTH - 4) // 2, TAPE_PADDING + CELL_HEIGHT // 2,
+                                           font=("Arial", 16), state="hidden")
+            self.tape_cells.append((rect, text))
+            self.shown_cells.append(None)
+        while len(self.tape_cells) > needed:
+            for item in self.tape_cells.pop():
+                self.canvas.delete(item)
+            self.shown_cells.pop()
+        self.update_tape_visual(self.visible_tape, self.visible_head)
+
+    def scroll_tape(self, action, amount, unit=None):
+        """Recibe los comandos de la barra de desplazamiento y mueve la ventana visible."""
+        length = len(self.visible_tape)
+        if action == "moveto":
+            self.view_start = int(float(amount) * length)
+        elif unit == "pages":
+            self.view_start += int(amount) * max(len(self.tape_cells) - 1, 1)
+        else:
+            self.view_start += int(amount)
+        self.view_start = max(0, min(self.view_start, length - 1))
+        self.draw_tape_window()
+
+    def draw_tape_window(self):
+        """Dibuja sólo las celdas visibles y sólo toca las que cambiaron desde el último dibujo."""
+        tape = self.visible_tape
+        count = len(self.tape_cells)
+        window = tape[self.view_start:self.view_start + count]
+        for i, (rect, text) in enumerate(self.tape_cells):
+            symbol = window[i] if i < len(window) else None
+            highlighted = self.view_start + i == self.visible_head
+            if self.shown_cells[i] == (symbol, highlighted):
+                continue
+            self.shown_cells[i] = (symbol, highlighted)
+            if symbol is None:
+                self.canvas.itemconfigure(rect, state="hidden")
+                self.canvas.itemconfigure(text, state="hidden")
+            else:
+                self.canvas.itemconfigure(rect, state="normal", fill="yellow" if highlighted else "white")
+                self.canvas.itemconfigure(text, state="normal", text=symbol)
+
+        length = len(tape)
+        if length:
+            self.scrollbar.set(self.view_start / length, min((self.view_start + count) / length, 1.0))
+        else:
+            self.scrollbar.set(0.0, 1.0)
+
     def execute_step(self, stop_automation=True):
         """Ejecuta un paso de la máquina de Turing y detiene la automatización si se indica."""
         # Detener el avance automático si está activo
         if stop_automation and self.auto_stepping:
-            print("Automatización detenida por el botón 'Siguiente Paso'.")  # Depuración
-            self.auto_stepping = False
+            self.stop_worker()
 
         if not self.turing_machine.transitions or not self.turing_machine.tape:
             self.state_label.config(text="Cargue un archivo CSV válido antes de continuar.")
             return
 
-        block = self.turing_machine.get_next_block()
+        machine = self.turing_machine
+        block = None
+        if machine.current_state != "halt" and 0 <= machine.head_position < len(machine.tape):
+            transition = machine.transitions.get((machine.current_state, machine.tape[machine.head_position]))
+            block = transition[0] if transition else None
         if block:
-            # Ejecutar el bloque
-            self.turing_machine.execute_block(block)
+            # Ejecutar el bloque con el motor (así queda en la traza si está activada)
+            result = self.turing_machine.run(max_steps=1, accelerate=False)
             self.update_tape_visual(self.turing_machine.tape, self.turing_machine.head_position)
 
-            # Verificar si la máquina llegó al estado de pausa
-            if self.turing_machine.errorMensage == "La automatización se pausó por un estado nombrado 'pause'.":
-                self.state_label.config(text=self.turing_machine.errorMensage)
+            # Verificar si la máquina llegó a un estado de pausa o a un punto de parada
+            if result.status in ("pause", "breakpoint"):
+                self.state_label.config(text=result.message)
                 self.auto_stepping = False
-                print("La automatización se pausó correctamente.")  # Depuración
             else:
                 if self.turing_machine.current_state == "halt":
                     self.state_label.config(
                         text=f"Estado: {self.turing_machine.current_state}, Bloque: {block}. La máquina se ha detenido."
                     )
                     self.auto_stepping = False
-                    self.step_button.config(state="disabled")
-                    self.auto_button.config(state="disabled")
-                    self.fast_button.config(state="disabled")
+                    self.disable_run_buttons()
                 else:
                     self.state_label.config(text=f"Estado: {self.turing_machine.current_state}, Bloque: {block}")
         else:
-            self.state_label.config(text=f"No hay transición definida para el estado actual.")
-            self.auto_stepping = False
-
-    def ensure_infinite_tape(self):
-        """Asegura que la cinta sea infinita al expandir con espacios vacíos según sea necesario."""
-        if self.head_position < 0:
-            # Agregar un espacio vacío al inicio de la cinta
-            self.tape.insert(0, "_")
-            self.head_position = 0
-
-            # Crear una nueva etiqueta para el espacio vacío
-            label = tk.Label(self.tape_frame, text="_", font=("Arial", 16), width=2, borderwidth=2, relief="solid")
-            self.tape_labels.insert(0, label)
-
-            # Reubicar todas las etiquetas existentes
-            for i, lbl in enumerate(self.tape_labels):
-                lbl.grid(row=0, column=i, padx=2, pady=10)
+            self.show_no_transition()
+
+    def show_no_transition(self):
+        self.state_label.config(text="No hay transición definida para el estado actual.")
+        self.auto_stepping = False
+
+    def toggle_trace(self):
+        """Activa o desactiva el registro de la traza (se empieza a grabar desde el paso actual)."""
+        self.stop_worker()
+        if self.trace_var.get():
+            if self.trace_file is None:
+                # Un archivo propio por sesión: dos ventanas no se pisan la traza
+                descriptor, self.trace_file = tempfile.mkstemp(prefix="turing_trace_", suffix=".bin")
+                os.close(descriptor)
+            self.turing_machine.start_trace(self.trace_file)
+        else:
+            self.turing_machine.stop_trace()
+            self.remove_trace_file()
+
+    def remove_trace_file(self):
+        if self.trace_file is not None:
+            os.remove(self.trace_file)
+            self.trace_file = None
+
+    def step_back(self):
+        """Vuelve un paso atrás usando la traza registrada."""
+        self.stop_worker()
+        if self.turing_machine.trace_options is None:
+            self.state_label.config(text="Active 'Registrar traza' para poder retroceder.")
+            return
+        if not self.turing_machine.step_back():
+            self.state_label.config(text="No hay pasos registrados para deshacer.")
+            return
+        self.update_tape_visual(self.turing_machine.tape, self.turing_machine.head_position)
+        for button in (self.step_button, self.auto_button, self.fast_button, self.very_fast_button):
+            button.config(state="normal")
+        self.state_label.config(
+            text=f"Estado: {self.turing_machine.current_state}, Paso: {self.turing_machine.tracer.steps}"
+        )
 
-        elif self.head_position >= len(self.tape):
-            # Agregar un espacio vacío al final de la cinta
-            self.tape.append("_")
-            label = tk.Label(self.tape_frame, text="_", font=("Arial", 16), width=2, borderwidth=2, relief="solid")
-            label.grid(row=0, column=len(self.tape_labels), padx=2, pady=10)
-            self.tape_labels.append(label)
+    def toggle_hud(self):
+        """Muestra u oculta el panel de rendimiento; el perfil del motor sólo corre mientras se muestra."""
+        if self.hud_var.get():
+            self.hud_label.grid(row=4, column=0, sticky="ew", padx=10, pady=(0, 10))
+            self.hud_sample = None
+            if self.worker is not None:
+                self.update_hud(self.worker.snapshot)
+        else:
+            self.hud_label.grid_remove()
+        if self.worker is not None:
+            self.worker.profile = self.hud_var.get()
+
+    def update_hud(self, snapshot, force=False):
+        """Actualiza el panel de rendimiento con los contadores del worker y del perfil del motor.
+
+        Se llama en cada frame pero sólo redibuja cada HUD_INTERVAL segundos (salvo con force);
+        los pasos por segundo se miden entre dos actualizaciones.
+        """
+        now = time.perf_counter()
+        if not force and self.hud_sample is not None and now - self.hud_sample[0] < HUD_INTERVAL:
+            return
+        rate = 0.0
+        if self.hud_sample is not None and now > self.hud_sample[0]:
+            rate = max(snapshot.steps - self.hud_sample[1], 0) / (now - self.hud_sample[0])
+        self.hud_sample = (now, snapshot.steps)
+        lines = [
+            f"Pasos/seg: {rate:,.0f}   Pasos totales: {self.turing_machine.steps:,}   "
+            f"Cinta: {snapshot.tape_length:,} celdas ({snapshot.tape_memory:,} bytes en memoria)",
+            f"Tiempo en el motor: {snapshot.engine_time:.2f} s   Tiempo dibujando: {self.render_time:.2f} s",
+        ]
+        profiler = self.turing_machine.profiler
+        if profiler is not None:
+            states = list(profiler.state_hits().items())[:HUD_TOP]
+            blocks = list(profiler.block_hits().items())[:HUD_TOP]
+            lines.append("Estados más usados: " + ", ".join(f"{name} ({hits:,})" for name, hits in states if hits))
+            lines.append("Bloques más usados: " + ", ".join(f"{name} ({hits:,})" for name, hits in blocks if hits))
+            lines.append(f"Celdas recorridas por R_/L_: {profiler.seek_right_travel + profiler.seek_left_travel:,}   "
+                         f"Celdas corridas por S_l/S_r: {profiler.shifted_cells:,}")
+        self.hud_label.config(text="\n".join(lines))
 
     def update_tape_visual(self, tape, head_position):
-        """Actualiza la cinta visual en la interfaz."""
-        # Limpiar etiquetas actuales
-        for label in self.tape_labels:
-            label.destroy()
-        self.tape_labels = []
-
-        # Crear etiquetas para la cinta actualizada
-        for i, symbol in enumerate(tape):
-            bg_color = "yellow" if i == head_position else "white"
-            label = tk.Label(self.cinta_container, text=symbol, font=("Arial", 16), width=2, borderwidth=2, relief="solid", bg=bg_color)
-            label.grid(row=0, column=i, padx=2, pady=2)
-            self.tape_labels.append(label)
-
-        # Actualizar el tamaño del canvas
-        self.cinta_container.update_idletasks()
-        self.canvas.config(scrollregion=self.canvas.bbox("all"))
+        """Actualiza la cinta visual en la interfaz, desplazando la vista para seguir al cabezal."""
+        self.visible_tape = tape
+        self.visible_head = head_position
+        count = len(self.tape_cells)
+        if count and not self.view_start <= head_position < self.view_start + count - 1:
+            self.view_start = max(0, head_position - count // 2)
+        self.draw_tape_window()
 
     def update_head_position(self):
         """Destaca la posición del cabezal en la cinta."""
-        for i, label in enumerate(self.tape_labels):
-            if i == self.head_position:
-                label.config(bg="yellow")
-            else:
-                label.config(bg="white")
+        self.update_tape_visual(self.visible_tape, self.head_position)
 
     def load_blocks(self, filepath):
-        blocks = {}
-        with open(filepath, mode="r", newline="") as file:
-            reader = csv.reader(file)
-            for row in reader:
-                blocks[row[0]] = row[1]
-        return blocks
+        return load_blocks_table(filepath)
     
     def start_auto_step(self):
         """Inicia el avance automático con velocidad estándar."""
-        if self.auto_stepping:
-            print("La automatización ya está activa. Ajustando velocidad a estándar.")  # Depuración
-            self.auto_speed = 300  # Ajustar a velocidad estándar
-        else:
-            print("Iniciando avance automático estándar.")  # Depuración
-            self.turing_machine.errorMensage = ""  # Limpiar cualquier mensaje de error previo
-            self.auto_stepping = True
-            self.auto_speed = 300  # Velocidad estándar
-            self.perform_auto_step()
+        self.start_worker(STANDARD_SPEED)
 
     def start_fast_step(self):
         """Inicia el avance automático con velocidad rápida."""
-        if self.auto_stepping:
-            print("La automatización ya está activa. Ajustando velocidad a rápida.")  # Depuración
-            self.auto_speed = 100  # Ajustar a velocidad rápida
-        else:
-            print("Iniciando avance rápido.")  # Depuración
-            self.turing_machine.errorMensage = ""  # Limpiar cualquier mensaje de error previo
-            self.auto_stepping = True
-            self.auto_speed = 100  # Velocidad rápida
-            self.perform_auto_step()
+        self.start_worker(FAST_SPEED)
 
     def start_very_fast_step(self):
-        """Inicia el avance automático con velocidad rápida."""
-        if self.auto_stepping:
-            print("La automatización ya está activa. Ajustando velocidad a rápida.")  # Depuración
-            self.auto_speed = 5  # Ajustar a velocidad rápida
-        else:
-            print("Iniciando avance rápido.")  # Depuración
-            self.turing_machine.errorMensage = ""  # Limpiar cualquier mensaje de error previo
-            self.auto_stepping = True
-            self.auto_speed = 5  # Velocidad rápida
-            self.perform_auto_step()
+        """Inicia el avance automático tan rápido como pueda el motor."""
+        self.start_worker(VERY_FAST_SPEED)
 
-    def perform_auto_step(self):
-        """Ejecuta pasos automáticamente mientras esté activo."""
+    def start_worker(self, steps_per_frame):
+        """Arranca el motor en segundo plano (o sólo cambia su velocidad si ya está corriendo)."""
         if self.auto_stepping:
-            print("Ejecutando paso automático...")  # Depuración
-            self.execute_step(stop_automation=False)  # No detener la automatización
+            self.worker.steps_per_frame = steps_per_frame
+            return
+        if not self.turing_machine.transitions or not self.turing_machine.tape:
+            self.state_label.config(text="Cargue un archivo CSV válido antes de continuar.")
+            return
+        self.turing_machine.errorMensage = ""  # Limpiar cualquier mensaje de error previo
+        self.auto_stepping = True
+        self.render_time = 0.0
+        self.hud_sample = None
+        self.worker = SimulationWorker(self.turing_machine, steps_per_frame, profile=self.hud_var.get())
+        self.worker.start()
+        self.perform_auto_step()
+
+    def stop_worker(self):
+        """Detiene el motor en segundo plano y muestra la cinta completa donde quedó."""
+        if self.worker is not None:
+            self.worker.stop()
+            self.worker = None
+        if self.auto_stepping:
+            self.auto_stepping = False
+            self.update_tape_visual(self.turing_machine.tape, self.turing_machine.head_position)
 
-            # Verifica si la automatización debe pausarse
-            if self.turing_machine.errorMensage == "La automatización se pausó por un estado nombrado 'pause'.":
-                print("La automatización fue pausada.")  # Depuración
-                self.auto_stepping = False
-                return
+    def disable_run_buttons(self):
+        self.step_button.config(state="disabled")
+        self.auto_button.config(state="disabled")
+        self.fast_button.config(state="disabled")
+        self.very_fast_button.config(state="disabled")
 
-            if self.turing_machine.current_state == "halt":
-                print("La máquina se ha detenido.")  # Depuración
-                self.auto_stepping = False
-                self.auto_button.config(state="disabled")
-                self.fast_button.config(state="disabled")
-            else:
-                # Programa el siguiente paso si no está en halt
-                self.root.after(self.auto_speed, self.perform_auto_step)
+    def perform_auto_step(self):
+        """Dibuja la última foto publicada por el motor, a razón de un frame por llamada."""
+        if not self.auto_stepping:
+            return
+        snapshot = self.worker.snapshot
+        start = time.perf_counter()
+        self.update_tape_visual(snapshot, snapshot.head_position)
+        self.state_label.config(text=f"Estado: {snapshot.state}, Pasos: {snapshot.steps}")
+        self.render_time += time.perf_counter() - start
+        if self.hud_var.get():
+            self.update_hud(snapshot, force=snapshot.status is not None)
+        if snapshot.status is None:
+            self.root.after(1000 // FRAMES_PER_SECOND, self.perform_auto_step)
+            return
+
+        # El motor terminó: la cinta ya no cambia y se puede mostrar completa
+        self.stop_worker()
+        if snapshot.status in ("pause", "breakpoint", "endless"):
+            self.state_label.config(text=snapshot.message)
+        elif snapshot.status == "no_transition":
+            self.show_no_transition()
+        elif snapshot.status == "halt":
+            text = f"Estado: {snapshot.state}, Pasos: {snapshot.steps}. La máquina se ha detenido."
+            if snapshot.message:
+                text += f" {snapshot.message}"
+            self.state_label.config(text=text)
+            self.disable_run_buttons()
 
     def run(self):
-        self.root.mainloop()
+        try:
+            self.root.mainloop()
+        finally:
+            # La ventana ya no existe: sólo se detiene el motor y se borra la traza
+            if self.worker is not None:
+                self.worker.stop()
+            self.turing_machine.stop_trace()
+            self.remove_trace_file()
 
 # Crear la GUI
 gui = TuringMachineGUI()
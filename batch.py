@@ -0,0 +1,286 @@
+import argparse
+import json
+import multiprocessing
+import os
+import signal
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from cli import build_machine
+from loader import check_head_position, load_machine
+
+SLICE = 0.25  # Segundos que corre un trabajo antes de revisar si se pidió cancelar
+MIN_SLICE = 0.001  # Tramo más corto: con 0 segundos run vuelve sin dar ningún paso
+
+_cancel_event = None  # Evento compartido con el proceso padre (ver _init_worker)
+_loaded = {}  # Caché por proceso: ruta -> (fecha de modificación, MachineDefinition)
+
+
+def ignore_interrupt():
+    # Ctrl+C lo maneja el proceso padre (cancelando el lote o los trabajos); los trabajadores no deben morir a medias
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+
+
+def _init_worker(cancel_event):
+    global _cancel_event
+    _cancel_event = cancel_event
+    ignore_interrupt()
+
+
+def _cancel_requested():
+    return _cancel_event is not None and _cancel_event.is_set()
+
+
+def load_job_machine(job):
+    """Crea la TuringMachine de un trabajo.
+
+    La máquina compilada sale de la caché en disco de load_machine (ningún proceso vuelve a
+    parsear un CSV ya visto) y además se guarda en memoria para los trabajos siguientes.
+    """
+    filepath = job["csv"]
+    mtime = os.path.getmtime(filepath)
+    cached = _loaded.get(filepath)
+    if cached is None or cached[0] != mtime:
+        cached = (mtime, load_machine(filepath))
+        _loaded[filepath] = cached
+    return build_machine(filepath, job.get("tape"), job.get("head"), cached[1])
+
+
+def run_sliced(machine, start, max_steps=None, time_budget=None, cancelled=None, progress=None, report=None,
+               **options):
+    """Ejecuta machine.run en tramos de a lo sumo SLICE segundos; devuelve los campos del resultado como dict.
+
+    El tiempo límite se cuenta desde 'start' (perf_counter). Entre tramos se consulta
+    cancelled() y, si devuelve verdadero, el estado es "cancelled". Con 'progress' (segundos)
+    se llama a report(pasos, segundos transcurridos) cada vez que se cumple ese intervalo.
+    """
+    next_progress = start + progress if progress is not None else None
+    steps = 0
+    while True:
+        remaining_steps = max_steps - steps if max_steps is not None else None
+        budget = SLICE
+        if time_budget is not None:
+            budget = min(budget, time_budget - (time.perf_counter() - start))
+        if next_progress is not None:
+            budget = min(budget, next_progress - time.perf_counter())
+        result = machine.run(max_steps=remaining_steps, time_budget=max(budget, MIN_SLICE), **options)
+        steps += result.steps
+        status = result.status
+        if status != "time_budget":
+            break
+        now = time.perf_counter()
+        if time_budget is not None and now - start >= time_budget:
+            break
+        if cancelled is not None and cancelled():
+            status = "cancelled"
+            break
+        if next_progress is not None and now >= next_progress:
+            next_progress = now + progress
+            report(steps, now - start)
+
+    output = {"status": status, "state": result.state, "tape": result.tape, "head_position": result.head_position,
+              "steps": steps, "message": result.message, "wall_time": time.perf_counter() - start}
+    if result.cycle is not None:
+        output["cycle"] = result.cycle
+    return output
+
+
+def run_job(job, max_steps=None, time_budget=None, stop_on_pause=True, accelerate=True, detect_cycles=False):
+    """Ejecuta un trabajo {"id", "csv", "tape"?, "head"?} y devuelve su resultado como dict.
+
+    La ejecución se hace en tramos (ver run_sliced) para respetar el tiempo límite y la
+    cancelación sin perder la cuenta de pasos.
+    """
+    if _cancel_requested():
+        return cancelled_result(job)
+    start = time.perf_counter()
+    output = {"id": job["id"], "csv": job["csv"]}
+    try:
+        machine = load_job_machine(job)
+    except (OSError, ValueError) as e:
+        output.update(status="load_error", message=str(e), wall_time=time.perf_counter() - start)
+        return output
+
+    output.update(run_sliced(machine, start, max_steps, time_budget, _cancel_requested, stop_on_pause=stop_on_pause,
+                             accelerate=accelerate, detect_cycles=detect_cycles))
+    return output
+
+
+def run_chunk(jobs, options):
+    return [run_job(job, **options) for job in jobs]
+
+
+class BatchRunner:
+    """Reparte trabajos en un pool de procesos y entrega los resultados a medida que terminan.
+
+    Nunca importa la interfaz gráfica, así que puede usarse en servidores sin pantalla.
+    cancel() descarta los trabajos pendientes y corta los que están corriendo en el próximo
+    tramo; todos igual aparecen en los resultados con estado "cancelled".
+    """
+
+    def __init__(self, jobs, processes=None, chunk_size=1, max_steps=None, time_budget=None, stop_on_pause=True,
+                 accelerate=True, detect_cycles=False):
+        self.jobs = list(jobs)
+        self.processes = processes
+        self.chunk_size = max(chunk_size, 1)
+        self.options = {"max_steps": max_steps, "time_budget": time_budget, "stop_on_pause": stop_on_pause,
+                        "accelerate": accelerate, "detect_cycles": detect_cycles}
+        self._cancel_event = multiprocessing.Event()
+
+    def cancel(self):
+        self._cancel_event.set()
+
+    @property
+    def cancelled(self):
+        return self._cancel_event.is_set()
+
+    def results(self):
+        """Generador de resultados (dicts) en orden de finalización."""
+        with ProcessPoolExecutor(self.processes, initializer=_init_worker, initargs=(self._cancel_event,)) as pool:
+            futures = {}
+            for begin in range(0, len(self.jobs), self.chunk_size):
+                chunk = self.jobs[begin:begin + self.chunk_size]
+                futures[pool.submit(run_chunk, chunk, self.options)] = chunk
+            pending = set(futures)
+            while pending:
+                try:
+                    for future in as_completed(pending):
+                        pending.discard(future)
+                        yield from future.result()
+                        if self.cancelled:
+                            break
+                except KeyboardInterrupt:
+                    self.cancel()
+                if self.cancelled:
+                    # Los que todavía no arrancaron se descartan; los que corren cortan en su próximo tramo
+                    for future in list(pending):
+                        if future.cancel():
+                            pending.discard(future)
+                            for job in futures[future]:
+                                yield cancelled_result(job)
+
+
+def cancelled_result(job):
+    return {"id": job["id"], "csv": job["csv"], "status": "cancelled", "steps": 0}
+
+
+def tape_jobs(filepath, tapes, head=None):
+    """Un trabajo por cinta de entrada, todos sobre la misma máquina."""
+    return [{"id": index, "csv": filepath, "tape": tape, "head": head} for index, tape in enumerate(tapes)]
+
+
+def csv_jobs(paths):
+    """Un trabajo por archivo CSV; los directorios se expanden a sus *.csv (menos blocks.csv)."""
+    files = []
+    for path in paths:
+        if os.path.isdir(path):
+            files.extend(os.path.join(path, name) for name in sorted(os.listdir(path))
+                         if name.lower().endswith(".csv") and name != "blocks.csv")
+        else:
+            files.append(path)
+    return [{"id": index, "csv": filepath} for index, filepath in enumerate(files)]
+
+
+def read_tapes(filepath):
+    """Lee una cinta por línea (ignora líneas vacías); '-' es la entrada estándar."""
+    file = sys.stdin if filepath == "-" else open(filepath, mode="r")
+    try:
+        return [line.strip() for line in file if line.strip()]
+    finally:
+        if file is not sys.stdin:
+            file.close()
+
+
+def run_lockstep_jobs(jobs, args):
+    """Variante de --tapes que corre todas las cintas en un solo proceso con lockstep.run_lockstep.
+
+    Una cinta o un cabezal inválidos dan un registro "load_error" para ese trabajo, como en el
+    pool; el resto de las cintas se ejecuta igual.
+    """
+    from lockstep import run_lockstep  # Importa NumPy sólo si se pidió este motor
+    try:
+        definition = load_machine(jobs[0]["csv"]) if jobs else None
+    except (OSError, ValueError) as e:
+        print(f"Error al cargar archivo: {e}", file=sys.stderr)
+        return 2
+    records = {}
+    valid = []
+    if definition is not None:
+        head = args.head if args.head is not None else definition.head_position
+        for job in jobs:
+            try:
+                check_head_position(head, job["tape"])
+                for symbol in job["tape"]:
+                    definition.compiled.symbol_id(symbol)
+            except ValueError as e:
+                records[job["id"]] = {"id": job["id"], "csv": job["csv"], "status": "load_error", "message": str(e),
+                                      "wall_time": 0.0}
+            else:
+                valid.append(job)
+        results = run_lockstep(definition.compiled, [job["tape"] for job in valid], head, definition.initial_state,
+                               args.max_steps, stop_on_pause=not args.no_pause, time_budget=args.time_budget)
+        for job, result in zip(valid, results):
+            records[job["id"]] = {"id": job["id"], "csv": job["csv"], "status": result.status, "state": result.state,
+                                  "tape": result.tape, "head_position": result.head_position, "steps": result.steps,
+                                  "message": result.message, "wall_time": result.elapsed}
+    output = open(args.output, mode="w") if args.output is not None else sys.stdout
+    try:
+        for job in jobs:
+            output.write(json.dumps(records[job["id"]], ensure_ascii=False) + "\n")
+    finally:
+        if output is not sys.stdout:
+            output.close()
+    return 0
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Ejecuta lotes de máquinas de Turing en paralelo (salida JSONL).")
+    parser.add_argument("paths", nargs="+", help="Archivos CSV o directorios con máquinas")
+    parser.add_argument("--tapes", metavar="ARCHIVO", default=None,
+                        help="Cintas de entrada, una por línea ('-' para stdin); requiere un único CSV")
+    parser.add_argument("--head", type=int, default=None, help="Posición inicial del cabezal para --tapes")
+    parser.add_argument("--processes", type=int, default=None, help="Procesos del pool (por defecto, uno por núcleo)")
+    parser.add_argument("--chunk-size", type=int, default=1, help="Trabajos enviados juntos a cada proceso")
+    parser.add_argument("--max-steps", type=int, default=None, help="Cantidad máxima de pasos por trabajo")
+    parser.add_argument("--time-budget", type=float, default=None, help="Tiempo máximo en segundos por trabajo")
+    parser.add_argument("--no-pause", action="store_true", help="No detenerse en estados 'pause'")
+    parser.add_argument("--no-accelerate", action="store_true",
+                        help="Ejecutar paso a paso los bucles L/R sobre un mismo estado")
+    parser.add_argument("--detect-cycles", action="store_true",
+                        help="Detenerse si una configuración se repite (la máquina no termina)")
+    parser.add_argument("--lockstep", action="store_true",
+                        help="Con --tapes, ejecutar todas las cintas juntas con el motor vectorizado (requiere NumPy; "
+                             "--time-budget vale para cada cinta)")
+    parser.add_argument("--output", metavar="ARCHIVO", default=None, help="Archivo JSONL de salida (por defecto stdout)")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    if args.tapes is not None:
+        if len(args.paths) != 1 or os.path.isdir(args.paths[0]):
+            print("Error: --tapes requiere un único archivo CSV.", file=sys.stderr)
+            return 2
+        jobs = tape_jobs(args.paths[0], read_tapes(args.tapes), args.head)
+        if args.lockstep:
+            return run_lockstep_jobs(jobs, args)
+    else:
+        jobs = csv_jobs(args.paths)
+
+    runner = BatchRunner(jobs, args.processes, args.chunk_size, args.max_steps, args.time_budget,
+                         stop_on_pause=not args.no_pause, accelerate=not args.no_accelerate,
+                         detect_cycles=args.detect_cycles)
+    output = open(args.output, mode="w") if args.output is not None else sys.stdout
+    try:
+        # Con Ctrl+C el lote se cancela pero se sigue informando cada trabajo
+        for result in runner.results():
+            output.write(json.dumps(result, ensure_ascii=False) + "\n")
+            output.flush()
+    finally:
+        if output is not sys.stdout:
+            output.close()
+    return 130 if runner.cancelled else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
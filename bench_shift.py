@@ -0,0 +1,60 @@
+import argparse
+import time
+from turing_machine import TuringMachine
+
+
+def legacy_shift(tape, head, block):
+    """Implementación anterior de S_l / S_r sobre una lista, copiando celda por celda."""
+    if block == "S_l":
+        for i in range(head, len(tape) - 1):
+            tape[i] = tape[i + 1]
+        tape.pop()
+        if head >= len(tape):
+            tape.append("_")
+    else:
+        for i in range(head, 0, -1):
+            tape[i] = tape[i - 1]
+        tape.pop(0)
+        head -= 1
+        if head < 0:
+            tape.insert(0, "_")
+            head = 0
+    return head
+
+
+def time_legacy(length, block, shifts):
+    tape = ["1"] * length
+    head = length // 2
+    start = time.perf_counter()
+    for _ in range(shifts):
+        head = legacy_shift(tape, head, block)
+    return time.perf_counter() - start
+
+
+def time_engine(length, block, shifts):
+    machine = TuringMachine()
+    machine.set_transitions({("s0", "1"): (block, "s0")})
+    machine.set_initial_state("s0")
+    machine.set_tape(["1"] * length)
+    machine.head_position = length // 2
+    machine.compile()
+    result = machine.run(max_steps=shifts)
+    return result.elapsed
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Costo de S_l / S_r según el largo de la cinta.")
+    parser.add_argument("--shifts", type=int, default=200, help="Desplazamientos por medición")
+    parser.add_argument("--lengths", type=int, nargs="+", default=[1_000, 10_000, 100_000, 1_000_000])
+    args = parser.parse_args(argv)
+
+    print(f"{'bloque':>6} {'largo':>10} {'antes (us)':>12} {'después (us)':>13} {'mejora':>8}")
+    for block in ("S_l", "S_r"):
+        for length in args.lengths:
+            before = time_legacy(length, block, args.shifts) / args.shifts * 1e6
+            after = time_engine(length, block, args.shifts) / args.shifts * 1e6
+            print(f"{block:>6} {length:>10} {before:>12.2f} {after:>13.2f} {before / after:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
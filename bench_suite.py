@@ -0,0 +1,193 @@
+import argparse
+import json
+import math
+import os
+import platform
+import random
+import sys
+import tracemalloc
+from cli import build_machine
+from turing_machine import TuringMachine
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+SEED = 2024  # Semilla fija para que las cintas generadas sean siempre las mismas
+MIN_TIME = 0.1  # Segundos mínimos por repetición: las corridas cortas se repiten y se promedian
+
+
+def binary_tape(size, rng):
+    """Cinta '#<n bits>#<n bits>#' para transitions2.csv (números sin ceros a la izquierda)."""
+    first = "1" + "".join(rng.choice("01") for _ in range(size - 1))
+    second = "1" + "".join(rng.choice("01") for _ in range(size - 1))
+    return f"#{first}#{second}#"
+
+
+def synthetic_machine(transitions, tape, head_position):
+    machine = TuringMachine()
+    machine.set_transitions(transitions)
+    machine.set_initial_state("s0")
+    machine.set_tape(list(tape))
+    machine.head_position = head_position
+    return machine
+
+
+def comparison_case(size, rng):
+    """transitions2.csv hasta su primera pausa."""
+    return build_machine(os.path.join(HERE, "transitions2.csv"), binary_tape(size, rng), 0), None
+
+
+def scan_case(size, rng):
+    """transitions1.csv sobre una entrada 'ABAB...' de 2*size símbolos, hasta 'halt'."""
+    return build_machine(os.path.join(HERE, "transitions1.csv"), "AB" * size, 0), None
+
+
+def seek_case(size, rng):
+    """R_# / L_# rebotando entre los dos extremos de una cinta de 'size' celdas."""
+    transitions = {("s0", "#"): ("R_#", "s1"), ("s1", "#"): ("L_#", "s0")}
+    return synthetic_machine(transitions, "#" + "1" * size + "#", 0), 2000
+
+
+def shift_case(size, rng):
+    """S_l / S_r alternados con el cabezal en el medio de la cinta (cada paso la acorta una celda)."""
+    transitions = {("s0", "1"): ("S_l", "s1"), ("s1", "1"): ("S_r", "s0")}
+    return synthetic_machine(transitions, "1" * size, size // 2), 500
+
+
+def left_growth_case(size, rng):
+    """Escribe y busca un vacío a la izquierda: la cinta crece una celda por la izquierda cada dos pasos."""
+    transitions = {("s0", "_"): ("X1", "s1"), ("s1", "1"): ("L__", "s0")}
+    return synthetic_machine(transitions, "_", 0), 2 * size
+
+
+# nombre -> (constructor, tamaños); el constructor devuelve (máquina, pasos máximos o None)
+CASES = {
+    "comparison": (comparison_case, [32, 64, 128, 256, 512]),
+    "scan": (scan_case, [250, 500, 1000, 2000]),
+    "seek": (seek_case, [1_000, 10_000, 100_000, 1_000_000]),
+    "shift": (shift_case, [10_000, 100_000, 1_000_000, 4_000_000]),
+    "left_growth": (left_growth_case, [1_000, 2_000, 4_000, 8_000]),
+}
+
+
+def measure(case, size, repeat):
+    """Mejor tiempo de 'repeat' repeticiones y pico de memoria (en una pasada aparte con tracemalloc).
+
+    Cada repetición ejecuta el caso las veces necesarias para sumar MIN_TIME y promedia, así
+    los casos de pocos milisegundos no quedan dominados por el ruido.
+    """
+    build, _ = CASES[case]
+    best = None
+    for _ in range(repeat):
+        total = 0.0
+        runs = 0
+        while total < MIN_TIME:
+            machine, max_steps = build(size, random.Random(SEED))
+            machine.compile()
+            result = machine.run(max_steps=max_steps)
+            total += result.elapsed
+            runs += 1
+        if best is None or total / runs < best:
+            best = total / runs
+    machine, max_steps = build(size, random.Random(SEED))
+    machine.compile()
+    tracemalloc.start()
+    machine.run(max_steps=max_steps)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {
+        "size": size,
+        "status": result.status,
+        "steps": result.steps,
+        "time": best,
+        "steps_per_second": result.steps / best if best > 0 else None,
+        "peak_memory": peak,
+    }
+
+
+def scaling_exponent(rows):
+    """Pendiente por mínimos cuadrados de log(tiempo) contra log(tamaño)."""
+    points = [(math.log(row["size"]), math.log(row["time"])) for row in rows if row["time"] > 0]
+    if len(points) < 2:
+        return None
+    mean_x = sum(x for x, _ in points) / len(points)
+    mean_y = sum(y for _, y in points) / len(points)
+    spread = sum((x - mean_x) ** 2 for x, _ in points)
+    return sum((x - mean_x) * (y - mean_y) for x, y in points) / spread
+
+
+def run_suite(cases, repeat=3, quick=False):
+    report = {
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "seed": SEED,
+        "cases": {},
+    }
+    for case in cases:
+        sizes = CASES[case][1][:2] if quick else CASES[case][1]
+        rows = [measure(case, size, repeat) for size in sizes]
+        report["cases"][case] = {"results": rows, "scaling_exponent": scaling_exponent(rows)}
+    return report
+
+
+def compare(report, baseline, threshold):
+    """Lista de regresiones: pasos/seg por debajo de (1 - threshold) veces la base o cuentas de pasos distintas."""
+    problems = []
+    for case, data in report["cases"].items():
+        base_rows = {row["size"]: row for row in baseline.get("cases", {}).get(case, {}).get("results", [])}
+        for row in data["results"]:
+            base = base_rows.get(row["size"])
+            if base is None:
+                continue
+            if row["steps"] != base["steps"]:
+                problems.append(f"{case}[{row['size']}]: {row['steps']} pasos, la base tenía {base['steps']}")
+            elif base["steps_per_second"] and row["steps_per_second"] is not None:
+                ratio = row["steps_per_second"] / base["steps_per_second"]
+                if ratio < 1 - threshold:
+                    problems.append(f"{case}[{row['size']}]: {row['steps_per_second']:.0f} pasos/seg, "
+                                    f"{(1 - ratio) * 100:.1f}% más lento que la base")
+    return problems
+
+
+def print_report(report):
+    print(f"{'caso':>12} {'tamaño':>9} {'pasos':>11} {'tiempo (s)':>11} {'pasos/seg':>12} {'memoria (KiB)':>14}")
+    for case, data in report["cases"].items():
+        for row in data["results"]:
+            speed = f"{row['steps_per_second']:.0f}" if row["steps_per_second"] is not None else "-"
+            print(f"{case:>12} {row['size']:>9} {row['steps']:>11} {row['time']:>11.4f} {speed:>12} "
+                  f"{row['peak_memory'] / 1024:>14.1f}")
+        exponent = data["scaling_exponent"]
+        print(f"{'':>12} exponente de escala: {exponent:.2f}" if exponent is not None else "")
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmarks reproducibles del motor de la máquina de Turing.")
+    parser.add_argument("--cases", nargs="+", choices=sorted(CASES), default=list(CASES), help="Casos a medir")
+    parser.add_argument("--repeat", type=int, default=3, help="Repeticiones por medición (se toma la mejor)")
+    parser.add_argument("--quick", action="store_true", help="Sólo los dos tamaños más chicos de cada caso")
+    parser.add_argument("--output", metavar="ARCHIVO", default=None, help="Guardar el reporte como JSON")
+    parser.add_argument("--baseline", metavar="ARCHIVO", default=None, help="JSON de base contra el cual comparar")
+    parser.add_argument("--threshold", type=float, default=0.2,
+                        help="Pérdida de pasos/seg tolerada respecto de la base (0.2 = 20%%)")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    report = run_suite(args.cases, args.repeat, args.quick)
+    print_report(report)
+    if args.output is not None:
+        with open(args.output, mode="w") as file:
+            json.dump(report, file, indent=2)
+    if args.baseline is not None:
+        with open(args.baseline, mode="r") as file:
+            baseline = json.load(file)
+        problems = compare(report, baseline, args.threshold)
+        for problem in problems:
+            print(f"REGRESIÓN {problem}")
+        if problems:
+            return 1
+        print(f"Sin regresiones respecto de {args.baseline} (umbral {args.threshold:.0%}).")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
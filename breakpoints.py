@@ -0,0 +1,152 @@
+from compiler import (BLANK_ID, HALT_ID, LEFT_MOVE, RIGHT_MOVE, OP_BREAK, OP_LEFT, OP_MOVE, OP_RIGHT, OP_RUN_LEFT,
+                      OP_RUN_RIGHT, OP_SEQUENCE, OP_SHIFT_LEFT, OP_SHIFT_RIGHT, OP_WRITE, OP_WRITE_MOVE)
+
+NO_LIMIT = 1 << 62  # Largo de cinta que nunca se alcanza (sin punto de parada por largo)
+# Operaciones que escriben en la celda del cabezal y las que pueden cambiar otras celdas
+WRITE_OPS = (OP_WRITE, OP_WRITE_MOVE)
+SHIFT_OPS = (OP_SEQUENCE, OP_SHIFT_LEFT, OP_SHIFT_RIGHT)
+
+
+class BreakpointHit(str):
+    """Mensaje de un punto de parada alcanzado: viaja por el mismo canal que los errores del motor."""
+
+
+class Breakpoints:
+    """Puntos de parada de una ejecución; el motor los recibe ya compilados (ver compile).
+
+    - Entrada a un estado: la máquina se detiene apenas entra (como en un estado 'pause').
+    - Transición (estado, símbolo): se detiene justo antes de ejecutarla; al seguir, ese
+      primer paso se ejecuta sin volver a detenerse.
+    - Escritura en una celda (coordenada absoluta, ver Tape.origin): se detiene después del
+      paso que la escribió (tras un S_l, S_r o un bloque compuesto, si su contenido cambió).
+    - Paso: se detiene al llegar a ese total de pasos (TuringMachine.steps).
+    - Largo de la cinta: se detiene cuando la cinta pasa a tener más celdas que el umbral.
+    """
+
+    def __init__(self):
+        self.states = set()
+        self.transitions = set()
+        self.cells = set()
+        self.step = None
+        self.tape_length = None
+        self._compiled = None  # (tabla base, CompiledBreakpoints)
+
+    @property
+    def active(self):
+        """True si hay puntos de parada que tiene que vigilar el motor (el de paso no hace falta)."""
+        return bool(self.states or self.transitions or self.cells or self.tape_length is not None)
+
+    def break_on_state(self, state):
+        self.states.add(state)
+        self._compiled = None
+
+    def break_on_transition(self, state, symbol):
+        self.transitions.add((state, symbol))
+        self._compiled = None
+
+    def watch_cell(self, coord):
+        self.cells.add(coord)
+        self._compiled = None
+
+    def break_at_step(self, step):
+        self.step = step
+
+    def break_on_tape_length(self, length):
+        self.tape_length = length
+        self._compiled = None
+
+    def clear(self):
+        self.__init__()
+
+    def compile(self, machine, accelerate=False):
+        """CompiledBreakpoints para 'machine' (se rearma sólo si cambiaron la máquina o los puntos)."""
+        base = machine.macro_table() if accelerate else machine.table
+        if self._compiled is None or self._compiled[0] is not base:
+            self._compiled = (base, CompiledBreakpoints(machine, self, base))
+        return self._compiled[1]
+
+
+class CompiledBreakpoints:
+    """Puntos de parada traducidos a la forma que usa el bucle del motor.
+
+    Las transiciones vigiladas se reemplazan en una copia de la tabla de despacho por
+    registros OP_BREAK y los estados se marcan en un arreglo, así que las transiciones
+    comunes no pagan nada extra; el largo de la cinta sólo se compara cuando crece.
+    """
+
+    def __init__(self, machine, breakpoints, base):
+        n_symbols = machine.n_symbols
+        self.machine = machine
+        # Estados y símbolos que la máquina no conoce no pueden aparecer: se ignoran
+        self.states = {machine.state_ids[name] for name in breakpoints.states if name in machine.state_ids}
+        self.states.discard(HALT_ID)
+        keys = {(machine.state_ids[state], machine.symbol_ids[symbol]) for state, symbol in breakpoints.transitions
+                if state in machine.state_ids and symbol in machine.symbol_ids}
+        self.cells = tuple(sorted(breakpoints.cells))
+        self.max_length = breakpoints.tape_length if breakpoints.tape_length is not None else NO_LIMIT
+        watched_states = self.states | {state for state, _ in keys}
+
+        table = list(base)
+        for index, record in enumerate(base):
+            if record is None:
+                continue
+            state, sym = divmod(index, n_symbols)
+            if record[0] in (OP_RUN_LEFT, OP_RUN_RIGHT):
+                # Un macro-paso saltaría por encima del punto de parada: se vuelve al paso simple
+                if state in watched_states or (record[0] == OP_RUN_RIGHT and self.max_length != NO_LIMIT):
+                    table[index] = record = machine.table[index]
+                else:
+                    continue
+            op, arg, next_state, tid = record
+            before = (state, sym) in keys
+            writes = bool(self.cells) and (op in WRITE_OPS or op in SHIFT_OPS)
+            if before or writes:
+                # El motor ejecuta la operación original con engine.run_sequence, donde L y R son rachas
+                if op == OP_SEQUENCE:
+                    operations = arg
+                elif op == OP_LEFT:
+                    operations = ((OP_MOVE, LEFT_MOVE),)
+                elif op == OP_RIGHT:
+                    operations = ((OP_MOVE, RIGHT_MOVE),)
+                else:
+                    operations = ((op, arg),)
+                table[index] = (OP_BREAK, (op, arg, operations, state, before, writes), next_state, tid)
+        self.table = table
+
+    def stop_flags(self, stop_on_pause):
+        """Motivo de detención al entrar a cada estado ('halt', 'pause', 'breakpoint' o None)."""
+        machine = self.machine
+        stop = [None] * machine.n_states
+        for state in range(machine.n_states):
+            if state in self.states:
+                stop[state] = "breakpoint"
+            elif stop_on_pause and machine.pause[state]:
+                stop[state] = "pause"
+        stop[HALT_ID] = "halt"
+        return stop
+
+    def watched(self, buf, start, end, origin):
+        """Contenido actual de las celdas vigiladas (las que están fuera de la cinta valen BLANK_ID)."""
+        return tuple(buf[origin + coord] if start <= origin + coord < end else BLANK_ID for coord in self.cells)
+
+    def write_hit(self, op, coord, before, buf, start, end, origin):
+        """Mensaje si el paso escribió una celda vigilada (o None); 'coord' es donde estaba el cabezal."""
+        if op in WRITE_OPS:
+            if coord in self.cells:
+                return BreakpointHit(f"Punto de parada: se escribió la celda {coord}.")
+            return None
+        after = self.watched(buf, start, end, origin)
+        for coord, old, new in zip(self.cells, before, after):
+            if old != new:
+                return BreakpointHit(f"Punto de parada: cambió la celda {coord}.")
+        return None
+
+    def transition_hit(self, state, sym):
+        machine = self.machine
+        return BreakpointHit(f"Punto de parada: transición ({machine.states[state]}, {machine.symbols[sym]}).")
+
+    def length_hit(self, length):
+        return BreakpointHit(f"Punto de parada: la cinta llegó a {length} celdas (umbral {self.max_length}).")
+
+    def state_message(self, state):
+        return f"Punto de parada: se entró al estado '{self.machine.states[state]}'."
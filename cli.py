@@ -0,0 +1,161 @@
+import argparse
+import sys
+from loader import check_head_position, load_blocks_table, load_machine
+from paged_tape import MAX_PAGES, PAGE_SIZE, PagedTape
+from turing_machine import SNAPSHOT_INTERVAL, TuringMachine
+
+
+def build_machine(filepath, tape=None, head_position=None, definition=None, blocks=()):
+    """Crea una TuringMachine lista para ejecutar a partir de un CSV (sin interfaz gráfica).
+
+    Con 'definition' (una MachineDefinition ya cargada) no se vuelve a leer el archivo.
+    'blocks' es la tabla de bloques (ver load_blocks_table) con los bloques compuestos.
+    Un cabezal fuera de la cinta da ValueError.
+    """
+    if definition is None:
+        definition = load_machine(filepath, blocks)
+    machine = TuringMachine()
+    machine.blocks = dict(blocks)
+    machine.set_initial_state(definition.initial_state)
+    machine.set_transitions(definition.transitions)
+    machine.compiled = definition.compiled
+    tape = list(tape) if tape is not None else definition.tape
+    head_position = head_position if head_position is not None else definition.head_position
+    check_head_position(head_position, tape)
+    machine.set_tape(tape, head_position)
+    return machine
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Ejecuta una máquina de Turing sin interfaz gráfica.")
+    parser.add_argument("csv", help="Archivo CSV con cinta, estado inicial, cabezal y transiciones")
+    parser.add_argument("--max-steps", type=int, default=None, help="Cantidad máxima de pasos")
+    parser.add_argument("--time-budget", type=float, default=None, help="Tiempo máximo en segundos")
+    parser.add_argument("--tape", default=None, help="Cinta inicial (reemplaza la del CSV)")
+    parser.add_argument("--blocks", metavar="ARCHIVO", default=None,
+                        help="Tabla de bloques (como blocks.csv) con bloques compuestos")
+    parser.add_argument("--head", type=int, default=None, help="Posición inicial del cabezal (reemplaza la del CSV)")
+    parser.add_argument("--paged-tape", action="store_true",
+                        help="Guardar la cinta en páginas de un archivo mapeado en disco (cintas más grandes que la RAM)")
+    parser.add_argument("--tape-dir", metavar="DIRECTORIO", default=None,
+                        help="Directorio del archivo de la cinta paginada (por defecto, el temporal del sistema)")
+    parser.add_argument("--page-size", type=int, default=PAGE_SIZE, help="Celdas por página de la cinta paginada")
+    parser.add_argument("--max-pages", type=int, default=MAX_PAGES,
+                        help="Páginas de la cinta paginada que se mantienen en memoria")
+    parser.add_argument("--snapshot", metavar="ARCHIVO", default=None,
+                        help="Guardar fotos periódicas de la configuración (para retomar con --resume)")
+    parser.add_argument("--snapshot-interval", type=float, default=SNAPSHOT_INTERVAL,
+                        help="Segundos entre fotos")
+    parser.add_argument("--resume", metavar="ARCHIVO", default=None,
+                        help="Retomar la ejecución desde una foto guardada con --snapshot")
+    parser.add_argument("--break-state", metavar="ESTADO", action="append", default=[],
+                        help="Detenerse al entrar a este estado (se puede repetir)")
+    parser.add_argument("--break-transition", metavar="ESTADO,SIMBOLO", action="append", default=[],
+                        help="Detenerse justo antes de esta transición (se puede repetir)")
+    parser.add_argument("--watch-cell", metavar="CELDA", type=int, action="append", default=[],
+                        help="Detenerse después de escribir esta celda de la cinta inicial (se puede repetir)")
+    parser.add_argument("--break-step", metavar="PASO", type=int, default=None,
+                        help="Detenerse al llegar a este total de pasos")
+    parser.add_argument("--break-length", metavar="CELDAS", type=int, default=None,
+                        help="Detenerse cuando la cinta pase a tener más de esta cantidad de celdas")
+    parser.add_argument("--no-pause", action="store_true", help="No detenerse en estados 'pause'")
+    parser.add_argument("--no-accelerate", action="store_true",
+                        help="Ejecutar paso a paso los bucles L/R sobre un mismo estado")
+    parser.add_argument("--codegen", action="store_true",
+                        help="Ejecutar con código Python generado para esta máquina (ver codegen.py)")
+    parser.add_argument("--optimize", action="store_true",
+                        help="Ejecutar la tabla optimizada (ver optimizer.py): sin estados inalcanzables ni "
+                             "equivalentes y con cadenas deterministas fusionadas")
+    parser.add_argument("--detect-cycles", action="store_true",
+                        help="Detenerse si una configuración se repite (la máquina no termina)")
+    parser.add_argument("--profile", metavar="ARCHIVO", default=None,
+                        help="Perfilar la ejecución y guardar los contadores (.csv o .json)")
+    parser.add_argument("--trace", metavar="ARCHIVO", default=None,
+                        help="Registrar cada paso en una traza binaria (ver recorder.TraceRecorder)")
+    parser.add_argument("--checkpoint-interval", type=int, default=1024,
+                        help="Pasos entre fotos completas de la cinta en la traza")
+    return parser.parse_args(argv)
+
+
+def set_breakpoints(machine, args):
+    """Carga en la máquina los puntos de parada de la línea de comandos."""
+    for state in args.break_state:
+        machine.breakpoints.break_on_state(state)
+    for transition in args.break_transition:
+        state, separator, symbol = transition.rpartition(",")
+        if not separator or not state or len(symbol) != 1:
+            raise ValueError(f"La transición '{transition}' debe tener la forma ESTADO,SIMBOLO.")
+        machine.breakpoints.break_on_transition(state, symbol)
+    for index in args.watch_cell:
+        machine.watch_cell(index)
+    if args.break_step is not None:
+        machine.breakpoints.break_at_step(args.break_step)
+    if args.break_length is not None:
+        machine.breakpoints.break_on_tape_length(args.break_length)
+
+
+def print_report(result):
+    print(f"Motivo de detención: {result.status}")
+    print(f"Estado final: {result.state}")
+    print(f"Cinta: {result.tape}")
+    print(f"Cabezal: {result.head_position}")
+    print(f"Pasos: {result.steps}")
+    print(f"Tiempo: {result.elapsed:.6f} s")
+    print(f"Pasos/seg: {result.steps_per_second:.0f}")
+    if result.message:
+        print(f"Mensaje: {result.message}")
+
+
+def print_profile(profiler, top=10):
+    print("Bloques más usados:")
+    for block, hits in profiler.block_hits().items():
+        print(f"  {block:>5}: {hits}")
+    print(f"Transiciones más usadas (top {top}):")
+    for row in profiler.transition_hits()[:top]:
+        print(f"  {row['state']},{row['symbol']} -> {row['block']},{row['next_state']}: {row['hits']}")
+    print(f"Recorrido de R_/L_: {profiler.seek_right_travel}/{profiler.seek_left_travel} celdas")
+    print(f"Celdas movidas por S_l/S_r: {profiler.shifted_cells}")
+    print(f"Crecimiento de la cinta (der./izq.): {profiler.grown_right}/{profiler.grown_left}")
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    try:
+        blocks = load_blocks_table(args.blocks) if args.blocks is not None else {}
+        machine = build_machine(args.csv, args.tape, args.head, blocks=blocks)
+        if args.paged_tape:
+            machine.set_tape(PagedTape(machine.tape, machine.compile(), args.tape_dir, args.page_size, args.max_pages))
+        set_breakpoints(machine, args)
+        if args.resume is not None:
+            machine.load_snapshot(args.resume)
+    except (OSError, ValueError) as e:
+        print(f"Error al cargar archivo: {e}", file=sys.stderr)
+        return 2
+    if args.trace is not None:
+        machine.start_trace(args.trace, args.checkpoint_interval)
+    options = {"max_steps": args.max_steps, "time_budget": args.time_budget, "stop_on_pause": not args.no_pause,
+               "accelerate": not args.no_accelerate, "detect_cycles": args.detect_cycles,
+               "profile": args.profile is not None, "codegen": args.codegen,
+               "optimize": args.optimize}
+    try:
+        if args.snapshot is not None:
+            result = machine.run_with_snapshots(args.snapshot, args.snapshot_interval, **options)
+        else:
+            result = machine.run(**options)
+    except OSError as e:
+        print(f"Error al guardar la foto: {e}", file=sys.stderr)
+        return 2
+    print_report(result)
+    if args.resume is not None or args.snapshot is not None:
+        print(f"Pasos totales: {machine.steps}")
+    if args.profile is not None:
+        machine.profiler.save(args.profile)
+        print_profile(machine.profiler)
+    if machine.tracer is not None:
+        print(f"Traza: {machine.tracer.steps} pasos, {len(machine.tracer.checkpoints)} fotos en {args.trace}")
+        machine.tracer.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
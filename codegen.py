@@ -0,0 +1,319 @@
+import argparse
+import sys
+import time
+from compiler import (BLANK_ID, HALT_ID, PAUSE_MESSAGE, OP_NOP, OP_LEFT, OP_RIGHT, OP_WRITE, OP_SEEK_RIGHT,
+                      OP_SEEK_LEFT, OP_SHIFT_LEFT, OP_SHIFT_RIGHT, OP_ERROR, OP_SEQUENCE, OP_MOVE, OP_WRITE_MOVE)
+from engine import CLOCK_INTERVAL, seek_error
+
+DISPATCH_LEAF = 4  # Estados que se comparan en cadena; con más se parte el rango a la mitad
+INLINE_DEPTH = 1  # Pasos hacia otros estados que se generan en el lugar antes de volver al despacho
+VERIFY_EVERY = 64  # verify compara cada límite de pasos hasta este; después, los límites se duplican
+
+
+def action_lines(machine, op, arg):
+    """Código de un bloque ya decodificado, con el operando como constante."""
+    if op == OP_NOP:
+        return []
+    if op == OP_LEFT:
+        return ["if pos > start:", "    pos -= 1"]
+    if op == OP_RIGHT:
+        return ["pos += 1",
+                "if pos == end:",
+                "    end += 1",
+                "    if end > len(buf):",
+                "        buf.extend(bytes(len(buf)))"]
+    if op == OP_WRITE:
+        return [f"buf[pos] = {arg}"]
+    if op == OP_SEEK_RIGHT:
+        lines = [f"found = buf.find({arg}, pos + 1, end)",
+                 "if found >= 0:",
+                 "    pos = found"]
+        grow = ["    pos = end",
+                "    end += 1",
+                "    if end > len(buf):",
+                "        buf.extend(bytes(len(buf)))"]
+        if arg == BLANK_ID:
+            return lines + ["else:"] + grow
+        message = seek_error(machine, arg, "derecha")
+        return lines + [f"elif pos == end - 1 and buf[pos] == {arg}:"] + grow + [
+            f"    error = {message!r}",
+            "else:",
+            f"    if buf[pos] == {arg}:",
+            "        pos += 1",
+            f"    error = {message!r}"]
+    if op == OP_SEEK_LEFT:
+        lines = [f"found = buf.rfind({arg}, start, pos)",
+                 "if found >= 0:",
+                 "    pos = found"]
+        grow = ["    tape.start, tape.end = start, end",
+                "    tape.grow_left()",
+                "    start, end = tape.start, tape.end",
+                "    pos = start"]
+        if arg == BLANK_ID:
+            return lines + ["else:"] + grow
+        message = seek_error(machine, arg, "izquierda")
+        return lines + [f"elif pos == start and buf[pos] == {arg}:"] + grow + [
+            f"    error = {message!r}",
+            "else:",
+            f"    if buf[pos] == {arg}:",
+            "        pos -= 1",
+            f"    error = {message!r}"]
+    if op == OP_SHIFT_LEFT:
+        return ["head = pos - start",
+                "tape.start, tape.end = start, end",
+                "tape.delete(pos)",
+                "start, end = tape.start, tape.end",
+                "pos = start + head",
+                "if pos == end:",
+                "    end += 1",
+                "    if end > len(buf):",
+                "        buf.extend(bytes(len(buf)))"]
+    if op == OP_SHIFT_RIGHT:
+        return ["head = pos - start - 1",
+                "tape.start, tape.end = start, end",
+                "tape.delete(pos)",
+                "if head < 0:",
+                "    tape.grow_left()",
+                "    head = 0",
+                "start, end = tape.start, tape.end",
+                "pos = start + head"]
+    if op == OP_MOVE:
+        return move_lines(*arg)
+    if op == OP_WRITE_MOVE:
+        return [f"buf[pos] = {arg[0]}"] + move_lines(*arg[1:])
+    if op == OP_SEQUENCE:
+        # Después de una parte que puede fallar, el resto sólo corre si no hubo error
+        lines = []
+        indent = ""
+        for part_op, part_arg in arg:
+            lines += [indent + line for line in action_lines(machine, part_op, part_arg)]
+            if can_fail(part_op, part_arg):
+                lines.append(indent + "if error is None:")
+                indent += "    "
+        return lines + ([indent + "pass"] if indent else [])
+    if op == OP_ERROR:
+        return [f"error = {arg!r}"]
+    raise ValueError(f"Operación desconocida: {op}")
+
+
+def stop_lines(status, state="state"):
+    """Salida de la función: devuelve la cinta a su objeto y el resultado."""
+    return ["tape.start, tape.end = start, end", f"return {status!r}, {state}, pos, steps, error"]
+
+
+def move_lines(offset, floor, reach, reach_floor):
+    """Código de una racha de L/R fusionada (ver compiler.OP_MOVE), simplificado según sus constantes."""
+    lines = []
+    # Como pos >= start, max(pos + a, start + b) es pos + a cuando b <= a
+    if reach > 0 or reach_floor > 0:
+        top = f"pos + {reach}" if reach_floor <= reach else f"max(pos + {reach}, start + {reach_floor})"
+        lines += [f"top = {top}",
+                  "if top >= end:",
+                  "    end = top + 1",
+                  "    if end > len(buf):",
+                  "        buf.extend(bytes(max(len(buf), end - len(buf))))"]
+    if floor <= offset:
+        return lines + ([f"pos += {offset}"] if offset else [])
+    return lines + [f"pos = max(pos + {offset}, start + {floor})"]
+
+
+def can_fail(op, arg):
+    """Si la operación puede terminar en error (y por lo tanto en 'halt')."""
+    if op in (OP_SEEK_RIGHT, OP_SEEK_LEFT):
+        return arg != BLANK_ID
+    if op == OP_SEQUENCE:
+        return any(can_fail(part_op, part_arg) for part_op, part_arg in arg)
+    return op == OP_ERROR
+
+
+def transition_lines(machine, state, record, loop_state, depth):
+    """Código de una transición: acción del bloque, cambio de estado y condiciones de parada.
+
+    'loop_state' es el estado cuyo bucle interno contiene el código: si la transición vuelve a
+    él se sigue en ese bucle sin pasar por el despacho. Si va a otro estado, con 'depth' > 0 el
+    paso siguiente se genera ahí mismo (así las cadenas A -> B -> A no despachan nunca); si no,
+    se sale del bucle con 'break'.
+    """
+    op, arg, next_state, _ = record
+    lines = ["steps += 1"] + action_lines(machine, op, arg)
+    if op == OP_ERROR or next_state == HALT_ID:
+        return lines + stop_lines("halt", HALT_ID)
+    if can_fail(op, arg):
+        lines += ["if error is not None:"] + ["    " + line for line in stop_lines("halt", HALT_ID)]
+    if next_state != state:
+        lines.append(f"state = {next_state}")
+    if machine.pause[next_state]:
+        lines += ["if stop_on_pause:"] + ["    " + line for line in stop_lines("pause")]
+    # El reloj y el límite de pasos se revisan en el bucle principal
+    if next_state == loop_state:
+        return lines + ["if steps == check:", "    break"]
+    if depth == 0:
+        return lines + ["break"]
+    return lines + ["if steps == check:", "    break"] + symbol_lines(machine, next_state, loop_state, depth - 1) + [
+        "break"]
+
+
+def symbol_lines(machine, state, loop_state, depth):
+    """Ramas directas sobre el símbolo leído para un paso desde 'state'."""
+    records = [(sym, machine.table[state * machine.n_symbols + sym]) for sym in range(machine.n_symbols)]
+    records = [(sym, record) for sym, record in records if record is not None]
+    if not records:
+        return stop_lines("no_transition")
+    lines = ["sym = buf[pos]"]
+    for position, (sym, record) in enumerate(records):
+        lines.append(f"{'if' if position == 0 else 'elif'} sym == {sym}:")
+        lines += ["    " + line for line in transition_lines(machine, state, record, loop_state, depth)]
+    return lines + ["else:"] + ["    " + line for line in stop_lines("no_transition")]
+
+
+def state_lines(machine, state):
+    """Bucle de un estado: se repite mientras las transiciones vuelvan a él."""
+    return ["while True:"] + ["    " + line for line in symbol_lines(machine, state, state, INLINE_DEPTH)]
+
+
+def dispatch_lines(machine, states):
+    """Árbol de comparaciones sobre el id de estado (búsqueda binaria, cadenas cortas en las hojas)."""
+    if len(states) <= DISPATCH_LEAF:
+        lines = []
+        for position, state in enumerate(states):
+            lines.append(f"{'if' if position == 0 else 'elif'} state == {state}:")
+            lines += ["    " + line for line in state_lines(machine, state)]
+        return lines + ["else:"] + ["    " + line for line in stop_lines("no_transition")]
+    middle = len(states) // 2
+    return ([f"if state < {states[middle]}:"] + ["    " + line for line in dispatch_lines(machine, states[:middle])]
+            + ["else:"] + ["    " + line for line in dispatch_lines(machine, states[middle:])])
+
+
+def generate_source(machine):
+    """Genera el código de una función 'run' especializada para la máquina (sin macro-pasos ni ganchos)."""
+    states = list(range(1, machine.n_states))  # 'halt' nunca se despacha: la función ya terminó
+    lines = ["def run(tape, pos, state, limit, deadline, stop_on_pause):",
+             "    buf = tape.buf",
+             "    start = tape.start",
+             "    end = tape.end",
+             "    steps = 0",
+             "    check = 0 if deadline is not None else limit  # Próximo paso en que se mira el límite o el reloj",
+             "    error = None",
+             "    while True:",
+             "        if steps == check:",
+             "            if steps == limit:"]
+    lines += ["                " + line for line in stop_lines("max_steps")]
+    lines += [f"            check = steps + {CLOCK_INTERVAL}",
+              "            if 0 <= limit < check:",
+              "                check = limit",
+              "            if perf_counter() >= deadline:"]
+    lines += ["                " + line for line in stop_lines("time_budget")]
+    lines += ["        " + line for line in dispatch_lines(machine, states)]
+    return "\n".join(lines) + "\n"
+
+
+def generated_function(machine):
+    """Función generada para la máquina, cacheada en ella hasta que cambie la tabla."""
+    if machine._generated is None:
+        if machine.generated_source is None:
+            machine.generated_source = generate_source(machine)
+        namespace = {"perf_counter": time.perf_counter}
+        exec(compile(machine.generated_source, "<máquina generada>", "exec"), namespace)
+        machine._generated = namespace["run"]
+    return machine._generated
+
+
+def execute_generated(machine, tape, head, state, max_steps=None, deadline=None, stop_on_pause=True):
+    """Igual que engine.execute (sin macro-pasos, detector, perfil ni traza) pero con la función generada."""
+    if state == HALT_ID:
+        return "halt", state, head, 0, None
+    run = generated_function(machine)
+    limit = -1 if max_steps is None else max_steps
+    status, state, pos, steps, error = run(tape, tape.start + head, state, limit, deadline, stop_on_pause)
+    head = pos - tape.start
+    if error is not None:
+        return status, state, head, steps, error
+    if steps == 0:
+        return status, state, head, steps, None
+    return status, state, head, steps, PAUSE_MESSAGE if machine.pause[state] else ""
+
+
+def verify_limits(steps):
+    """Límites de pasos para verify: todos hasta VERIFY_EVERY, después duplicando, y 'steps' al final."""
+    limits = list(range(1, min(steps, VERIFY_EVERY) + 1))
+    limit = VERIFY_EVERY * 2
+    while limit < steps:
+        limits.append(limit)
+        limit *= 2
+    if steps > VERIFY_EVERY:
+        limits.append(steps)
+    return limits
+
+
+def verify(machine, steps, stop_on_pause=False):
+    """Compara la función generada contra el intérprete de referencia (TuringMachine.step).
+
+    La referencia avanza de a un paso; el código generado corre de una sola vez desde el
+    principio hasta cada límite de verify_limits, así se prueban también los pasos generados
+    en el lugar (INLINE_DEPTH) y la vuelta al bucle de cada estado. Se comparan el motivo de
+    detención, los pasos y la configuración final. 'machine' es una TuringMachine ya cargada;
+    no se modifica. Devuelve None si coinciden durante 'steps' pasos (o hasta detenerse) o
+    una descripción de la primera diferencia.
+    """
+    from turing_machine import TuringMachine  # Evita la importación circular con turing_machine.run
+
+    def copy():
+        copied = TuringMachine()
+        copied.set_transitions(machine.transitions)
+        copied.blocks = machine.blocks
+        copied.set_initial_state(machine.current_state)
+        copied.set_tape(list(machine.tape), machine.head_position)
+        return copied
+
+    reference = copy()
+    status = "max_steps"
+    step = 0
+    for limit in verify_limits(steps):
+        while status == "max_steps" and step < limit:
+            if not reference.step():
+                status = "no_transition"
+            else:
+                step += 1
+                if reference.current_state == "halt":
+                    status = "halt"
+                elif stop_on_pause and reference.current_state.startswith("pause"):
+                    status = "pause"
+        result = copy().run(max_steps=limit, stop_on_pause=stop_on_pause, codegen=True)
+        expected = (status, step, reference.current_state, "".join(reference.tape), reference.head_position,
+                    reference.error)
+        actual = (result.status, result.steps, result.state, result.tape, result.head_position,
+                  result.message.startswith("Error"))
+        if expected != actual:
+            return f"Hasta {limit} pasos: se esperaba {expected} y el código generado dio {actual}."
+        if status != "max_steps":
+            return None
+    return None
+
+
+def main(argv=None):
+    from cli import build_machine
+
+    parser = argparse.ArgumentParser(description="Genera el código especializado de una máquina y lo verifica.")
+    parser.add_argument("csv", help="Archivo CSV con cinta, estado inicial, cabezal y transiciones")
+    parser.add_argument("--steps", type=int, default=10_000, help="Pasos a comparar contra el intérprete")
+    parser.add_argument("--tape", default=None, help="Cinta inicial (reemplaza la del CSV)")
+    parser.add_argument("--show", action="store_true", help="Mostrar el código generado")
+    args = parser.parse_args(argv)
+    try:
+        machine = build_machine(args.csv, args.tape)
+    except (OSError, ValueError) as e:
+        print(f"Error al cargar archivo: {e}", file=sys.stderr)
+        return 2
+    if args.show:
+        generated_function(machine.compile())
+        print(machine.compile().generated_source)
+    problem = verify(machine, args.steps)
+    if problem is not None:
+        print(problem)
+        return 1
+    print(f"El código generado coincide con el intérprete de referencia ({args.steps} pasos como máximo).")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,330 @@
+import hashlib
+
+BLANK = "_"  # Símbolo vacío de la cinta
+HALT = "halt"  # Estado de detención
+
+# Mensaje que se deja en errorMensage al entrar en un estado "pause"
+PAUSE_MESSAGE = "La automatización se pausó por un estado nombrado 'pause'."
+
+# Los símbolos y estados se internan como enteros pequeños: el vacío y 'halt' siempre valen 0
+BLANK_ID = 0
+HALT_ID = 0
+
+# Códigos de operación de los bloques de construcción decodificados
+OP_NOP = 0  # Bloque válido sin efecto (por ejemplo 'LL' o un bloque de la tabla de bloques)
+OP_LEFT = 1  # L
+OP_RIGHT = 2  # R
+OP_WRITE = 3  # X?
+OP_SEEK_RIGHT = 4  # R_?
+OP_SEEK_LEFT = 5  # L_?
+OP_SHIFT_LEFT = 6  # S_l
+OP_SHIFT_RIGHT = 7  # S_r
+OP_ERROR = 8  # Bloque inválido: el operando es el mensaje de error
+# Macro-pasos (sólo en macro_table): L/R que vuelven al mismo estado; el operando son los
+# ids de símbolo (bytes) sobre los que el estado sigue girando
+OP_RUN_LEFT = 9
+OP_RUN_RIGHT = 10
+# Bloque compuesto de la tabla de bloques: el operando es la tupla de micro-operaciones ya fusionadas
+OP_SEQUENCE = 11
+# Operaciones que sólo salen de fusionar bloques compuestos (solas o dentro de un OP_SEQUENCE). Una racha de L/R es
+# (desplazamiento, piso, alcance, piso del alcance): el cabezal termina en max(pos + desplazamiento,
+# start + piso) y la cinta crece hasta max(pos + alcance, start + piso del alcance)
+OP_MOVE = 12
+OP_WRITE_MOVE = 13  # Escritura seguida de una racha de L/R: (símbolo,) + la racha
+# Transición vigilada por un punto de parada (sólo en las tablas de breakpoints.py): el operando es
+# (op original, operando original, micro-operaciones, estado actual, parar antes, vigilar escrituras)
+OP_BREAK = 14
+# Cadena de transiciones fusionada por optimizer.py: el operando es (escritura, racha, pasos, eslabones); cuenta
+# un paso por cada transición original (ver optimizer.fuse_chain)
+OP_CHAIN = 15
+
+OP_NAMES = ("NOP", "L", "R", "X", "R_", "L_", "S_l", "S_r", "ERROR", "L*", "R*", "SEQ", "MOVE", "XMOVE", "BREAK", "CHAIN")
+
+BLOCK_PREFIXES = ("L", "R", "X", "R_", "L_", "S_l", "S_r")
+
+MAX_SYMBOLS = 256  # La cinta guarda un byte por celda
+
+LEFT_MOVE = (-1, 0, 0, 0)  # L como racha: nunca pasa de la celda 0 ni agranda la cinta
+RIGHT_MOVE = (1, 1, 1, 1)  # R como racha: avanza una celda y la cinta crece si hace falta
+
+
+def block_sequence(block, blocks):
+    """Partes de un bloque compuesto de la tabla de bloques, o None si 'block' no es compuesto.
+
+    Un bloque compuesto es una fila de blocks.csv cuyo nombre no es un bloque primitivo y cuya
+    acción es una lista de bloques separados por espacios, por ejemplo 'MARCAR,X# R_#'.
+    """
+    if block.startswith(BLOCK_PREFIXES) or block not in blocks:
+        return None
+    parts = blocks[block].split()
+    if not parts or not all(part.startswith(BLOCK_PREFIXES) or part in blocks for part in parts):
+        return None
+    return parts
+
+
+def expand_block(block, blocks, active=()):
+    """Lista de bloques primitivos que ejecuta 'block', en orden ([block] si no es compuesto).
+
+    Un bloque compuesto que se usa a sí mismo, directa o indirectamente, da ValueError.
+    """
+    parts = block_sequence(block, blocks)
+    if parts is None:
+        return [block]
+    if block in active:
+        raise ValueError(f"Error: El bloque '{block}' se define en términos de sí mismo.")
+    primitives = []
+    for part in parts:
+        primitives += expand_block(part, blocks, active + (block,))
+    return primitives
+
+
+def compose_moves(first, second):
+    """Racha equivalente a hacer 'first' y después 'second' (ver OP_MOVE)."""
+    offset, floor, reach, reach_floor = first
+    return (offset + second[0], max(floor + second[0], second[1]),
+            max(reach, offset + second[2]), max(reach_floor, floor + second[2], second[3]))
+
+
+def fuse_operations(operations):
+    """Fusiona las operaciones (ya internadas) de un bloque compuesto en una sola (op, operando).
+
+    Se descartan los bloques sin efecto, las L/R seguidas se juntan en una racha, una escritura
+    tapa a la anterior en la misma celda y una escritura seguida de movimientos queda en un solo
+    OP_WRITE_MOVE. Lo que sigue a un bloque inválido no se ejecuta nunca y se descarta.
+    """
+    fused = []
+    for op, arg in operations:
+        if op == OP_NOP:
+            continue
+        if op in (OP_LEFT, OP_RIGHT):
+            move = LEFT_MOVE if op == OP_LEFT else RIGHT_MOVE
+            if fused and fused[-1][0] in (OP_MOVE, OP_WRITE_MOVE):
+                last_op, last_arg = fused[-1]
+                fused[-1] = (last_op, last_arg[:-4] + compose_moves(last_arg[-4:], move))
+            elif fused and fused[-1][0] == OP_WRITE:
+                fused[-1] = (OP_WRITE_MOVE, (fused[-1][1],) + move)
+            else:
+                fused.append((OP_MOVE, move))
+        elif op == OP_WRITE and fused and fused[-1][0] == OP_WRITE:
+            fused[-1] = (op, arg)
+        else:
+            fused.append((op, arg))
+            if op == OP_ERROR:
+                break
+    if not fused:
+        return OP_NOP, None
+    if len(fused) == 1:
+        # Una sola operación no necesita secuencia: el motor la ejecuta directamente
+        op, arg = fused[0]
+        if op == OP_MOVE and arg in (LEFT_MOVE, RIGHT_MOVE):
+            return (OP_LEFT if arg == LEFT_MOVE else OP_RIGHT), None
+        return op, arg
+    return OP_SEQUENCE, tuple(fused)
+
+
+def intern_operation(op, arg, symbol_id):
+    """Reemplaza los símbolos del operando por sus ids (con 'symbol_id') y fusiona los bloques compuestos."""
+    if op in (OP_WRITE, OP_SEEK_RIGHT, OP_SEEK_LEFT):
+        return op, symbol_id(arg)
+    if op == OP_SEQUENCE:
+        return fuse_operations([intern_operation(part_op, part_arg, symbol_id) for part_op, part_arg in arg])
+    return op, arg
+
+
+def decode_block(block, blocks=()):
+    """Decodifica un bloque de construcción en (código de operación, operando) una sola vez.
+
+    Un bloque compuesto se decodifica como OP_SEQUENCE con sus partes primitivas sin fusionar
+    (los símbolos todavía son texto; ver intern_operation).
+    """
+    if block not in blocks and not block.startswith(BLOCK_PREFIXES):
+        return OP_ERROR, f"Error: El bloque '{block}' no está definido en la tabla de bloques."
+    try:
+        primitives = expand_block(block, blocks)
+    except ValueError as e:
+        return OP_ERROR, str(e)
+    if primitives != [block]:
+        return OP_SEQUENCE, tuple(decode_block(part, blocks) for part in primitives)
+    if block == "L":
+        return OP_LEFT, None
+    if block == "R":
+        return OP_RIGHT, None
+    if block.startswith("X"):
+        if len(block) != 2:
+            return OP_ERROR, f"Error: El bloque '{block}' debe contener exactamente un carácter adicional."
+        return OP_WRITE, block[1]
+    if block.startswith(("R_", "L_")):
+        if len(block) != 3:
+            return OP_ERROR, f"Error: El bloque '{block}' debe contener exactamente un carácter como símbolo objetivo."
+        return (OP_SEEK_RIGHT if block[0] == "R" else OP_SEEK_LEFT), block[2]
+    if block == "S_l":
+        return OP_SHIFT_LEFT, None
+    if block == "S_r":
+        return OP_SHIFT_RIGHT, None
+    return OP_NOP, None
+
+
+class Alphabet:
+    """Tabla de símbolos internados: id (un byte) <-> símbolo, con el vacío siempre en 0."""
+
+    def __init__(self):
+        self.symbols = [BLANK]  # id -> símbolo
+        self.symbol_ids = {BLANK: BLANK_ID}
+
+    @property
+    def n_symbols(self):
+        return len(self.symbols)
+
+    def symbol_id(self, symbol):
+        """Devuelve el id de un símbolo, internándolo si todavía no existe."""
+        sym = self.symbol_ids.get(symbol)
+        if sym is None:
+            sym = len(self.symbols)
+            if sym >= MAX_SYMBOLS:
+                raise ValueError(f"La máquina no puede usar más de {MAX_SYMBOLS} símbolos distintos.")
+            self.symbols.append(symbol)
+            self.symbol_ids[symbol] = sym
+        return sym
+
+
+class CompiledMachine(Alphabet):
+    """Tabla de transiciones compilada: estados y símbolos internados y despacho denso por índice."""
+
+    def __init__(self):
+        super().__init__()
+        self.states = [HALT]  # id -> nombre de estado
+        self.state_ids = {HALT: HALT_ID}
+        self.pause = [False]  # Estados cuyo nombre empieza con 'pause'
+        self.transitions = []  # id de transición -> (op, operando, siguiente estado, id de transición)
+        self.keys = []  # id de transición -> (id de estado, id de símbolo)
+        self.blocks = []  # id de transición -> texto original del bloque
+        self.table = []  # estado * n_symbols + símbolo -> registro de transición o None
+        self._macro_table = None  # Caché de macro_table
+        self.generated_source = None  # Código generado por codegen.generate_source (viaja con la máquina al guardarla)
+        self._generated = None  # Función compilada a partir de generated_source
+
+    @property
+    def n_states(self):
+        return len(self.states)
+
+    def _intern_state(self, name):
+        state = self.state_ids.get(name)
+        if state is None:
+            state = len(self.states)
+            self.states.append(name)
+            self.state_ids[name] = state
+            self.pause.append(name.startswith("pause"))
+        return state
+
+    def state_id(self, name):
+        """Devuelve el id de un estado, internándolo si todavía no existe."""
+        n_states = self.n_states
+        state = self._intern_state(name)
+        if state == n_states:
+            self.table.extend([None] * self.n_symbols)
+            self._invalidate()
+        return state
+
+    def symbol_id(self, symbol):
+        """Devuelve el id de un símbolo, internándolo (y ensanchando la tabla) si no existe."""
+        n_symbols = self.n_symbols
+        sym = super().symbol_id(symbol)
+        if sym == n_symbols:
+            self._build_table()
+        return sym
+
+    def _invalidate(self):
+        """Descarta lo derivado de la tabla (macro-pasos y código generado) tras un cambio."""
+        self._macro_table = None
+        self.generated_source = None
+        self._generated = None
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state["_generated"] = None  # Las funciones no se pueden guardar; se recompilan desde el código
+        return state
+
+    def _build_table(self):
+        n_symbols = self.n_symbols
+        self.table = [None] * (self.n_states * n_symbols)
+        for record, (state, sym) in zip(self.transitions, self.keys):
+            self.table[state * n_symbols + sym] = record
+        self._invalidate()
+
+    def add_transition(self, state, symbol, block, next_state, blocks=()):
+        op, arg = intern_operation(*decode_block(block, blocks), self.symbol_id)
+        key = (self.state_id(state), self.symbol_id(symbol))
+        record = (op, arg, self.state_id(next_state), len(self.transitions))
+        self.transitions.append(record)
+        self.keys.append(key)
+        self.blocks.append(block)
+        self.table[key[0] * self.n_symbols + key[1]] = record
+        self._invalidate()
+
+    def add_transitions(self, rows, blocks=()):
+        """Agrega transiciones (estado, símbolo, bloque, siguiente estado) de un iterable, armando la tabla una vez.
+
+        Las filas se consumen de a una (sirve para compilar mientras se lee un archivo). Una
+        transición repetida reemplaza a la anterior, igual que en un diccionario.
+        """
+        tids = {key: tid for tid, key in enumerate(self.keys)}
+        symbol_id = super().symbol_id  # Sin rearmar la tabla por cada símbolo nuevo
+        for state, symbol, block, next_state in rows:
+            sym = symbol_id(symbol)
+            op, arg = intern_operation(*decode_block(block, blocks), symbol_id)
+            key = (self._intern_state(state), sym)
+            tid = tids.get(key)
+            if tid is None:
+                tid = tids[key] = len(self.transitions)
+                self.transitions.append((op, arg, self._intern_state(next_state), tid))
+                self.keys.append(key)
+                self.blocks.append(block)
+            else:
+                self.transitions[tid] = (op, arg, self._intern_state(next_state), tid)
+                self.blocks[tid] = block
+        self._build_table()
+
+    def macro_table(self):
+        """Tabla de despacho donde los bucles 'mismo estado, sólo mover' se vuelven macro-pasos.
+
+        Para cada estado (salvo los 'pause') se juntan los símbolos con transición L (o R) hacia
+        el mismo estado; esas transiciones se reemplazan por OP_RUN_LEFT / OP_RUN_RIGHT, que
+        recorren de una vez toda la racha de celdas con esos símbolos.
+        """
+        if self._macro_table is None:
+            n_symbols = self.n_symbols
+            loops = {}
+            for (op, arg, next_state, tid), (state, sym) in zip(self.transitions, self.keys):
+                if op in (OP_LEFT, OP_RIGHT) and next_state == state and not self.pause[state]:
+                    loops.setdefault((state, op), []).append(sym)
+            table = list(self.table)
+            for (state, op), syms in loops.items():
+                run_op = OP_RUN_LEFT if op == OP_LEFT else OP_RUN_RIGHT
+                chars = bytes(syms)
+                for sym in syms:
+                    index = state * n_symbols + sym
+                    table[index] = (run_op, chars, state, table[index][3])
+            self._macro_table = table
+        return self._macro_table
+
+    def digest(self):
+        """Hash (32 bytes) de las transiciones compiladas: identifica la máquina en las fotos guardadas.
+
+        Se usan los nombres de estados y símbolos, así que los símbolos que la cinta agregue
+        después de compilar no lo cambian.
+        """
+        rows = [(self.states[state], self.symbols[sym], block, op, arg, self.states[next_state])
+                for (op, arg, next_state, _), (state, sym), block in zip(self.transitions, self.keys, self.blocks)]
+        return hashlib.sha256(repr(rows).encode()).digest()
+
+    def lookup(self, state, sym):
+        """Devuelve el registro de transición para (id de estado, id de símbolo) o None."""
+        return self.table[state * self.n_symbols + sym]
+
+
+def compile_machine(transitions, blocks=()):
+    """Compila un diccionario {(estado, símbolo): (bloque, siguiente estado)} a una CompiledMachine."""
+    machine = CompiledMachine()
+    rows = ((state, symbol, block, next_state) for (state, symbol), (block, next_state) in transitions.items())
+    machine.add_transitions(rows, blocks)
+    return machine
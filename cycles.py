@@ -0,0 +1,66 @@
+from compiler import BLANK_ID
+
+
+def cell_hash(coord, sym):
+    """Aporte de una celda al hash de la cinta (Zobrist): las celdas vacías no aportan nada."""
+    return hash((coord, sym)) if sym != BLANK_ID else 0
+
+
+class CycleDetector:
+    """Detecta configuraciones repetidas con el algoritmo de Brent y memoria acotada.
+
+    Una configuración es (estado, cabezal, borde izquierdo de la cinta, contenido), con
+    posiciones en coordenadas absolutas (tape.origin). El contenido se resume en un hash
+    Zobrist que el motor actualiza en O(1) por escritura; sólo los corrimientos S_l/S_r lo
+    recalculan entero, igual que ya mueven media cinta. Cuando el hash coincide se compara
+    la cinta real, así que un choque de hash no da un falso positivo.
+    """
+
+    def __init__(self):
+        self.tape_hash = 0
+        self.power = 1  # Distancia hasta la próxima foto de la tortuga (Brent)
+        self.lam = 0  # Pasos desde la última foto
+        self.saved_key = None
+        self.saved_cells = None
+        self.step = 0  # Pasos observados
+        self.found = None  # (paso, período) cuando se detecta la repetición
+
+    def rehash(self, buf, start, end, origin):
+        """Recalcula el hash de la cinta completa (al empezar y tras un corrimiento)."""
+        tape_hash = 0
+        for position in range(start, end):
+            sym = buf[position]
+            if sym != BLANK_ID:
+                tape_hash ^= hash((position - origin, sym))
+        self.tape_hash = tape_hash
+
+    def begin(self, state, buf, start, end, origin, pos):
+        """Registra la configuración inicial si el detector todavía no se usó."""
+        if self.saved_key is None:
+            self.rehash(buf, start, end, origin)
+            self._save((state, pos - origin, start - origin, self.tape_hash), buf, start, end)
+
+    def _save(self, key, buf, start, end):
+        self.saved_key = key
+        self.saved_cells = bytes(buf[start:end]).rstrip(b"\0")
+
+    def observe(self, state, buf, start, end, origin, pos):
+        """Registra la configuración luego de un paso. Devuelve True si ya se había visto."""
+        key = (state, pos - origin, start - origin, self.tape_hash)
+        self.step += 1
+        self.lam += 1
+        if key == self.saved_key and bytes(buf[start:end]).rstrip(b"\0") == self.saved_cells:
+            self.found = (self.step, self.lam)
+            return True
+        if self.lam == self.power:
+            self._save(key, buf, start, end)
+            self.power *= 2
+            self.lam = 0
+        return False
+
+    @property
+    def message(self):
+        if self.found is None:
+            return ""
+        step, period = self.found
+        return f"Configuración repetida en el paso {step}, período {period}: la máquina no se detiene."
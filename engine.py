@@ -0,0 +1,477 @@
+import time
+from breakpoints import NO_LIMIT, BreakpointHit
+from cycles import cell_hash
+from compiler import (BLANK_ID, HALT_ID, PAUSE_MESSAGE, OP_LEFT, OP_RIGHT, OP_WRITE, OP_SEEK_RIGHT, OP_SEEK_LEFT,
+                      OP_SHIFT_LEFT, OP_SHIFT_RIGHT, OP_ERROR, OP_RUN_LEFT, OP_RUN_RIGHT, OP_SEQUENCE, OP_MOVE,
+                      OP_WRITE_MOVE, OP_BREAK, OP_CHAIN)
+
+CLOCK_INTERVAL = 4096  # Pasos entre consultas al reloj cuando hay tiempo límite
+MAX_RUN = 1 << 20  # Tope de pasos de un macro-paso que no termina (más allá, execute sale con motivo "endless")
+
+
+def seek_error(machine, target, direction):
+    symbol = machine.symbols[target]
+    return f"Error: El símbolo '{symbol}' no se encontró en la cinta hacia la {direction}."
+
+
+def endless_message(machine, state):
+    name = machine.states[state]
+    return f"El estado '{name}' mueve el cabezal sin fin sobre la misma racha: la máquina no se detiene."
+
+
+def seek_right(machine, tape, pos, target, profiler=None):
+    """R_?: lleva el cabezal (posición absoluta en tape.buf) al próximo 'target'; devuelve (pos, error)."""
+    buf = tape.buf
+    end = tape.end
+    before = pos
+    error = None
+    # Una sola búsqueda en C sobre el buffer: O(distancia), sin copias por celda
+    found = buf.find(target, pos + 1, end)
+    if found >= 0:
+        pos = found
+    elif target == BLANK_ID or (pos == end - 1 and buf[pos] == target):
+        # Más allá del final todo es vacío: se agrega una celda a la derecha
+        if target != BLANK_ID:
+            error = seek_error(machine, target, "derecha")
+        pos = end
+        tape.grow_right()
+        if profiler is not None:
+            profiler.grown_right += 1
+    else:
+        if buf[pos] == target:
+            pos += 1  # El símbolo sólo estaba bajo el cabezal: avanza antes de fallar
+        error = seek_error(machine, target, "derecha")
+    if profiler is not None:
+        profiler.seek_right_travel += pos - before
+    return pos, error
+
+
+def seek_left(machine, tape, pos, target, profiler=None):
+    """L_?: lleva el cabezal al 'target' anterior; devuelve (pos, error). Puede agrandar la cinta a la izquierda."""
+    buf = tape.buf
+    start = tape.start
+    before = pos - start
+    error = None
+    found = buf.rfind(target, start, pos)
+    if found >= 0:
+        pos = found
+    elif target == BLANK_ID or (pos == start and buf[pos] == target):
+        # Antes del inicio todo es vacío: se agrega una celda a la izquierda
+        if target != BLANK_ID:
+            error = seek_error(machine, target, "izquierda")
+        tape.grow_left()
+        pos = start = tape.start
+        before += 1  # Al crecer a la izquierda los índices lógicos se corren uno
+        if profiler is not None:
+            profiler.grown_left += 1
+    else:
+        if buf[pos] == target:
+            pos -= 1  # El símbolo sólo estaba bajo el cabezal: retrocede antes de fallar
+        error = seek_error(machine, target, "izquierda")
+    if profiler is not None:
+        profiler.seek_left_travel += before - (pos - start)
+    return pos, error
+
+
+def shift_left(tape, pos, profiler=None):
+    """S_l: elimina la celda del cabezal moviendo en bloque el lado más corto de la cinta; devuelve pos."""
+    head = pos - tape.start
+    if profiler is not None:
+        profiler.shifted_cells += min(head, tape.end - pos - 1)
+    tape.delete(pos)
+    pos = tape.start + head
+    if pos == tape.end:
+        tape.grow_right()
+    return pos
+
+
+def shift_right(tape, pos, profiler=None):
+    """S_r: elimina la celda del cabezal y lo retrocede una celda (la cinta crece si sale por la izquierda)."""
+    head = pos - tape.start - 1
+    if profiler is not None:
+        profiler.shifted_cells += min(head + 1, tape.end - pos - 1)
+    tape.delete(pos)
+    if head < 0:
+        tape.grow_left()
+        head = 0
+        if profiler is not None:
+            profiler.grown_left += 1
+    return tape.start + head
+
+
+def move_head(tape, pos, move, profiler=None):
+    """Aplica una racha de L/R fusionada (ver compiler.OP_MOVE) de una sola vez; devuelve pos."""
+    offset, floor, reach, reach_floor = move
+    start = tape.start
+    top = max(pos + reach, start + reach_floor)
+    if top >= tape.end:
+        # Las celdas que la racha visitó más allá del final quedan en la cinta como vacíos
+        if profiler is not None:
+            profiler.grown_right += top + 1 - tape.end
+        tape.end = top + 1
+        if tape.end > len(tape.buf):
+            tape.buf.extend(bytes(max(len(tape.buf), tape.end - len(tape.buf))))
+    return max(pos + offset, start + floor)
+
+
+def run_sequence(machine, tape, operations, pos, profiler=None):
+    """Ejecuta las micro-operaciones de un bloque compuesto (OP_SEQUENCE); devuelve (pos, error).
+
+    Un error corta la secuencia en esa parte, igual que si el bloque primitivo fallara solo.
+    """
+    buf = tape.buf
+    for op, arg in operations:
+        if op == OP_WRITE_MOVE:
+            buf[pos] = arg[0]
+            pos = move_head(tape, pos, arg[1:], profiler)
+        elif op == OP_MOVE:
+            pos = move_head(tape, pos, arg, profiler)
+        elif op == OP_WRITE:
+            buf[pos] = arg
+        elif op == OP_SEEK_RIGHT:
+            pos, error = seek_right(machine, tape, pos, arg, profiler)
+            if error is not None:
+                return pos, error
+        elif op == OP_SEEK_LEFT:
+            pos, error = seek_left(machine, tape, pos, arg, profiler)
+            if error is not None:
+                return pos, error
+        elif op == OP_SHIFT_LEFT:
+            pos = shift_left(tape, pos, profiler)
+        elif op == OP_SHIFT_RIGHT:
+            pos = shift_right(tape, pos, profiler)
+        elif op == OP_ERROR:
+            return pos, arg
+    return pos, None
+
+
+def run_chain(machine, tape, links, pos, profiler=None):
+    """Ejecuta de a uno los eslabones (operaciones, estado) de una cadena cortada por el límite de pasos.
+
+    Devuelve (pos, estado intermedio en el que quedó la máquina); los eslabones sólo
+    escriben y mueven, así que no hay errores posibles.
+    """
+    state = None
+    for operations, state in links:
+        pos, _ = run_sequence(machine, tape, operations, pos, profiler)
+    return pos, state
+
+
+def run_length_right(buf, pos, end, chars, budget):
+    """Cantidad de celdas desde pos hacia la derecha (hasta end) cuyos ids están en 'chars'.
+
+    Se recorre en trozos que se duplican, así el costo es O(largo de la racha) aunque la
+    cinta sea mucho más larga.
+    """
+    count = 0
+    chunk = 64
+    while pos + count < end and count < budget:
+        piece = buf[pos + count:min(end, pos + count + chunk)]
+        rest = len(piece.lstrip(chars))
+        count += len(piece) - rest
+        if rest:
+            break
+        chunk *= 2
+    return count
+
+
+def run_length_left(buf, start, pos, chars, budget):
+    """Cantidad de celdas desde pos hacia la izquierda (hasta start) cuyos ids están en 'chars'."""
+    count = 0
+    chunk = 64
+    while pos - count >= start and count < budget:
+        piece = buf[max(start, pos - count - chunk + 1):pos - count + 1]
+        rest = len(piece.rstrip(chars))
+        count += len(piece) - rest
+        if rest:
+            break
+        chunk *= 2
+    return count
+
+
+def execute(machine, tape, head, state, max_steps=None, deadline=None, stop_on_pause=True, accelerate=False,
+            detector=None, profiler=None, tracer=None, breakpoints=None):
+    """Bucle de ejecución sobre una CompiledMachine y una Tape cuyo alfabeto es esa máquina.
+
+    Con accelerate se usa machine.macro_table(): las rachas de un estado que gira sobre sí
+    mismo moviendo el cabezal se saltan de una vez, contando igualmente cada paso. Una racha
+    que no termina nunca (vacíos hacia la derecha, o la celda 0 hacia la izquierda) termina
+    el bucle con motivo "endless" salvo que el límite de pasos quede a menos de MAX_RUN.
+    Con un CycleDetector se observa cada configuración (sin macro-pasos) y el bucle termina
+    con motivo "cycle" en cuanto una se repite.
+    Con un Profiler se cuentan transiciones (sin macro-pasos, así cada celda de una racha se
+    atribuye a la transición de su símbolo), recorridos de R_/L_, celdas movidas por S_l/S_r
+    y crecimiento de la cinta; sin él, el único costo por paso es la prueba de 'watch'.
+    Con un TraceRecorder se registra cada paso (sin macro-pasos) para poder volver atrás.
+    Con Breakpoints el bucle termina con motivo "breakpoint" exactamente en el punto de
+    parada; las transiciones comunes siguen sin costo extra (ver CompiledBreakpoints).
+    Devuelve (motivo, estado, cabezal, pasos, mensaje); el mensaje es None si ningún paso
+    se ejecutó, y la cinta se modifica en el lugar.
+    """
+    table = machine.macro_table() if accelerate else machine.table
+    n_symbols = machine.n_symbols
+    pause = machine.pause
+    # Un solo arreglo para cortar el bucle: el motivo de detención al entrar a cada estado (o None)
+    stop = [None] * machine.n_states
+    if stop_on_pause:
+        stop = ["pause" if flag else None for flag in pause]
+    stop[HALT_ID] = "halt"
+    watched = None
+    max_length = NO_LIMIT
+    limit = -1 if max_steps is None else max_steps
+    perf_counter = time.perf_counter
+    # El bucle trabaja con posiciones absolutas dentro de tape.buf; fuera de [start, end) todo es vacío
+    buf = tape.buf
+    start = tape.start
+    end = tape.end
+    pos = start + head
+    steps = 0
+    next_check = 0
+    error = None
+
+    if state == HALT_ID:
+        return "halt", state, head, steps, None
+    origin = tape.origin
+    if detector is not None:
+        table = machine.table  # Cada configuración tiene que observarse
+        detector.begin(state, buf, start, end, origin, pos)
+    if profiler is not None:
+        table = machine.table  # Cada paso tiene que contarse en la transición de su símbolo
+    if tracer is not None:
+        table = machine.table  # Cada paso tiene que quedar en la traza
+        tracer.begin(state, buf, start, end, origin, pos)
+    if breakpoints is not None:
+        # Compilados sobre la misma tabla (con o sin macro-pasos) que va a usar el bucle
+        watched = breakpoints.compile(machine, table is not machine.table)
+        table = watched.table
+        stop = watched.stop_flags(stop_on_pause)
+        if end - start <= watched.max_length:
+            max_length = watched.max_length  # Si la cinta ya era más larga, el umbral ya se cruzó
+    watch = detector is not None or profiler is not None or tracer is not None
+
+    while True:
+        if steps == limit:
+            status = "max_steps"
+            break
+        # Consultar el reloj cada CLOCK_INTERVAL pasos para no frenar el bucle
+        if deadline is not None and steps >= next_check:
+            next_check = steps + CLOCK_INTERVAL
+            if perf_counter() >= deadline:
+                status = "time_budget"
+                break
+        record = table[state * n_symbols + buf[pos]]
+        if record is None:
+            status = "no_transition"
+            break
+        op, arg, state, tid = record
+        steps += 1
+
+        if op == OP_LEFT:
+            if pos > start:
+                pos -= 1
+        elif op == OP_RIGHT:
+            pos += 1
+            if pos == end:
+                end += 1
+                if end > len(buf):
+                    buf.extend(bytes(len(buf)))
+                if profiler is not None:
+                    profiler.grown_right += 1
+                if end - start > max_length:
+                    error = watched.length_hit(end - start)
+        elif op == OP_WRITE:
+            if detector is not None:
+                detector.tape_hash ^= cell_hash(pos - origin, buf[pos]) ^ cell_hash(pos - origin, arg)
+            buf[pos] = arg
+        elif op == OP_WRITE_MOVE:
+            # Bloque compuesto fusionado en escritura + racha de L/R (ver compiler.OP_MOVE)
+            sym, offset, floor, reach, reach_floor = arg
+            if detector is not None:
+                detector.tape_hash ^= cell_hash(pos - origin, buf[pos]) ^ cell_hash(pos - origin, sym)
+            buf[pos] = sym
+            top = pos + reach
+            if top < start + reach_floor:
+                top = start + reach_floor
+            pos += offset
+            if pos < start + floor:
+                pos = start + floor
+            if top >= end:
+                if profiler is not None:
+                    profiler.grown_right += top + 1 - end
+                end = top + 1
+                if end > len(buf):
+                    buf.extend(bytes(max(len(buf), end - len(buf))))
+                if end - start > max_length:
+                    error = watched.length_hit(end - start)
+        elif op == OP_MOVE:
+            offset, floor, reach, reach_floor = arg
+            top = pos + reach
+            if top < start + reach_floor:
+                top = start + reach_floor
+            pos += offset
+            if pos < start + floor:
+                pos = start + floor
+            if top >= end:
+                if profiler is not None:
+                    profiler.grown_right += top + 1 - end
+                end = top + 1
+                if end > len(buf):
+                    buf.extend(bytes(max(len(buf), end - len(buf))))
+                if end - start > max_length:
+                    error = watched.length_hit(end - start)
+        elif op == OP_CHAIN:
+            # Transiciones encadenadas por optimizer.py: cuentan como los pasos originales
+            sym, move, count, links = arg
+            if limit < 0 or limit - steps >= count - 1:
+                # La cadena entera es una escritura y una racha, como OP_WRITE_MOVE
+                if sym is not None:
+                    buf[pos] = sym
+                offset, floor, reach, reach_floor = move
+                top = pos + reach
+                if top < start + reach_floor:
+                    top = start + reach_floor
+                pos += offset
+                if pos < start + floor:
+                    pos = start + floor
+                if top >= end:
+                    if profiler is not None:
+                        profiler.grown_right += top + 1 - end
+                    end = top + 1
+                    if end > len(buf):
+                        buf.extend(bytes(max(len(buf), end - len(buf))))
+                steps += count - 1
+            else:
+                # El límite cae en el medio de la cadena: se ejecutan sólo los eslabones que entran
+                tape.start, tape.end = start, end
+                pos, state = run_chain(machine, tape, links[:limit - steps + 1], pos, profiler)
+                start, end, origin = tape.start, tape.end, tape.origin
+                steps = limit
+        elif op == OP_SEEK_RIGHT:
+            tape.end = end
+            pos, error = seek_right(machine, tape, pos, arg, profiler)
+            end = tape.end
+            if error is None and end - start > max_length:
+                error = watched.length_hit(end - start)
+        elif op == OP_SEEK_LEFT:
+            tape.start, tape.end = start, end
+            pos, error = seek_left(machine, tape, pos, arg, profiler)
+            start, end, origin = tape.start, tape.end, tape.origin
+            if error is None and end - start > max_length:
+                error = watched.length_hit(end - start)
+        elif op == OP_SHIFT_LEFT:
+            tape.start, tape.end = start, end
+            pos = shift_left(tape, pos, profiler)
+            start, end = tape.start, tape.end
+            if detector is not None:
+                detector.rehash(buf, start, end, origin)
+        elif op == OP_SHIFT_RIGHT:
+            tape.start, tape.end = start, end
+            pos = shift_right(tape, pos, profiler)
+            start, end, origin = tape.start, tape.end, tape.origin
+            if detector is not None:
+                detector.rehash(buf, start, end, origin)
+        elif op == OP_SEQUENCE:
+            # Bloque compuesto: todas sus partes cuentan como un solo paso
+            tape.start, tape.end = start, end
+            pos, error = run_sequence(machine, tape, arg, pos, profiler)
+            start, end, origin = tape.start, tape.end, tape.origin
+            if detector is not None:
+                detector.rehash(buf, start, end, origin)
+            if error is None and end - start > max_length:
+                error = watched.length_hit(end - start)
+        elif op == OP_RUN_RIGHT:
+            pos += 1
+            if pos == end:
+                end += 1
+                if end > len(buf):
+                    buf.extend(bytes(len(buf)))
+            if buf[pos] in arg and steps != limit:
+                # Macro-paso: la racha sigue, se recorre de una vez y se suman todos sus pasos
+                budget = limit - steps if limit >= 0 else MAX_RUN
+                count = run_length_right(buf, pos, end, arg, budget)
+                if pos + count >= end and BLANK_ID in arg:
+                    # Más allá del final todo es vacío: la racha no termina
+                    if limit < 0 or budget > MAX_RUN:
+                        status = "endless"  # Recorrerla agrandaría la cinta sin fin
+                        break
+                    count = budget
+                count = min(count, budget)
+                steps += count
+                pos += count
+                if pos >= end:
+                    end = pos + 1
+                    if end > len(buf):
+                        buf.extend(bytes(max(len(buf), end - len(buf))))
+        elif op == OP_RUN_LEFT:
+            if pos > start:
+                pos -= 1
+            if buf[pos] in arg and steps != limit:
+                budget = limit - steps if limit >= 0 else MAX_RUN
+                count = run_length_left(buf, start, pos, arg, budget)
+                if pos - count < start:
+                    # El cabezal queda trabado en la celda 0 (L no crece a la izquierda)
+                    if limit < 0 or budget > MAX_RUN:
+                        status = "endless"
+                        break
+                    count = budget
+                count = min(count, budget)
+                steps += count
+                pos = max(start, pos - count)
+        elif op == OP_ERROR:
+            error = arg
+        elif op == OP_BREAK:
+            # Transición vigilada por un punto de parada: se ejecuta la operación original
+            op, arg, operations, current, before, writes = arg
+            if before and steps > 1:
+                # Parar antes de la transición (el primer paso de la llamada es retomar desde ella)
+                steps -= 1
+                state = current
+                status = "breakpoint"
+                error = watched.transition_hit(current, buf[pos])
+                break
+            coord = pos - origin
+            cells = watched.watched(buf, start, end, origin) if writes else None
+            tape.start, tape.end = start, end
+            pos, error = run_sequence(machine, tape, operations, pos, profiler)
+            start, end, origin = tape.start, tape.end, tape.origin
+            if detector is not None:
+                detector.rehash(buf, start, end, origin)
+            if error is None and writes:
+                error = watched.write_hit(op, coord, cells, buf, start, end, origin)
+            if error is None and end - start > max_length:
+                error = watched.length_hit(end - start)
+
+        if watch:
+            if profiler is not None:
+                profiler.hits[tid] += 1
+            if tracer is not None:
+                failed = error is not None and error.__class__ is not BreakpointHit
+                tracer.record(tid, op, arg, HALT_ID if failed else state, buf, start, end, origin, pos)
+            if (detector is not None and error is None and not stop[state]
+                    and detector.observe(state, buf, start, end, origin, pos)):
+                status = "cycle"
+                break
+        if error is not None:
+            if error.__class__ is BreakpointHit:
+                status = "breakpoint"  # El paso se completó; la máquina sigue en su estado
+            else:
+                state = HALT_ID
+                status = "halt"
+            break
+        if stop[state]:
+            status = stop[state]
+            break
+
+    tape.start, tape.end = start, end
+    head = pos - start
+    if error is not None:
+        return status, state, head, steps, error
+    if status == "cycle":
+        return status, state, head, steps, detector.message
+    if status == "endless":
+        return status, state, head, steps, endless_message(machine, state)
+    if status == "breakpoint":
+        return status, state, head, steps, watched.state_message(state)
+    if steps == 0:
+        return status, state, head, steps, None
+    return status, state, head, steps, PAUSE_MESSAGE if pause[state] else ""
@@ -0,0 +1,179 @@
+import csv
+import hashlib
+import io
+import os
+import pickle
+import tempfile
+import compiler
+from compiler import CompiledMachine
+CACHE_DIR = os.environ.get("TURING_CACHE_DIR", os.path.join(os.path.expanduser("~"), ".cache", "turing_machine"))
+
+
+def source_version(*modules):
+    """Hash del código de los módulos: cambia solo cuando cambia lo que se guarda en la caché."""
+    digest = hashlib.sha256()
+    for module in modules:
+        with open(module, mode="rb") as file:
+            digest.update(file.read())
+    return digest.hexdigest()
+
+
+# Las entradas guardadas son MachineDefinition y CompiledMachine: si cambia su código, la caché vieja no se usa
+CACHE_VERSION = source_version(__file__, compiler.__file__)
+
+
+class MachineDefinition:
+    """Máquina leída de un CSV: cinta, estado inicial, cabezal, transiciones y su forma compilada."""
+
+    def __init__(self, transitions, tape, initial_state, head_position, compiled, digest):
+        self.transitions = transitions
+        self.tape = tape
+        self.initial_state = initial_state
+        self.head_position = head_position
+        self.compiled = compiled
+        self.digest = digest  # Hash del contenido del CSV (y de la tabla de bloques)
+
+    def as_tuple(self):
+        return self.transitions, self.tape, self.initial_state, self.head_position
+
+
+def check_head_position(head_position, tape):
+    """Da ValueError si el cabezal no cae dentro de la cinta."""
+    if head_position < 0 or head_position >= len(tape):
+        raise ValueError(f"La posición inicial del cabezal '{head_position}' está fuera de los límites de la cinta.")
+
+
+def parse_machine(file, blocks=()):
+    """Lee, valida y compila en una sola pasada un CSV de máquina abierto en modo texto.
+
+    Devuelve (transiciones, cinta, estado inicial, cabezal, CompiledMachine); los errores de
+    formato se informan con ValueError.
+    """
+    transitions = {}
+    tape = []  # Por defecto, cinta vacía
+    initial_state = None  # Estado inicial predeterminado
+    head_position = None  # Posición inicial del cabezal
+
+    def transition_rows():
+        nonlocal tape, initial_state, head_position
+        for row_index, row in enumerate(csv.reader(file)):
+            if not row:
+                raise ValueError(f"Formato inválido en la línea {row_index + 1}: {row}")
+
+            # Validar la cinta inicial
+            if row[0] == "tape":
+                tape = list(row[1]) if len(row) > 1 and row[1].strip() else []
+                if not tape:
+                    raise ValueError(f"La cinta inicial en la línea {row_index + 1} está vacía.")
+
+            # Leer estado inicial
+            elif row[0] == "initial_state":
+                if len(row) != 2 or not row[1].strip():
+                    raise ValueError(f"El estado inicial está mal definido en la línea {row_index + 1}.")
+                initial_state = row[1].strip()
+
+            elif row[0] == "head_position":
+                if len(row) != 2 or not row[1].isdigit():
+                    raise ValueError(f"La posición inicial del cabezal está mal definida en la línea {row_index + 1}.")
+                head_position = int(row[1])
+                check_head_position(head_position, tape)
+
+            # Validar transiciones y pasarlas directamente al compilador
+            elif len(row) == 4:  # Debe tener exactamente 4 columnas
+                if not row[0].strip() or not row[1].strip() or not row[2].strip() or not row[3].strip():
+                    raise ValueError(f"Estado o símbolo vacío en la línea {row_index + 1}.")
+                transitions[(row[0], row[1])] = (row[2], row[3])
+                yield row
+
+            # Formato inválido
+            else:
+                raise ValueError(f"Formato inválido en la línea {row_index + 1}: {row}")
+
+    compiled = CompiledMachine()
+    compiled.add_transitions(transition_rows(), blocks)
+
+    # Validaciones finales
+    if not tape:
+        raise ValueError("No se encontró una línea de cinta ('tape') en el archivo CSV.")
+    if not initial_state:
+        raise ValueError("No se encontró el estado inicial ('initial_state') en el archivo CSV.")
+    if head_position is None:
+        raise ValueError("No se encontró la posición inicial del cabezal ('head_position') en el archivo CSV.")
+    if not transitions:
+        raise ValueError("No se encontró transiciones en el archivo CSV.")
+
+    return transitions, tape, initial_state, head_position, compiled
+
+
+def content_digest(data, blocks=()):
+    """Hash del contenido de un CSV; incluye la tabla de bloques (nombres y acciones) porque cambia la compilación."""
+    digest = hashlib.sha256(data)
+    entries = sorted(blocks.items()) if isinstance(blocks, dict) else sorted(blocks)
+    digest.update(repr((CACHE_VERSION, entries)).encode())
+    return digest.hexdigest()
+
+
+def read_cache(digest, cache_dir):
+    try:
+        with open(os.path.join(cache_dir, digest + ".pickle"), mode="rb") as file:
+            return pickle.load(file)
+    except (OSError, EOFError, pickle.UnpicklingError):
+        return None  # No está o está incompleta: se vuelve a parsear
+
+
+def write_cache(definition, cache_dir):
+    """Guarda la máquina compilada de forma atómica (archivo temporal + rename); los errores se ignoran."""
+    try:
+        os.makedirs(cache_dir, exist_ok=True)
+        descriptor, temporary = tempfile.mkstemp(dir=cache_dir, suffix=".tmp")
+        with os.fdopen(descriptor, mode="wb") as file:
+            pickle.dump(definition, file, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(temporary, os.path.join(cache_dir, definition.digest + ".pickle"))
+    except OSError:
+        pass
+
+
+def load_machine(filepath, blocks=(), cache_dir=CACHE_DIR):
+    """Carga una máquina desde un CSV usando la caché en disco (cache_dir=None la desactiva).
+
+    La clave es el hash del contenido, así que un archivo modificado se vuelve a compilar y
+    dos copias idénticas comparten la misma entrada.
+    """
+    with open(filepath, mode="rb") as file:
+        data = file.read()
+    digest = content_digest(data, blocks)
+    definition = read_cache(digest, cache_dir) if cache_dir is not None else None
+    if definition is None:
+        transitions, tape, initial_state, head_position, compiled = parse_machine(
+            io.TextIOWrapper(io.BytesIO(data), newline=""), blocks)
+        definition = MachineDefinition(transitions, tape, initial_state, head_position, compiled, digest)
+        if cache_dir is not None:
+            write_cache(definition, cache_dir)
+    return definition
+
+
+def load_csv_as_dict(filepath):
+    """Carga un archivo CSV de máquina (cinta, estado inicial, cabezal y transiciones) y lo valida."""
+    return load_machine(filepath).as_tuple()
+
+
+def load_transition_table(filename):
+    """Lee una tabla de sólo transiciones (estado, símbolo, bloque, siguiente estado por fila)."""
+    transition_table = {}
+    with open(filename, mode='r') as file:
+        csv_reader = csv.reader(file)
+        for row in csv_reader:
+            current_state, read_symbol, construction_block, next_state = row
+            transition_table[(current_state, read_symbol)] = (construction_block, next_state)
+    return transition_table
+
+
+def load_blocks_table(filename):
+    """Lee la tabla de bloques (bloque, acción por fila)."""
+    blocks_table = {}
+    with open(filename, mode='r') as file:
+        csv_reader = csv.reader(file)
+        for row in csv_reader:
+            block, action = row
+            blocks_table[block] = action
+    return blocks_table
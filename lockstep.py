@@ -0,0 +1,181 @@
+import time
+from compiler import HALT_ID, PAUSE_MESSAGE, OP_NOP, OP_LEFT, OP_RIGHT, OP_WRITE, OP_ERROR
+from engine import CLOCK_INTERVAL, execute
+from loader import check_head_position
+from tape import Tape
+from turing_machine import RunResult
+
+try:
+    import numpy as np
+except ImportError:  # NumPy es opcional: sólo lo necesita este motor
+    np = None
+
+NO_TRANSITION = 255  # Código de operación de las casillas vacías de la tabla
+
+
+def build_tables(machine):
+    """Pasa la tabla de despacho de la CompiledMachine a arreglos de NumPy indexados por estado * n_symbols + símbolo.
+
+    Devuelve (operación, movimiento del cabezal, símbolo que queda en la celda, siguiente
+    estado, id de transición, casilla ejecutable en lote). El símbolo que queda es el operando
+    de X o el mismo que se leyó, así cada paso escribe sin máscaras; un bloque inválido lleva
+    directamente a 'halt'.
+    """
+    size = len(machine.table)
+    n_symbols = machine.n_symbols
+    ops = np.full(size, NO_TRANSITION, dtype=np.uint8)
+    moves = np.zeros(size, dtype=np.int64)
+    written = np.arange(size, dtype=np.int64) % n_symbols
+    next_states = np.zeros(size, dtype=np.int64)
+    tids = np.zeros(size, dtype=np.int64)
+    for index, record in enumerate(machine.table):
+        if record is not None:
+            op, arg, next_state, tid = record
+            ops[index] = op
+            if op == OP_LEFT:
+                moves[index] = -1
+            elif op == OP_RIGHT:
+                moves[index] = 1
+            elif op == OP_WRITE:
+                written[index] = arg
+            next_states[index] = HALT_ID if op == OP_ERROR else next_state
+            tids[index] = tid
+    plain = np.isin(ops, (OP_NOP, OP_LEFT, OP_RIGHT, OP_WRITE))
+    return ops, moves, written.astype(np.uint8), next_states, tids, plain
+
+
+def run_lockstep(machine, tapes, head_positions=0, initial_state=None, max_steps=None, stop_on_pause=True,
+                 time_budget=None):
+    """Ejecuta una CompiledMachine sobre muchas cintas a la vez y devuelve un RunResult por cinta.
+
+    Las cintas viven en una matriz uint8 (una fila por cinta) y el estado y el cabezal de cada
+    una en vectores; en cada paso se aplica la tabla a todas las cintas activas con
+    gather/scatter. L, R, X, los bloques sin efecto y los inválidos se ejecutan en lote; una
+    cinta que llega a un R_, L_, S_l o S_r sale del lote y termina en el motor escalar
+    (execute), así que los resultados son los mismos que con TuringMachine.run. Con
+    time_budget, las cintas que siguen corriendo al agotarse el tiempo terminan con motivo
+    "time_budget"; cada una tiene el tiempo entero (el que pasa otra en el motor escalar no
+    cuenta). Un cabezal fuera de su cinta da ValueError.
+    """
+    if np is None:
+        raise ImportError("El motor en lote necesita NumPy (pip install numpy).")
+    start_time = time.perf_counter()
+    deadline = start_time + time_budget if time_budget is not None else None
+    count = len(tapes)
+    if isinstance(head_positions, int):
+        head_positions = [head_positions] * count
+    for tape, head_position in zip(tapes, head_positions):
+        check_head_position(head_position, tape)
+    rows = [bytes(machine.symbol_id(symbol) for symbol in tape) for tape in tapes]
+    start_state = machine.state_id(initial_state) if initial_state is not None else HALT_ID
+    # Después de internar las cintas la tabla ya no cambia
+    ops, moves, written, next_states, tids, plain = build_tables(machine)
+    n_symbols = machine.n_symbols
+    stop = np.array(machine.pause if stop_on_pause else [False] * machine.n_states, dtype=bool)
+    stop[HALT_ID] = True
+
+    width = max([len(row) for row in rows] + [1]) * 2
+    cells = np.zeros((count, width), dtype=np.uint8)
+    for lane, row in enumerate(rows):
+        cells[lane, :len(row)] = np.frombuffer(row, dtype=np.uint8)
+    flat = cells.reshape(-1)
+    length = np.array([len(row) for row in rows], dtype=np.int64)
+    head = np.array(head_positions, dtype=np.int64)
+    state = np.full(count, start_state, dtype=np.int64)
+    steps = np.zeros(count, dtype=np.int64)
+    status = ["halt" if start_state == HALT_ID else None] * count
+    messages = [None] * count
+    scalar = {}  # carril -> (Tape, cabezal) de los que terminaron en el motor escalar
+
+    # Los carriles activos se llevan en arreglos compactos; al terminar se copian a los completos
+    live = np.arange(count) if start_state != HALT_ID else np.arange(0)
+    live_state, live_head, live_length = state[live], head[live], length[live]
+    base = live * width
+    step = 0
+    next_check = 0
+    scalar_time = 0.0  # Segundos en el motor escalar: no se le descuentan al resto de las cintas
+
+    def retire(mask, lane_status):
+        """Copia a los arreglos completos los carriles de 'mask' y los marca con 'lane_status'."""
+        lanes = live[mask]
+        state[lanes] = live_state[mask]
+        head[lanes] = live_head[mask]
+        length[lanes] = live_length[mask]
+        steps[lanes] = step
+        for lane in lanes:
+            status[lane] = lane_status if lane_status is not None else ("halt" if state[lane] == HALT_ID else "pause")
+        return lanes
+
+    while live.size and step != max_steps:
+        # Como en engine.execute, el reloj se consulta cada CLOCK_INTERVAL pasos
+        if deadline is not None and step >= next_check:
+            next_check = step + CLOCK_INTERVAL
+            if time.perf_counter() - scalar_time >= deadline:
+                break
+        position = base + live_head
+        index = live_state * n_symbols + flat[position]
+        ready = plain[index]
+        if not ready.all():
+            op = ops[index]
+            missing = op == NO_TRANSITION
+            error = op == OP_ERROR
+            # R_, L_, S_l y S_r: el carril sigue en el motor escalar desde esta misma configuración
+            fallback = ~(ready | missing | error)
+            retire(missing, "no_transition")
+            for lane in retire(fallback, None):
+                lane_start = time.perf_counter()
+                lane_deadline = deadline + scalar_time if deadline is not None else None
+                tape = Tape.from_ids(cells[lane, :length[lane]].tobytes(), machine)
+                remaining = max_steps - step if max_steps is not None else None
+                lane_status, lane_state, lane_head, lane_steps, message = execute(
+                    machine, tape, int(head[lane]), int(state[lane]), remaining, lane_deadline, stop_on_pause)
+                status[lane] = lane_status
+                state[lane] = lane_state
+                steps[lane] += lane_steps
+                messages[lane] = message
+                scalar[lane] = (tape, lane_head)
+                scalar_time += time.perf_counter() - lane_start
+            # Un bloque inválido se ejecuta en lote (no mueve ni escribe y lleva a 'halt'); sólo falta su mensaje
+            for lane, tid in zip(live[error], tids[index[error]]):
+                messages[lane] = machine.transitions[tid][1]
+            keep = ~(missing | fallback)
+            live, live_state, live_head, live_length = live[keep], live_state[keep], live_head[keep], live_length[keep]
+            base, position, index = base[keep], position[keep], index[keep]
+            if not live.size:
+                break
+
+        step += 1
+        flat[position] = written[index]
+        live_head += moves[index]
+        np.maximum(live_head, 0, out=live_head)  # L no crece hacia la izquierda
+        np.maximum(live_length, live_head + 1, out=live_length)  # R agrega una celda vacía al final
+        if live_head.max() >= width:
+            cells = np.concatenate([cells, np.zeros((count, width), dtype=np.uint8)], axis=1)
+            width *= 2
+            flat = cells.reshape(-1)
+            base = live * width
+        live_state = next_states[index]
+
+        done = stop[live_state]
+        if done.any():
+            retire(done, None)
+            keep = ~done
+            live, live_state, live_head, live_length = live[keep], live_state[keep], live_head[keep], live_length[keep]
+            base = base[keep]
+
+    retire(np.ones(live.size, dtype=bool), "max_steps" if step == max_steps else "time_budget")
+
+    elapsed = time.perf_counter() - start_time
+    results = []
+    for lane in range(count):
+        if lane in scalar:
+            tape, lane_head = scalar[lane]
+        else:
+            tape = Tape.from_ids(cells[lane, :length[lane]].tobytes(), machine)
+            lane_head = int(head[lane])
+        message = messages[lane]
+        if message is None:
+            message = "" if steps[lane] == 0 else (PAUSE_MESSAGE if machine.pause[state[lane]] else "")
+        results.append(RunResult(status[lane], machine.states[state[lane]], tape.to_string(), lane_head,
+                                 int(steps[lane]), elapsed, message))
+    return results
@@ -0,0 +1,295 @@
+import argparse
+import sys
+import time
+from compiler import (HALT_ID, LEFT_MOVE, RIGHT_MOVE, OP_NOP, OP_LEFT, OP_RIGHT, OP_WRITE, OP_SEQUENCE, OP_MOVE,
+                      OP_WRITE_MOVE, OP_CHAIN, CompiledMachine, fuse_operations)
+from engine import execute
+from loader import load_blocks_table, load_machine
+from profiler import Profiler
+from tape import Tape
+
+MAX_CHAIN = 32  # Transiciones que se fusionan como máximo en una cadena
+NO_MOVE = (0, 0, 0, 0)  # Racha vacía (ver compiler.OP_MOVE): la cadena sólo escribe
+
+
+class OptimizationReport:
+    """Lo que ahorró optimize_machine (estados quitados y transiciones fusionadas)."""
+
+    def __init__(self, states, reachable, optimized_states, chains, fused_steps):
+        self.states = states  # Estados de la máquina original (sin contar 'halt')
+        self.reachable = reachable  # Estados alcanzables desde el estado inicial
+        self.optimized_states = optimized_states  # Estados después de juntar los equivalentes
+        self.chains = chains  # Transiciones reemplazadas por una cadena fusionada
+        self.fused_steps = fused_steps  # Pasos que esas cadenas ahorran al despacho (uno por eslabón extra)
+
+    @property
+    def pruned(self):
+        return self.states - self.reachable
+
+    @property
+    def merged(self):
+        return self.reachable - self.optimized_states
+
+    def to_dict(self):
+        return {
+            "states": self.states,
+            "reachable": self.reachable,
+            "optimized_states": self.optimized_states,
+            "pruned": self.pruned,
+            "merged": self.merged,
+            "chains": self.chains,
+            "fused_steps": self.fused_steps,
+        }
+
+
+class OptimizedMachine:
+    """Resultado de optimize_machine: la máquina optimizada y cómo se traducen los estados."""
+
+    def __init__(self, machine, state_ids, report):
+        self.machine = machine  # CompiledMachine con los mismos ids de símbolo que la original
+        self.state_ids = state_ids  # Nombre de estado original -> id en la máquina optimizada
+        self.report = report
+
+
+def reachable_states(machine, initial):
+    """Ids de los estados alcanzables desde 'initial' (incluye siempre 'halt')."""
+    seen = {HALT_ID, initial}
+    pending = [initial]
+    n_symbols = machine.n_symbols
+    while pending:
+        state = pending.pop()
+        for record in machine.table[state * n_symbols:(state + 1) * n_symbols]:
+            if record is not None and record[2] not in seen:
+                seen.add(record[2])
+                pending.append(record[2])
+    return seen
+
+
+def equivalent_states(machine, states):
+    """Representante de cada estado de 'states' tras juntar los equivalentes (refinamiento de particiones).
+
+    Dos estados son equivalentes si para cada símbolo hacen el mismo bloque y van a estados
+    equivalentes, como al minimizar un autómata. 'halt' y cada estado 'pause' quedan solos,
+    así una detención en ellos informa el mismo nombre que sin optimizar.
+    """
+    n_symbols = machine.n_symbols
+    rows = {state: machine.table[state * n_symbols:(state + 1) * n_symbols] for state in states}
+    keys = {state: (state,) if state == HALT_ID or machine.pause[state] else () for state in states}
+    classes = renumber(keys)
+    while True:
+        keys = {state: (classes[state], tuple(None if record is None else (record[0], record[1], classes[record[2]])
+                                              for record in rows[state]))
+                for state in states}
+        refined = renumber(keys)
+        if len(set(refined.values())) == len(set(classes.values())):
+            break
+        classes = refined
+    # El representante es el estado de menor id de cada clase
+    representatives = {}
+    for state in sorted(states):
+        representatives.setdefault(classes[state], state)
+    return {state: representatives[classes[state]] for state in states}
+
+
+def renumber(keys):
+    numbers = {}
+    return {state: numbers.setdefault(key, len(numbers)) for state, key in keys.items()}
+
+
+def merged_machine(machine, representatives):
+    """CompiledMachine con sólo los estados representantes (los símbolos conservan sus ids)."""
+    merged = CompiledMachine()
+    merged.symbols = list(machine.symbols)
+    merged.symbol_ids = dict(machine.symbol_ids)
+    for state in sorted(set(representatives.values())):
+        merged._intern_state(machine.states[state])
+    for (op, arg, next_state, tid), (state, sym) in zip(machine.transitions, machine.keys):
+        if representatives.get(state) == state:
+            new_state = merged.state_ids[machine.states[state]]
+            new_next = merged.state_ids[machine.states[representatives[next_state]]]
+            merged.transitions.append((op, arg, new_next, len(merged.transitions)))
+            merged.keys.append((new_state, sym))
+            merged.blocks.append(machine.blocks[tid])
+    merged._build_table()
+    return merged
+
+
+def known_symbol(op, arg, sym):
+    """Id del símbolo bajo el cabezal después de la operación (None si depende de la cinta)."""
+    if op == OP_NOP:
+        return sym
+    if op == OP_WRITE:
+        return arg
+    if op == OP_SEQUENCE and arg[-1][0] == OP_WRITE:
+        return arg[-1][1]
+    return None
+
+
+def micro_operations(op, arg):
+    """Operaciones de una transición tal como las ejecuta engine.run_sequence."""
+    if op == OP_NOP:
+        return ()
+    if op == OP_LEFT:
+        return ((OP_MOVE, LEFT_MOVE),)
+    if op == OP_RIGHT:
+        return ((OP_MOVE, RIGHT_MOVE),)
+    if op == OP_SEQUENCE:
+        return arg
+    return ((op, arg),)
+
+
+def fused_operations(operations):
+    # fuse_operations espera L/R sueltas para juntarlas en rachas
+    plain = []
+    for op, arg in operations:
+        if op == OP_MOVE and arg in (LEFT_MOVE, RIGHT_MOVE):
+            plain.append((OP_LEFT if arg == LEFT_MOVE else OP_RIGHT, None))
+        else:
+            plain.append((op, arg))
+    return micro_operations(*fuse_operations(plain))
+
+
+def is_loop(machine, record, state):
+    """True si el registro es un bucle L/R sobre su estado, que CompiledMachine.macro_table ya acelera."""
+    return record[0] in (OP_LEFT, OP_RIGHT) and record[2] == state and not machine.pause[state]
+
+
+def chain_links(machine, record, sym, uniform):
+    """Registros que siguen deterministamente a 'record' (disparado con el símbolo 'sym').
+
+    La cadena se corta antes del primer paso que ya no se puede juntar con los anteriores
+    en una sola escritura seguida de una racha de L/R.
+    """
+    n_symbols = machine.n_symbols
+    links = []
+    operations = []
+    state = None
+    while True:
+        op, arg, next_state, _ = record
+        candidate = operations + list(micro_operations(op, arg))
+        fused = fused_operations(candidate)
+        if len(fused) > 1 or (fused and fused[0][0] not in (OP_WRITE, OP_MOVE, OP_WRITE_MOVE)):
+            break
+        links.append(record)
+        operations = candidate
+        state = next_state
+        sym = known_symbol(op, arg, sym)
+        if len(links) == MAX_CHAIN or state == HALT_ID or machine.pause[state]:
+            break
+        # El siguiente paso se conoce si se sabe qué símbolo queda bajo el cabezal o si el
+        # estado hace lo mismo con cualquier símbolo
+        record = machine.table[state * n_symbols + sym] if sym is not None else uniform[state]
+        if record is None or is_loop(machine, record, state):
+            break
+    return links
+
+
+def fuse_chain(links):
+    """Operando de OP_CHAIN para una lista de registros: (escritura, racha, pasos, eslabones).
+
+    Toda la cadena es una escritura (o None) seguida de una racha (ver compiler.OP_MOVE),
+    que el motor ejecuta de una vez. Los eslabones son (operaciones, estado) de a un paso,
+    para cuando el límite de pasos cae en el medio (ver engine.run_chain).
+    """
+    sym, move = None, NO_MOVE
+    for op, arg in fused_operations([operation for op, arg, _, _ in links for operation in micro_operations(op, arg)]):
+        if op == OP_WRITE:
+            sym = arg
+        elif op == OP_MOVE:
+            move = arg
+        else:
+            sym, move = arg[0], arg[1:]
+    return sym, move, len(links), tuple((micro_operations(op, arg), state) for op, arg, state, _ in links)
+
+
+def fuse_chains(machine):
+    """Reemplaza las transiciones que encadenan pasos deterministas por un OP_CHAIN; devuelve (cadenas, pasos)."""
+    n_symbols = machine.n_symbols
+    uniform = [None] * machine.n_states
+    for state in range(machine.n_states):
+        row = machine.table[state * n_symbols:(state + 1) * n_symbols]
+        if row[0] is not None and all(record is not None and record[:3] == row[0][:3] for record in row):
+            uniform[state] = row[0]
+    chains = fused_steps = 0
+    fused = []
+    for tid, (record, (state, sym)) in enumerate(zip(machine.transitions, machine.keys)):
+        if is_loop(machine, record, state):
+            continue
+        links = chain_links(machine, record, sym, uniform)
+        if len(links) > 1:
+            chains += 1
+            fused_steps += len(links) - 1
+            block = " ".join(machine.blocks[link[3]] for link in links)
+            fused.append((tid, (OP_CHAIN, fuse_chain(links), links[-1][2], tid), block))
+    # Las cadenas se arman con la tabla original; recién después se reemplazan los registros
+    for tid, record, block in fused:
+        machine.transitions[tid] = record
+        machine.blocks[tid] = block
+    machine._build_table()
+    return chains, fused_steps
+
+
+def optimize_machine(machine, initial_state, fuse=True):
+    """Optimiza una CompiledMachine para ejecutarla desde 'initial_state'; devuelve un OptimizedMachine.
+
+    Se quitan los estados inalcanzables, se juntan los equivalentes y (con fuse) las
+    transiciones que siguen deterministamente por varios pasos se fusionan en una cadena
+    que igual cuenta cada paso. Los símbolos conservan sus ids, así que sirve la misma cinta.
+    """
+    initial = machine.state_id(initial_state)
+    reachable = reachable_states(machine, initial)
+    representatives = equivalent_states(machine, reachable)
+    optimized = merged_machine(machine, representatives)
+    chains, fused_steps = fuse_chains(optimized) if fuse else (0, 0)
+    state_ids = {machine.states[state]: optimized.state_ids[machine.states[representative]]
+                 for state, representative in representatives.items()}
+    report = OptimizationReport(machine.n_states - 1, len(reachable) - 1, optimized.n_states - 1, chains, fused_steps)
+    return OptimizedMachine(optimized, state_ids, report)
+
+
+def dispatches(machine, tape, head, state, max_steps):
+    """(pasos, transiciones despachadas, segundos) de una ejecución sin macro-pasos."""
+    profiler = Profiler(machine)
+    tape = tape.copy()
+    start = time.perf_counter()
+    _, _, _, steps, _ = execute(machine, tape, head, state, max_steps, stop_on_pause=False, profiler=profiler)
+    elapsed = time.perf_counter() - start
+    return steps, sum(profiler.hits), elapsed
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Optimiza la tabla de transiciones de una máquina e informa el ahorro.")
+    parser.add_argument("csv", help="Archivo CSV de la máquina")
+    parser.add_argument("--blocks", metavar="ARCHIVO", default=None, help="Tabla de bloques con bloques compuestos")
+    parser.add_argument("--max-steps", type=int, default=100000, help="Pasos de la ejecución de comparación")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    try:
+        blocks = load_blocks_table(args.blocks) if args.blocks is not None else {}
+        definition = load_machine(args.csv, blocks)
+    except (OSError, ValueError) as e:
+        print(f"Error al cargar archivo: {e}", file=sys.stderr)
+        return 2
+    machine = definition.compiled
+    tape = Tape(definition.tape, machine)
+    optimized = optimize_machine(machine, definition.initial_state)
+    report = optimized.report
+    print(f"Estados: {report.states} -> {report.optimized_states} "
+          f"({report.pruned} inalcanzables, {report.merged} equivalentes)")
+    print(f"Transiciones: {len(machine.transitions)} -> {len(optimized.machine.transitions)}, "
+          f"{report.chains} fusionadas en cadenas ({report.fused_steps} pasos encadenados)")
+    original = dispatches(machine, tape, definition.head_position, machine.state_id(definition.initial_state),
+                          args.max_steps)
+    faster = dispatches(optimized.machine, tape, definition.head_position,
+                        optimized.state_ids[definition.initial_state], args.max_steps)
+    print(f"Pasos: {original[0]} (optimizada: {faster[0]})")
+    print(f"Transiciones despachadas: {original[1]} -> {faster[1]} ({original[1] - faster[1]} pasos ahorrados)")
+    print(f"Tiempo: {original[2]:.6f} s -> {faster[2]:.6f} s")
+    return 0 if original[0] == faster[0] else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
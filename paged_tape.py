@@ -0,0 +1,279 @@
+import mmap
+import os
+import tempfile
+import weakref
+from collections import OrderedDict
+from compiler import BLANK, BLANK_ID, Alphabet
+from tape import Tape
+
+PAGE_SIZE = 1 << 16  # Celdas (bytes) por página; potencia de dos y múltiplo de mmap.ALLOCATIONGRANULARITY
+MAX_PAGES = 64  # Páginas mapeadas a la vez: la memoria residente queda acotada a MAX_PAGES * PAGE_SIZE
+CENTER = 1 << 60  # Posición virtual de la celda 0: la cinta puede crecer muchísimo hacia los dos lados
+
+
+def _close_file(file, path):
+    file.close()
+    try:
+        os.remove(path)
+    except OSError:
+        pass
+
+
+class PagedBuffer:
+    """Arreglo de bytes virtual, todo vacío al principio, guardado en páginas de un archivo mapeado.
+
+    Imita la parte de bytearray que usan el motor y Tape (índices, rebanadas, find, rfind y
+    len), así el bucle de ejecución no cambia. Sólo las páginas escritas ocupan lugar en el
+    archivo; las demás se leen como BLANK_ID. De las páginas escritas se mantienen mapeadas
+    las max_pages usadas más recientemente (LRU); el resto queda en el disco.
+    """
+
+    def __init__(self, directory=None, page_size=PAGE_SIZE, max_pages=MAX_PAGES):
+        if page_size & (page_size - 1) or page_size % mmap.ALLOCATIONGRANULARITY:
+            raise ValueError(f"El tamaño de página debe ser una potencia de dos múltiplo de "
+                             f"{mmap.ALLOCATIONGRANULARITY}.")
+        if max_pages < 1:
+            raise ValueError("Tiene que poder mapearse al menos una página.")
+        descriptor, self.path = tempfile.mkstemp(dir=directory, suffix=".tape")
+        self.file = os.fdopen(descriptor, mode="r+b")
+        self._finalizer = weakref.finalize(self, _close_file, self.file, self.path)
+        self.page_size = page_size
+        self.shift = page_size.bit_length() - 1
+        self.mask = page_size - 1
+        self.max_pages = max_pages
+        self.slots = {}  # Página virtual -> número de página dentro del archivo
+        self.mapped = OrderedDict()  # Página virtual -> mmap, de la menos a la más usada
+        self._page = None  # Última página accedida (atajo para el caso común: el cabezal no cambió de página)
+        self._data = None
+
+    def _map(self, page, create):
+        """mmap de una página virtual (None si nunca se escribió y 'create' es falso)."""
+        data = self.mapped.get(page)
+        if data is not None:
+            self.mapped.move_to_end(page)
+            return data
+        slot = self.slots.get(page)
+        if slot is None:
+            if not create:
+                return None
+            slot = self.slots[page] = len(self.slots)
+            self.file.truncate((slot + 1) * self.page_size)
+        data = mmap.mmap(self.file.fileno(), self.page_size, offset=slot * self.page_size)
+        self.mapped[page] = data
+        if len(self.mapped) > self.max_pages:
+            evicted, old = self.mapped.popitem(last=False)
+            if evicted == self._page:
+                self._page = self._data = None
+            old.close()  # El sistema escribe la página en el archivo
+        return data
+
+    def __len__(self):
+        return 2 * CENTER
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            begin, stop, step = index.indices(2 * CENTER)
+            if step != 1:
+                raise ValueError("Las rebanadas de la cinta paginada no admiten paso.")
+            return self._read(begin, stop)
+        page = index >> self.shift
+        if page != self._page:
+            data = self._map(page, False)
+            if data is None:
+                return BLANK_ID
+            self._page, self._data = page, data
+        return self._data[index & self.mask]
+
+    def __setitem__(self, index, value):
+        if isinstance(index, slice):
+            begin, stop, step = index.indices(2 * CENTER)
+            if step != 1 or stop - begin != len(value):
+                raise ValueError("La cinta paginada sólo admite reemplazar una rebanada por otra del mismo largo.")
+            self._write(begin, value)
+            return
+        page = index >> self.shift
+        if page != self._page:
+            if value == BLANK_ID and page not in self.slots:
+                return  # Una página nunca escrita ya es toda vacía
+            self._page, self._data = page, self._map(page, True)
+        self._data[index & self.mask] = value
+
+    def _chunks(self, begin, stop):
+        """Tramos (página, desde, hasta) de [begin, stop) que no cruzan un borde de página."""
+        while begin < stop:
+            page = begin >> self.shift
+            limit = min(stop, (page + 1) << self.shift)
+            yield page, begin, limit
+            begin = limit
+
+    def _chunks_reversed(self, begin, stop):
+        """Los mismos tramos que _chunks, del último al primero."""
+        while begin < stop:
+            page = (stop - 1) >> self.shift
+            limit = max(begin, page << self.shift)
+            yield page, limit, stop
+            stop = limit
+
+    def _read(self, begin, stop):
+        result = bytearray()
+        for page, low, high in self._chunks(begin, stop):
+            data = self._map(page, False)
+            if data is None:
+                result += bytes(high - low)
+            else:
+                base = page << self.shift
+                result += data[low - base:high - base]
+        return result
+
+    def _write(self, begin, values):
+        offset = 0
+        for page, low, high in self._chunks(begin, begin + len(values)):
+            piece = values[offset:offset + high - low]
+            offset += high - low
+            if page not in self.slots and not any(piece):
+                continue
+            base = page << self.shift
+            self._map(page, True)[low - base:high - base] = piece
+
+    def find(self, sym, begin, stop):
+        """Primera posición en [begin, stop) con el id 'sym', o -1 (búsqueda en C dentro de cada página)."""
+        target = bytes((sym,))
+        for page, low, high in self._chunks(begin, stop):
+            data = self._map(page, False)
+            if data is None:
+                if sym == BLANK_ID:
+                    return low
+                continue
+            base = page << self.shift
+            found = data.find(target, low - base, high - base)
+            if found >= 0:
+                return base + found
+        return -1
+
+    def rfind(self, sym, begin, stop):
+        """Última posición en [begin, stop) con el id 'sym', o -1."""
+        target = bytes((sym,))
+        for page, low, high in self._chunks_reversed(begin, stop):
+            data = self._map(page, False)
+            if data is None:
+                if sym == BLANK_ID:
+                    return high - 1
+                continue
+            base = page << self.shift
+            found = data.rfind(target, low - base, high - base)
+            if found >= 0:
+                return base + found
+        return -1
+
+    def copy_within(self, source, target, count):
+        """Copia 'count' celdas de 'source' a 'target' de a una página por vez (admite solapamiento)."""
+        step = self.page_size
+        if target > source:
+            # Hacia la derecha se copia desde el final para no pisar lo que falta leer
+            high = count
+            while high > 0:
+                low = max(high - step, 0)
+                self._write(target + low, self._read(source + low, source + high))
+                high = low
+        else:
+            for low in range(0, count, step):
+                high = min(low + step, count)
+                self._write(target + low, self._read(source + low, source + high))
+
+    @property
+    def resident_pages(self):
+        return len(self.mapped)
+
+    @property
+    def stored_pages(self):
+        return len(self.slots)
+
+    def close(self):
+        """Desmapea las páginas y borra el archivo."""
+        for data in self.mapped.values():
+            data.close()
+        self.mapped.clear()
+        self._page = self._data = None
+        self._finalizer()
+
+
+class PagedTape(Tape):
+    """Tape sobre un PagedBuffer: misma interfaz y mismas posiciones absolutas para el motor.
+
+    La celda 0 empieza en el medio del espacio virtual, así que crecer hacia la izquierda
+    nunca corre datos; los corrimientos de S_l / S_r y de insert se hacen de a una página.
+    La memoria residente queda acotada por max_pages * page_size aunque la cinta tenga miles
+    de millones de celdas.
+    """
+
+    def __init__(self, symbols=(), alphabet=None, directory=None, page_size=PAGE_SIZE, max_pages=MAX_PAGES):
+        self.alphabet = alphabet if alphabet is not None else Alphabet()
+        self.options = {"directory": directory, "page_size": page_size, "max_pages": max_pages}
+        self.buf = PagedBuffer(directory, page_size, max_pages)
+        self.start = self.end = self.origin = CENTER
+        self._translation = None
+        ids = bytes(self.alphabet.symbol_id(symbol) for symbol in symbols)
+        self.buf[self.start:self.start + len(ids)] = ids
+        self.end += len(ids)
+
+    @classmethod
+    def from_ids(cls, ids, alphabet, **options):
+        tape = cls(alphabet=alphabet, **options)
+        tape.buf[tape.start:tape.start + len(ids)] = ids
+        tape.end = tape.start + len(ids)
+        return tape
+
+    def grow_left(self):
+        self.start -= 1
+
+    def insert(self, index, symbol=BLANK):
+        if index == 0:
+            self.grow_left()
+            self.buf[self.start] = self.alphabet.symbol_id(symbol)
+        else:
+            position = self._position(index)
+            self.grow_right()
+            self.buf.copy_within(position, position + 1, self.end - 1 - position)
+            self.buf[position] = self.alphabet.symbol_id(symbol)
+
+    def delete(self, position):
+        start, end = self.start, self.end
+        if position - start < end - position - 1:
+            self.buf.copy_within(start, start + 1, position - start)
+            self.buf[start] = BLANK_ID
+            self.start = start + 1
+        else:
+            self.buf.copy_within(position + 1, position, end - position - 1)
+            self.buf[end - 1] = BLANK_ID
+            self.end = end - 1
+
+    def move(self, begin, stop, to):
+        if stop <= begin:
+            return
+        if begin < 0 or to < 0 or max(stop, to + stop - begin) > len(self):
+            raise IndexError("índice fuera de la cinta")
+        self.buf.copy_within(self.start + begin, self.start + to, stop - begin)
+
+    def _copy_cells(self, alphabet, table=None):
+        """Otra PagedTape con las mismas celdas, copiadas de a una página (y traducidas con 'table')."""
+        tape = PagedTape(alphabet=alphabet, **self.options)
+        step = self.buf.page_size
+        for low in range(self.start, self.end, step):
+            chunk = self.buf[low:min(low + step, self.end)]
+            tape.buf[tape.end:tape.end + len(chunk)] = chunk.translate(table) if table is not None else chunk
+            tape.end += len(chunk)
+        return tape
+
+    def copy(self):
+        return self._copy_cells(self.alphabet)
+
+    def recode(self, alphabet):
+        # Los ids cambian de un alfabeto a otro; el vacío es 0 en los dos
+        table = bytes(alphabet.symbol_id(symbol) for symbol in self.alphabet.symbols)
+        return self._copy_cells(alphabet, table + bytes(256 - len(table)))
+
+    def close(self):
+        self.buf.close()
+
+    def __repr__(self):
+        return f"PagedTape({len(self)} celdas, {self.buf.stored_pages} páginas en {self.buf.path})"
@@ -0,0 +1,87 @@
+import csv
+import json
+from compiler import OP_NAMES
+
+
+class Profiler:
+    """Contadores de una ejecución perfilada (ver TuringMachine.run(profile=True)).
+
+    Los aciertos se cuentan por id de transición de la CompiledMachine; los totales por tipo
+    de bloque se derivan de ellos, así el motor sólo incrementa un contador por paso.
+    """
+
+    def __init__(self, machine):
+        self.machine = machine
+        self.hits = [0] * len(machine.transitions)  # id de transición -> veces ejecutada
+        self.seek_right_travel = 0  # Celdas recorridas por los bloques R_
+        self.seek_left_travel = 0  # Celdas recorridas por los bloques L_
+        self.shifted_cells = 0  # Celdas movidas por S_l / S_r
+        self.grown_right = 0  # Celdas agregadas al final de la cinta
+        self.grown_left = 0  # Celdas agregadas al principio de la cinta
+
+    @property
+    def steps(self):
+        return sum(self.hits)
+
+    def transition_hits(self):
+        """Filas (estado, símbolo, bloque, siguiente estado, aciertos) ordenadas de más a menos usadas."""
+        machine = self.machine
+        rows = []
+        for tid, hits in enumerate(self.hits):
+            state, sym = machine.keys[tid]
+            rows.append({
+                "state": machine.states[state],
+                "symbol": machine.symbols[sym],
+                "block": machine.blocks[tid],
+                "next_state": machine.states[machine.transitions[tid][2]],
+                "hits": hits,
+            })
+        rows.sort(key=lambda row: row["hits"], reverse=True)
+        return rows
+
+    def state_hits(self):
+        """Pasos ejecutados desde cada estado, de más a menos."""
+        totals = {}
+        for tid, hits in enumerate(self.hits):
+            name = self.machine.states[self.machine.keys[tid][0]]
+            totals[name] = totals.get(name, 0) + hits
+        return dict(sorted(totals.items(), key=lambda item: item[1], reverse=True))
+
+    def block_hits(self):
+        """Pasos ejecutados por tipo de bloque (L, R, X, R_, L_, S_l, S_r, NOP, ERROR)."""
+        totals = {}
+        for tid, hits in enumerate(self.hits):
+            name = OP_NAMES[self.machine.transitions[tid][0]]
+            totals[name] = totals.get(name, 0) + hits
+        return dict(sorted(totals.items(), key=lambda item: item[1], reverse=True))
+
+    def to_dict(self):
+        return {
+            "steps": self.steps,
+            "blocks": self.block_hits(),
+            "states": self.state_hits(),
+            "transitions": self.transition_hits(),
+            "seek_right_travel": self.seek_right_travel,
+            "seek_left_travel": self.seek_left_travel,
+            "shifted_cells": self.shifted_cells,
+            "grown_right": self.grown_right,
+            "grown_left": self.grown_left,
+        }
+
+    def save_json(self, filepath):
+        with open(filepath, mode="w") as file:
+            json.dump(self.to_dict(), file, indent=2, ensure_ascii=False)
+
+    def save_csv(self, filepath):
+        """Guarda los aciertos por transición, una fila por transición."""
+        with open(filepath, mode="w", newline="") as file:
+            writer = csv.DictWriter(file, fieldnames=["state", "symbol", "block", "next_state", "hits"])
+            writer.writeheader()
+            writer.writerows(self.transition_hits())
+
+    def save(self, filepath):
+        """Guarda el perfil como CSV si el archivo termina en .csv, si no como JSON."""
+        if filepath.lower().endswith(".csv"):
+            self.save_csv(filepath)
+        else:
+            self.save_json(filepath)
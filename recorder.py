@@ -0,0 +1,181 @@
+import bisect
+import io
+import struct
+from compiler import OP_WRITE, OP_SHIFT_LEFT, OP_SHIFT_RIGHT, OP_SEQUENCE, OP_WRITE_MOVE
+from engine import execute
+from tape import Tape
+
+MAGIC = b"TMTR"
+VERSION = 1
+HEADER = struct.Struct("<4sHI")  # marca, versión, pasos entre fotos
+# Foto completa: paso, estado, cabezal y primera celda (coordenadas absolutas), largo de la cinta
+CHECKPOINT = struct.Struct("<QIqqI")
+# Registro por paso: id de transición, banderas, símbolo escrito, desplazamiento del cabezal
+RECORD = struct.Struct("<IBBi")
+
+FLAG_WRITE = 1  # El paso escribió 'symbol' en la celda donde estaba el cabezal
+FLAG_SHIFT = 2  # El paso fue un S_l / S_r o un bloque compuesto: cuenta como escritura de todas las celdas
+
+
+class TraceRecorder:
+    """Traza compacta de una ejecución con fotos de la cinta cada 'checkpoint_interval' pasos.
+
+    Cada paso ocupa RECORD.size bytes. Para volver al paso n se carga la foto anterior y se
+    re-ejecutan a lo sumo checkpoint_interval pasos, así que retroceder o saltar cuesta
+    O(K) y no O(n). Los datos se escriben en 'file' (un archivo en disco mantiene la memoria
+    acotada; sin archivo se usa un BytesIO); en memoria sólo queda el índice de fotos.
+    """
+
+    def __init__(self, machine, checkpoint_interval=1024, file=None):
+        self.machine = machine
+        self.interval = checkpoint_interval
+        self.file = file if file is not None else io.BytesIO()
+        self.checkpoints = []  # (paso, posición de la foto en el archivo)
+        self.steps = 0  # Pasos registrados
+        self.head = 0  # Coordenada absoluta del cabezal tras el último paso
+        self.pending = bytearray()  # Registros todavía no volcados al archivo
+        self.file.seek(0)
+        self.file.truncate()
+        self.file.write(HEADER.pack(MAGIC, VERSION, checkpoint_interval))
+
+    @classmethod
+    def load(cls, filepath, machine):
+        """Abre una traza guardada en disco para viajar por ella (la máquina debe ser la misma)."""
+        file = open(filepath, mode="r+b")
+        magic, version, interval = HEADER.unpack(file.read(HEADER.size))
+        if magic != MAGIC or version != VERSION:
+            raise ValueError(f"El archivo '{filepath}' no es una traza válida.")
+        trace = cls.__new__(cls)
+        trace.machine = machine
+        trace.interval = interval
+        trace.file = file
+        trace.checkpoints = []
+        trace.pending = bytearray()
+        trace.steps = 0
+        trace.head = 0
+        size = file.seek(0, io.SEEK_END)
+        offset = HEADER.size
+        while offset < size:
+            file.seek(offset)
+            step, _, head, _, length = CHECKPOINT.unpack(file.read(CHECKPOINT.size))
+            trace.checkpoints.append((step, offset))
+            records_offset = offset + CHECKPOINT.size + length
+            count = min(interval, (size - records_offset) // RECORD.size)
+            offset = records_offset + count * RECORD.size
+            trace.steps = step + count
+        if trace.checkpoints:
+            trace.head = trace._head_after(trace.steps)
+        return trace
+
+    def begin(self, state, buf, start, end, origin, pos):
+        """Toma la foto inicial si la traza está vacía."""
+        if not self.checkpoints:
+            self.head = pos - origin
+            self._checkpoint(state, buf, start, end, origin, pos)
+
+    def record(self, tid, op, arg, state, buf, start, end, origin, pos):
+        """Registra un paso ya ejecutado; 'state' es el estado en el que quedó la máquina."""
+        coord = pos - origin
+        if op == OP_WRITE:
+            flags, symbol = FLAG_WRITE, arg
+        elif op == OP_WRITE_MOVE:
+            flags, symbol = FLAG_WRITE, arg[0]  # Escribe donde estaba el cabezal y después se mueve
+        elif op == OP_SHIFT_LEFT or op == OP_SHIFT_RIGHT or op == OP_SEQUENCE:
+            # Un bloque compuesto puede escribir lejos del cabezal: last_write lo trata como un corrimiento
+            flags, symbol = FLAG_SHIFT, 0
+        else:
+            flags, symbol = 0, 0
+        self.pending += RECORD.pack(tid, flags, symbol, coord - self.head)
+        self.head = coord
+        self.steps += 1
+        if self.steps % self.interval == 0:
+            self._checkpoint(state, buf, start, end, origin, pos)
+
+    def _checkpoint(self, state, buf, start, end, origin, pos):
+        self.flush()
+        offset = self.file.seek(0, io.SEEK_END)
+        self.file.write(CHECKPOINT.pack(self.steps, state, pos - origin, start - origin, end - start))
+        self.file.write(buf[start:end])
+        self.checkpoints.append((self.steps, offset))
+
+    def flush(self):
+        """Vuelca al archivo los registros pendientes."""
+        if self.pending:
+            self.file.seek(0, io.SEEK_END)
+            self.file.write(self.pending)
+            self.pending = bytearray()
+        self.file.flush()
+
+    def _segment(self, step):
+        """Índice de la última foto tomada en o antes de 'step'."""
+        return bisect.bisect_right([checkpoint[0] for checkpoint in self.checkpoints], step) - 1
+
+    def _read_checkpoint(self, index):
+        step, offset = self.checkpoints[index]
+        self.file.seek(offset)
+        _, state, head, first, length = CHECKPOINT.unpack(self.file.read(CHECKPOINT.size))
+        cells = self.file.read(length)
+        return step, state, head, first, cells, offset + CHECKPOINT.size + length
+
+    def _records(self, index):
+        """Registros (id, banderas, símbolo, desplazamiento) del tramo que empieza en la foto 'index'."""
+        step, _, head, _, _, records_offset = self._read_checkpoint(index)
+        stop = self.checkpoints[index + 1][0] if index + 1 < len(self.checkpoints) else self.steps
+        self.file.seek(records_offset)
+        data = self.file.read((stop - step) * RECORD.size)
+        return step, head, RECORD.iter_unpack(data)
+
+    def _head_after(self, n):
+        step, head, records = self._records(self._segment(n))
+        for _, _, _, delta in records:
+            if step == n:
+                break
+            head += delta
+            step += 1
+        return head
+
+    def configuration(self, n):
+        """Reconstruye (estado, Tape, cabezal) tras el paso n re-ejecutando desde la foto anterior."""
+        if not 0 <= n <= self.steps:
+            raise IndexError(f"El paso {n} no está en la traza (0..{self.steps}).")
+        self.flush()
+        step, state, head, first, cells, _ = self._read_checkpoint(self._segment(n))
+        tape = Tape.from_ids(cells, self.machine)
+        tape.origin = tape.start - first
+        head -= first
+        if n > step:
+            _, state, head, _, _ = execute(self.machine, tape, head, state, max_steps=n - step,
+                                           stop_on_pause=False)
+        return state, tape, head
+
+    def truncate(self, n):
+        """Descarta lo registrado después del paso n (para seguir grabando desde ahí)."""
+        self.flush()
+        index = self._segment(n)
+        step, _, _, _, _, records_offset = self._read_checkpoint(index)
+        self.checkpoints = self.checkpoints[:index + 1]
+        self.file.truncate(records_offset + (n - step) * RECORD.size)
+        self.steps = n
+        self.head = self._head_after(n)
+
+    def last_write(self, coord):
+        """Último paso que escribió la celda de coordenada absoluta 'coord' (o None).
+
+        Se recorren los tramos de atrás hacia adelante; cada uno cuesta O(K).
+        """
+        self.flush()
+        for index in range(len(self.checkpoints) - 1, -1, -1):
+            step, head, records = self._records(index)
+            found = None
+            for _, flags, _, delta in records:
+                step += 1
+                if flags & FLAG_SHIFT or (flags & FLAG_WRITE and head == coord):
+                    found = step
+                head += delta
+            if found is not None:
+                return found
+        return None
+
+    def close(self):
+        self.flush()
+        self.file.close()
@@ -0,0 +1,510 @@
+import argparse
+import asyncio
+import hashlib
+import itertools
+import json
+import multiprocessing
+import os
+import stat
+import sys
+import time
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing.managers import SyncManager
+from batch import ignore_interrupt, read_tapes, run_sliced
+from cli import build_machine
+from compiler import compile_machine
+from loader import MachineDefinition, load_csv_as_dict
+
+PROGRESS_INTERVAL = 1.0  # Segundos entre avisos de progreso de un trabajo (el cliente puede pedir otro)
+MIN_PROGRESS = 0.05  # Intervalo de progreso más corto que se acepta
+MACHINE_CACHE = 64  # Máquinas compiladas que guarda cada proceso (y cuyo contenido recuerda el servidor)
+RUN_OPTIONS = ("stop_on_pause", "accelerate", "detect_cycles", "optimize", "codegen")  # Opciones de run que acepta submit
+LIMIT = 1 << 24  # Largo máximo de una línea del protocolo (un mensaje JSON)
+
+_progress = None  # Cola de avisos de progreso compartida con el servidor (ver _init_worker)
+_cancelled = None  # Diccionario compartido con los ids de los trabajos cancelados
+_machines = OrderedDict()  # Caché por proceso: hash del contenido -> MachineDefinition (la menos usada primero)
+
+
+def machine_payload(transitions, tape, initial_state, head_position, blocks=None):
+    """Máquina en el formato del protocolo a partir de lo que devuelve load_csv_as_dict.
+
+    Las transiciones viajan como filas [estado, símbolo, bloque, siguiente estado] (como en
+    el CSV) y la cinta como texto; 'blocks' es la tabla de bloques compuestos, si hay.
+    """
+    return {
+        "transitions": [[state, symbol, block, next_state]
+                        for (state, symbol), (block, next_state) in transitions.items()],
+        "tape": "".join(tape),
+        "initial_state": initial_state,
+        "head_position": head_position,
+        "blocks": dict(blocks or {}),
+    }
+
+
+def machine_digest(payload):
+    """Hash del contenido de una máquina del protocolo (el orden de las filas no importa)."""
+    content = [sorted(map(list, payload["transitions"])), payload["tape"], payload["initial_state"],
+               payload["head_position"], sorted(payload.get("blocks", {}).items())]
+    return hashlib.sha256(json.dumps(content, ensure_ascii=False).encode()).hexdigest()
+
+
+def _init_worker(progress, cancelled):
+    global _progress, _cancelled
+    _progress = progress
+    _cancelled = cancelled
+    ignore_interrupt()
+
+
+def _warm_up():
+    return os.getpid()
+
+
+def job_definition(digest, payload):
+    """MachineDefinition de una máquina del protocolo; se compila una sola vez por proceso y hash."""
+    definition = _machines.get(digest)
+    if definition is not None:
+        _machines.move_to_end(digest)
+        return definition
+    transitions = {(state, symbol): (block, next_state) for state, symbol, block, next_state in payload["transitions"]}
+    definition = MachineDefinition(transitions, list(payload["tape"]), payload["initial_state"],
+                                   payload["head_position"], compile_machine(transitions, payload["blocks"]), digest)
+    _machines[digest] = definition
+    if len(_machines) > MACHINE_CACHE:
+        _machines.popitem(last=False)
+    return definition
+
+
+def run_server_job(job, payload):
+    """Ejecuta un trabajo del servidor en un proceso del pool y devuelve su resultado como dict.
+
+    La máquina sale de la caché del proceso si ya se compiló antes (ver job_definition).
+    Como batch.run_job, se corre con batch.run_sliced para respetar la cuota de tiempo y la
+    cancelación; cada 'progress' segundos se avisa el avance por la cola compartida con el
+    servidor.
+    """
+    job_id = job["id"]
+    start = time.perf_counter()
+    output = {"type": "result", "job": job_id, "tape_index": job["tape_index"]}
+    try:
+        definition = job_definition(job["digest"], payload)
+        machine = build_machine(None, job["tape"], job["head"], definition, payload["blocks"])
+    except (KeyError, TypeError, ValueError) as e:
+        output.update(status="load_error", message=str(e), wall_time=time.perf_counter() - start)
+        return output
+
+    def report(steps, elapsed):
+        _progress.put({"type": "progress", "job": job_id, "steps": steps, "state": machine.current_state,
+                       "head_position": machine.head_position, "tape_length": len(machine.tape),
+                       "wall_time": elapsed})
+
+    output.update(run_sliced(machine, start, job["max_steps"], job["time_budget"], lambda: job_id in _cancelled,
+                             job["progress"], report, **job["options"]))
+    return output
+
+
+def cancelled_result(job):
+    return {"type": "result", "job": job["id"], "tape_index": job["tape_index"], "status": "cancelled", "steps": 0}
+
+
+class ProtocolError(ValueError):
+    """Pedido mal formado de un cliente: se le contesta con un mensaje de error y la conexión sigue."""
+
+
+class JobServer:
+    """Servidor local (socket Unix o TCP en localhost) que ejecuta máquinas en un pool de procesos.
+
+    El protocolo es JSON de a una línea por mensaje. El cliente manda pedidos con "type":
+
+    - "submit": una máquina ("machine", ver machine_payload, o "digest" de una ya enviada),
+      las cintas a correr ("tapes", por defecto la de la máquina), "head", la cuota de pasos
+      ("max_steps") y de tiempo ("time_budget"), opciones de TuringMachine.run y cada cuánto
+      avisar el progreso ("progress", en segundos, al menos MIN_PROGRESS; null para no
+      avisar). Se contesta con "accepted" y los ids de los trabajos (uno por cinta).
+    - "cancel": corta el trabajo "job" (o todos los de la conexión si no se indica).
+    - "ping": se contesta "pong" con los trabajos en curso.
+
+    Por cada trabajo llegan "progress" mientras corre y un "result" al final (con estado
+    "cancelled" si se canceló). Un pedido con cuotas mayores que las del servidor se
+    rechaza. Si un cliente se desconecta, sus trabajos se cancelan. Un pedido con "request"
+    recibe la respuesta con el mismo valor, así el cliente puede emparejarlas.
+    """
+
+    def __init__(self, processes=None, max_steps=None, time_budget=None):
+        self.processes = processes
+        self.max_steps = max_steps  # Cuota máxima de pasos por trabajo (None: sin límite)
+        self.time_budget = time_budget  # Cuota máxima de segundos por trabajo (None: sin límite)
+        self.machines = OrderedDict()  # Hash -> máquina del protocolo, para pedidos que sólo mandan "digest"
+        self.jobs = {}  # Id -> (trabajo, conexión, future del pool)
+        self._ids = itertools.count(1)
+        self._manager = None
+        self._pool = None
+        self._progress = None
+        self._cancelled = None
+        self._server = None
+        self._tasks = set()
+
+    async def start(self, path=None, host="127.0.0.1", port=0):
+        """Arranca el pool (con los procesos ya creados) y escucha en 'path' (Unix) o en host:port."""
+        loop = asyncio.get_running_loop()
+        self._manager = SyncManager()
+        self._manager.start(ignore_interrupt)
+        self._progress = multiprocessing.Queue()
+        self._cancelled = self._manager.dict()
+        processes = self.processes or os.cpu_count() or 1
+        self._pool = ProcessPoolExecutor(processes, initializer=_init_worker,
+                                         initargs=(self._progress, self._cancelled))
+        # Arrancar los procesos antes del primer trabajo para que ninguno pague la importación
+        await asyncio.gather(*(loop.run_in_executor(self._pool, _warm_up) for _ in range(processes)))
+        self._spawn(self._forward_progress())
+        if path is not None:
+            self._server = await asyncio.start_unix_server(self._handle, path, limit=LIMIT)
+        else:
+            self._server = await asyncio.start_server(self._handle, host, port, limit=LIMIT)
+        return self._server
+
+    @property
+    def address(self):
+        """Dirección en la que escucha: ruta del socket o (host, puerto)."""
+        return self._server.sockets[0].getsockname()
+
+    async def serve_forever(self):
+        async with self._server:
+            await self._server.serve_forever()
+
+    async def close(self):
+        """Deja de escuchar, cancela los trabajos en curso y apaga el pool."""
+        if self._server is not None:
+            self._server.close()
+        for job_id in list(self.jobs):
+            self.cancel(job_id)
+        loop = asyncio.get_running_loop()
+        await loop.run_in_executor(None, self._pool.shutdown)
+        self._progress.put(None)
+        for task in list(self._tasks):
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._manager.shutdown()
+
+    def _spawn(self, coroutine):
+        task = asyncio.ensure_future(coroutine)
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+        return task
+
+    async def _forward_progress(self):
+        """Reparte los avisos de progreso de los procesos a la conexión de cada trabajo."""
+        loop = asyncio.get_running_loop()
+        while True:
+            message = await loop.run_in_executor(None, self._progress.get)
+            if message is None:
+                return
+            entry = self.jobs.get(message["job"])
+            if entry is not None:
+                await entry[1].send(message)
+
+    async def _handle(self, reader, writer):
+        connection = Connection(writer)
+        try:
+            while True:
+                request = None
+                try:
+                    line = await reader.readline()
+                except (ValueError, ConnectionError):
+                    break  # Línea demasiado larga o conexión cortada
+                if not line:
+                    break
+                try:
+                    request = json.loads(line)
+                    if not isinstance(request, dict):
+                        raise ProtocolError("Cada mensaje tiene que ser un objeto JSON.")
+                    reply = self.dispatch(request, connection)
+                except (json.JSONDecodeError, ProtocolError) as e:
+                    reply = {"type": "error", "message": str(e)}
+                    if isinstance(request, dict) and "request" in request:
+                        reply["request"] = request["request"]
+                await connection.send(reply)
+        finally:
+            # Los trabajos de un cliente que se fue no le interesan a nadie más
+            for job_id, (_, owner, _) in list(self.jobs.items()):
+                if owner is connection:
+                    self.cancel(job_id)
+            connection.closed = True
+            writer.close()
+
+    def dispatch(self, request, connection):
+        kind = request.get("type")
+        if kind == "submit":
+            reply = self.submit(request, connection)
+        elif kind == "cancel":
+            if request.get("job") is not None and not isinstance(request["job"], int):
+                raise ProtocolError("'job' tiene que ser el id de un trabajo.")
+            job_ids = [request["job"]] if request.get("job") is not None else [
+                job_id for job_id, (_, owner, _) in self.jobs.items() if owner is connection]
+            reply = {"type": "cancelling", "jobs": [job_id for job_id in job_ids if self.cancel(job_id)]}
+        elif kind == "ping":
+            reply = {"type": "pong", "jobs": len(self.jobs)}
+        else:
+            raise ProtocolError(f"Pedido desconocido: {kind!r}.")
+        if "request" in request:
+            reply["request"] = request["request"]
+        return reply
+
+    def submit(self, request, connection):
+        payload = request.get("machine")
+        if payload is not None:
+            try:
+                digest = machine_digest(payload)
+            except (KeyError, TypeError, ValueError, AttributeError) as e:
+                raise ProtocolError(f"Máquina mal formada: {e}")
+            self.machines[digest] = payload
+        else:
+            digest = request.get("digest")
+            payload = self.machines.get(digest)
+            if payload is None:
+                raise ProtocolError("El servidor no conoce esa máquina: hay que mandarla entera ('machine').")
+        self.machines.move_to_end(digest)
+        if len(self.machines) > MACHINE_CACHE:
+            self.machines.popitem(last=False)
+
+        options = {name: bool(request[name]) for name in RUN_OPTIONS if name in request}
+        tapes = request.get("tapes") or [payload["tape"]]
+        if not isinstance(tapes, list) or not all(isinstance(tape, str) and tape for tape in tapes):
+            raise ProtocolError("'tapes' tiene que ser una lista de cintas no vacías.")
+        for name, kind in (("head", int), ("max_steps", int), ("time_budget", (int, float))):
+            value = request.get(name)
+            if value is not None and (not isinstance(value, kind) or isinstance(value, bool) or value < 0):
+                raise ProtocolError(f"'{name}' tiene que ser un número no negativo.")
+        progress = request.get("progress", PROGRESS_INTERVAL)
+        if progress is not None and (not isinstance(progress, (int, float)) or isinstance(progress, bool)
+                                     or progress < MIN_PROGRESS):
+            raise ProtocolError(f"'progress' tiene que ser null o al menos {MIN_PROGRESS} segundos.")
+        max_steps = quota("max_steps", request.get("max_steps"), self.max_steps)
+        time_budget = quota("time_budget", request.get("time_budget"), self.time_budget)
+        job_ids = []
+        for index, tape in enumerate(tapes):
+            job = {"id": next(self._ids), "tape_index": index, "digest": digest, "tape": tape,
+                   "head": request.get("head"), "max_steps": max_steps, "time_budget": time_budget,
+                   "progress": progress, "options": options}
+            future = self._pool.submit(run_server_job, job, payload)
+            self.jobs[job["id"]] = (job, connection, future)
+            self._spawn(self._finish(job, connection, future))
+            job_ids.append(job["id"])
+        return {"type": "accepted", "digest": digest, "jobs": job_ids}
+
+    async def _finish(self, job, connection, future):
+        try:
+            result = await asyncio.wrap_future(future)
+        except asyncio.CancelledError:
+            result = cancelled_result(job)
+        except Exception as e:
+            result = {"type": "result", "job": job["id"], "tape_index": job["tape_index"], "status": "error",
+                      "message": str(e)}
+        self.jobs.pop(job["id"], None)
+        self._cancelled.pop(job["id"], None)
+        await connection.send(result)
+
+    def cancel(self, job_id):
+        """Cancela un trabajo: si no arrancó se descarta; si corre, corta en su próximo tramo."""
+        entry = self.jobs.get(job_id)
+        if entry is None:
+            return False
+        if not entry[2].cancel():
+            self._cancelled[job_id] = True
+        return True
+
+
+def quota(name, requested, limit):
+    """Cuota efectiva de un trabajo: la pedida o, si no pidió, la del servidor. Pasarse da ProtocolError."""
+    if requested is None:
+        return limit
+    if limit is not None and requested > limit:
+        raise ProtocolError(f"'{name}' supera la cuota del servidor ({limit}).")
+    return requested
+
+
+class Connection:
+    """Lado del servidor de un cliente conectado: escribe mensajes de a una línea JSON."""
+
+    def __init__(self, writer):
+        self.writer = writer
+        self.closed = False
+
+    async def send(self, message):
+        if self.closed:
+            return
+        try:
+            self.writer.write(json.dumps(message, ensure_ascii=False).encode() + b"\n")
+            await self.writer.drain()
+        except ConnectionError:
+            self.closed = True
+
+
+class JobClient:
+    """Cliente asyncio de JobServer.
+
+    submit devuelve los ids de los trabajos; los avisos de progreso y los resultados llegan
+    por events() en el orden en que los manda el servidor.
+    """
+
+    def __init__(self, reader, writer):
+        self.reader = reader
+        self.writer = writer
+        self.events = asyncio.Queue()  # "progress" y "result" de los trabajos de este cliente
+        self._replies = {}  # Número de pedido -> future de la respuesta
+        self._requests = itertools.count(1)
+        self._reader_task = asyncio.ensure_future(self._read())
+
+    @classmethod
+    async def connect(cls, path=None, host="127.0.0.1", port=None):
+        if path is not None:
+            reader, writer = await asyncio.open_unix_connection(path, limit=LIMIT)
+        else:
+            reader, writer = await asyncio.open_connection(host, port, limit=LIMIT)
+        return cls(reader, writer)
+
+    async def _read(self):
+        try:
+            while True:
+                line = await self.reader.readline()
+                if not line:
+                    break
+                message = json.loads(line)
+                future = self._replies.pop(message.get("request"), None)
+                if future is not None:
+                    future.set_result(message)
+                else:
+                    await self.events.put(message)
+        finally:
+            for future in self._replies.values():
+                if not future.done():
+                    future.set_exception(ConnectionError("El servidor cerró la conexión."))
+            await self.events.put(None)
+
+    async def request(self, message):
+        """Manda un pedido y espera su respuesta; un "error" del servidor se informa con ValueError."""
+        number = next(self._requests)
+        future = asyncio.get_running_loop().create_future()
+        self._replies[number] = future
+        self.writer.write(json.dumps(dict(message, request=number), ensure_ascii=False).encode() + b"\n")
+        await self.writer.drain()
+        reply = await future
+        if reply["type"] == "error":
+            raise ValueError(reply["message"])
+        return reply
+
+    async def submit(self, machine=None, tapes=None, digest=None, **options):
+        """Envía una máquina (o el hash de una ya enviada) con sus cintas; devuelve los ids de los trabajos."""
+        message = {"type": "submit", "tapes": tapes, **options}
+        if machine is not None:
+            message["machine"] = machine
+        else:
+            message["digest"] = digest
+        return (await self.request(message))["jobs"]
+
+    async def cancel(self, job_id=None):
+        return (await self.request({"type": "cancel", "job": job_id}))["jobs"]
+
+    async def results(self, job_ids):
+        """Generador asíncrono de los mensajes de 'job_ids' hasta que llegan todos sus resultados."""
+        pending = set(job_ids)
+        while pending:
+            message = await self.events.get()
+            if message is None:
+                raise ConnectionError("El servidor cerró la conexión.")
+            if message["job"] in pending:
+                if message["type"] == "result":
+                    pending.discard(message["job"])
+                yield message
+
+    async def close(self):
+        self.writer.close()
+        await self.writer.wait_closed()
+        await self._reader_task
+
+
+def remove_socket(path):
+    """Borra el socket Unix en 'path' si existe; si ahí hay otro tipo de archivo da ValueError."""
+    if not os.path.lexists(path):
+        return
+    if not stat.S_ISSOCK(os.lstat(path).st_mode):
+        raise ValueError(f"'{path}' ya existe y no es un socket: no se borra.")
+    os.remove(path)
+
+
+async def serve(args):
+    server = JobServer(args.processes, args.max_steps, args.time_budget)
+    if args.socket is not None:
+        remove_socket(args.socket)  # Socket de una ejecución anterior
+    await server.start(args.socket, args.host, args.port)
+    print(f"Escuchando en {server.address}", file=sys.stderr, flush=True)
+    try:
+        await server.serve_forever()
+    except asyncio.CancelledError:
+        pass
+    finally:
+        await server.close()
+        if args.socket is not None:
+            remove_socket(args.socket)
+
+
+async def submit(args):
+    transitions, tape, initial_state, head_position = load_csv_as_dict(args.csv)
+    tapes = read_tapes(args.tapes) if args.tapes is not None else None
+    client = await JobClient.connect(args.socket, args.host, args.port)
+    try:
+        options = {"head": args.head, "max_steps": args.max_steps, "time_budget": args.time_budget,
+                   "stop_on_pause": not args.no_pause, "progress": args.progress}
+        job_ids = await client.submit(machine_payload(transitions, tape, initial_state, head_position), tapes,
+                                      **options)
+        try:
+            async for message in client.results(job_ids):
+                print(json.dumps(message, ensure_ascii=False), flush=True)
+        except asyncio.CancelledError:
+            await client.cancel()
+            raise
+    finally:
+        await client.close()
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Servidor local de ejecuciones de máquinas de Turing (y su cliente).")
+    commands = parser.add_subparsers(dest="command", required=True)
+    for name in ("serve", "submit"):
+        command = commands.add_parser(name)
+        command.add_argument("--socket", metavar="RUTA", default=None, help="Socket Unix (si no, TCP en --host:--port)")
+        command.add_argument("--host", default="127.0.0.1", help="Dirección TCP (por defecto, sólo local)")
+        command.add_argument("--port", type=int, default=8765, help="Puerto TCP")
+        command.add_argument("--max-steps", type=int, default=None,
+                             help="Cuota de pasos por trabajo (en serve, la máxima que se permite)")
+        command.add_argument("--time-budget", type=float, default=None,
+                             help="Cuota de segundos por trabajo (en serve, la máxima que se permite)")
+        if name == "serve":
+            command.add_argument("--processes", type=int, default=None,
+                                 help="Procesos del pool (por defecto, uno por núcleo)")
+        else:
+            command.add_argument("csv", help="Archivo CSV de la máquina")
+            command.add_argument("--tapes", metavar="ARCHIVO", default=None,
+                                 help="Cintas de entrada, una por línea ('-' para stdin); por defecto la del CSV")
+            command.add_argument("--head", type=int, default=None, help="Posición inicial del cabezal")
+            command.add_argument("--no-pause", action="store_true", help="No detenerse en estados 'pause'")
+            command.add_argument("--progress", type=float, default=PROGRESS_INTERVAL,
+                                 help=f"Segundos entre avisos de progreso (al menos {MIN_PROGRESS})")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    try:
+        asyncio.run(serve(args) if args.command == "serve" else submit(args))
+    except KeyboardInterrupt:
+        return 130
+    except (OSError, ValueError) as e:
+        print(f"Error: {e}", file=sys.stderr)
+        return 2
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,102 @@
+import os
+import struct
+import tempfile
+import zlib
+from paged_tape import PagedTape
+from tape import Tape
+
+MAGIC = b"TMSN"
+VERSION = 1
+# Marca, versión, hash de la máquina compilada, pasos, cabezal (índice de la cinta), primera celda
+# (coordenada absoluta), largo del nombre del estado y largo de la tabla de símbolos
+HEADER = struct.Struct("<4sH32sQqqHI")
+SYMBOL_SEPARATOR = "\0"  # Separa los símbolos de la tabla (cada celda de la cinta guarda un id de esa tabla)
+CHUNK_SIZE = 1 << 20  # Celdas que se comprimen o descomprimen por vez
+COMPRESSION_LEVEL = 6  # zlib: la cinta es casi toda vacía y se comprime muy bien
+
+
+def save_snapshot(filepath, machine, state, tape, head, steps):
+    """Guarda una configuración (estado, cinta, cabezal y pasos) en un archivo binario compacto.
+
+    'tape' debe estar codificada con los ids de 'machine'. La cinta se comprime con zlib de
+    a CHUNK_SIZE celdas (sirve también para una PagedTape que no entra en memoria). El
+    archivo se escribe de forma atómica (temporal + rename): si la ejecución se corta a
+    mitad de camino, la foto anterior queda intacta.
+    """
+    name = state.encode()
+    symbols = SYMBOL_SEPARATOR.join(machine.symbols).encode()
+    directory = os.path.dirname(os.path.abspath(filepath))
+    descriptor, temporary = tempfile.mkstemp(dir=directory, suffix=".tmp")
+    try:
+        with os.fdopen(descriptor, mode="wb") as file:
+            file.write(HEADER.pack(MAGIC, VERSION, machine.digest(), steps, head, tape.start - tape.origin,
+                                   len(name), len(symbols)))
+            file.write(name)
+            file.write(symbols)
+            compressor = zlib.compressobj(COMPRESSION_LEVEL)
+            for low in range(tape.start, tape.end, CHUNK_SIZE):
+                file.write(compressor.compress(tape.buf[low:min(low + CHUNK_SIZE, tape.end)]))
+            file.write(compressor.flush())
+            file.flush()
+            os.fsync(file.fileno())
+        os.replace(temporary, filepath)
+    except BaseException:
+        try:
+            os.remove(temporary)
+        except OSError:
+            pass
+        raise
+
+
+def load_snapshot(filepath, machine, tape_options=None):
+    """Lee una foto guardada con save_snapshot y devuelve (nombre del estado, cinta, cabezal, pasos).
+
+    La foto tiene que ser de la misma máquina (se compara el hash de la tabla compilada); si
+    no, o si el archivo no es una foto, se informa con ValueError. Con 'tape_options' (los
+    argumentos de PagedTape) la cinta se carga en una PagedTape sin pasar toda por memoria.
+    """
+    with open(filepath, mode="rb") as file:
+        data = file.read(HEADER.size)
+        if len(data) < HEADER.size:
+            raise ValueError(f"El archivo '{filepath}' no es una foto válida.")
+        magic, version, digest, steps, head, first, name_length, symbols_length = HEADER.unpack(data)
+        if magic != MAGIC or version != VERSION:
+            raise ValueError(f"El archivo '{filepath}' no es una foto válida.")
+        if digest != machine.digest():
+            raise ValueError(f"La foto '{filepath}' es de otra máquina (las transiciones no coinciden).")
+        state = file.read(name_length).decode()
+        symbols = file.read(symbols_length).decode().split(SYMBOL_SEPARATOR)
+        # Los ids de la foto se traducen a los de la máquina actual (el vacío es 0 en las dos)
+        table = bytes(machine.symbol_id(symbol) for symbol in symbols)
+        table += bytes(256 - len(table))
+        if tape_options is None:
+            tape = Tape.from_ids(b"".join(_cells(file, table, filepath)), machine)
+        else:
+            tape = PagedTape(alphabet=machine, **tape_options)
+            for chunk in _cells(file, table, filepath):
+                tape.buf[tape.end:tape.end + len(chunk)] = chunk
+                tape.end += len(chunk)
+    if not 0 <= head < len(tape):
+        raise ValueError(f"El cabezal de la foto '{filepath}' está fuera de la cinta.")
+    tape.origin = tape.start - first
+    return state, tape, head, steps
+
+
+def _cells(file, table, filepath):
+    """Descomprime la cinta de la foto de a pedazos de a lo sumo CHUNK_SIZE celdas, ya traducida con 'table'."""
+    decompressor = zlib.decompressobj()
+    try:
+        while not decompressor.eof:
+            data = decompressor.unconsumed_tail or file.read(CHUNK_SIZE)
+            if not data:
+                break
+            chunk = decompressor.decompress(data, CHUNK_SIZE)
+            if chunk:
+                yield chunk.translate(table)
+        chunk = decompressor.flush()
+    except zlib.error as e:
+        raise ValueError(f"La cinta de la foto '{filepath}' está dañada: {e}")
+    if chunk:
+        yield chunk.translate(table)
+    if not decompressor.eof:
+        raise ValueError(f"La cinta de la foto '{filepath}' está incompleta.")
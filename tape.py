@@ -0,0 +1,171 @@
+from compiler import BLANK, BLANK_ID, Alphabet
+
+MIN_MARGIN = 16  # Celdas libres mínimas que se reservan al crecer
+
+
+class Tape:
+    """Cinta bidireccional guardada como un bytearray de ids de símbolo.
+
+    Las celdas lógicas 0..len-1 ocupan buf[start:end]; todo lo que queda fuera de ese rango
+    vale BLANK_ID (0), así que crecer hacia cualquiera de los dos lados es O(1) amortizado.
+    Los ids se traducen a símbolos con el alfabeto (normalmente la CompiledMachine).
+    """
+
+    def __init__(self, symbols=(), alphabet=None):
+        self.alphabet = alphabet if alphabet is not None else Alphabet()
+        ids = bytes(self.alphabet.symbol_id(symbol) for symbol in symbols)
+        margin = max(len(ids), MIN_MARGIN)
+        self.buf = bytearray(margin) + ids + bytearray(margin)
+        self.start = margin  # Posición en buf de la celda 0
+        self.end = margin + len(ids)  # Posición en buf siguiente a la última celda
+        self.origin = margin  # Posición en buf de la coordenada absoluta 0 (no cambia al crecer)
+        self._translation = None  # Caché para to_string: (cantidad de símbolos, tabla)
+
+    @classmethod
+    def from_ids(cls, ids, alphabet):
+        """Crea una cinta directamente a partir de ids de símbolo ya internados."""
+        tape = cls(alphabet=alphabet)
+        tape.buf[tape.start:tape.start] = ids
+        tape.end = tape.start + len(ids)
+        tape.buf.extend(bytes(max(len(ids), MIN_MARGIN)))
+        return tape
+
+    def __len__(self):
+        return self.end - self.start
+
+    def _position(self, index):
+        """Convierte un índice lógico (admite negativos como una lista) en una posición de buf."""
+        if index < 0:
+            index += self.end - self.start
+        if not 0 <= index < self.end - self.start:
+            raise IndexError("índice fuera de la cinta")
+        return self.start + index
+
+    def read(self, index):
+        """Devuelve el id del símbolo en la celda lógica 'index'."""
+        return self.buf[self._position(index)]
+
+    def write(self, index, sym):
+        """Escribe el id de símbolo 'sym' en la celda lógica 'index'."""
+        self.buf[self._position(index)] = sym
+
+    def __getitem__(self, index):
+        symbols = self.alphabet.symbols
+        if isinstance(index, slice):
+            begin, stop, step = index.indices(self.end - self.start)
+            if step != 1:
+                return list(self)[index]
+            return [symbols[sym] for sym in self.buf[self.start + begin:self.start + stop]]
+        return symbols[self.buf[self._position(index)]]
+
+    def __setitem__(self, index, symbol):
+        self.buf[self._position(index)] = self.alphabet.symbol_id(symbol)
+
+    def __iter__(self):
+        symbols = self.alphabet.symbols
+        return (symbols[sym] for sym in self.buf[self.start:self.end])
+
+    def find(self, symbol, begin=0, stop=None):
+        """Primera celda lógica en [begin, stop) que contiene 'symbol', o -1 (búsqueda en C, sin copias)."""
+        sym = self.alphabet.symbol_ids.get(symbol)
+        if sym is None:
+            return -1
+        stop = len(self) if stop is None else min(stop, len(self))
+        position = self.buf.find(sym, self.start + max(begin, 0), self.start + stop)
+        return position - self.start if position >= 0 else -1
+
+    def rfind(self, symbol, begin=0, stop=None):
+        """Última celda lógica en [begin, stop) que contiene 'symbol', o -1."""
+        sym = self.alphabet.symbol_ids.get(symbol)
+        if sym is None:
+            return -1
+        stop = len(self) if stop is None else min(stop, len(self))
+        position = self.buf.rfind(sym, self.start + max(begin, 0), self.start + stop)
+        return position - self.start if position >= 0 else -1
+
+    def grow_right(self):
+        """Agrega una celda vacía al final."""
+        self.end += 1
+        if self.end > len(self.buf):
+            self.buf.extend(bytes(len(self.buf)))
+
+    def grow_left(self):
+        """Agrega una celda vacía al principio (la celda 0 pasa a ser la nueva)."""
+        if self.start == 0:
+            # Reservar un margen proporcional al tamaño actual para amortizar el corrimiento
+            margin = max(len(self.buf), MIN_MARGIN)
+            self.buf[0:0] = bytes(margin)
+            self.start += margin
+            self.end += margin
+            self.origin += margin
+        self.start -= 1
+
+    def append(self, symbol=BLANK):
+        self.grow_right()
+        self.buf[self.end - 1] = self.alphabet.symbol_id(symbol)
+
+    def insert(self, index, symbol=BLANK):
+        if index == 0:
+            self.grow_left()
+            self.buf[self.start] = self.alphabet.symbol_id(symbol)
+        else:
+            self.buf.insert(self._position(index), self.alphabet.symbol_id(symbol))
+            self.end += 1
+
+    def delete(self, position):
+        """Elimina la celda en la posición absoluta 'position' de buf moviendo en bloque el lado más corto."""
+        start, end = self.start, self.end
+        if position - start < end - position - 1:
+            # Lo que está a la izquierda se corre una celda a la derecha
+            self.buf[start + 1:position + 1] = self.buf[start:position]
+            self.buf[start] = BLANK_ID
+            self.start = start + 1
+        else:
+            # Lo que está a la derecha se corre una celda a la izquierda
+            self.buf[position:end - 1] = self.buf[position + 1:end]
+            self.buf[end - 1] = BLANK_ID
+            self.end = end - 1
+
+    def pop(self, index=-1):
+        """Elimina la celda lógica 'index' y devuelve su símbolo."""
+        position = self._position(index)
+        sym = self.buf[position]
+        self.delete(position)
+        return self.alphabet.symbols[sym]
+
+    def move(self, begin, stop, to):
+        """Copia en bloque las celdas lógicas [begin, stop) a partir de la celda 'to' (admite solapamiento)."""
+        if stop <= begin:
+            return
+        if begin < 0 or to < 0 or max(stop, to + stop - begin) > len(self):
+            raise IndexError("índice fuera de la cinta")
+        source = self.start + begin
+        target = self.start + to
+        self.buf[target:target + stop - begin] = self.buf[source:source + stop - begin]
+
+    def recode(self, alphabet):
+        """Cinta con las mismas celdas expresadas con los ids de otro alfabeto."""
+        return Tape(self, alphabet)
+
+    def copy(self):
+        tape = Tape(alphabet=self.alphabet)
+        tape.buf = bytearray(self.buf)
+        tape.start = self.start
+        tape.end = self.end
+        tape.origin = self.origin
+        return tape
+
+    def to_string(self, begin=0, stop=None):
+        """Exporta la cinta (o las celdas begin..stop) como texto."""
+        stop = len(self) if stop is None else min(stop, len(self))
+        symbols = self.alphabet.symbols
+        if self._translation is None or self._translation[0] != len(symbols):
+            self._translation = (len(symbols), {i: symbol for i, symbol in enumerate(symbols)})
+        chunk = self.buf[self.start + max(begin, 0):self.start + stop]
+        return chunk.decode("latin-1").translate(self._translation[1])
+
+    def __str__(self):
+        return self.to_string()
+
+    def __repr__(self):
+        return f"Tape({self.to_string()!r})"
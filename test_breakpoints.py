@@ -0,0 +1,101 @@
+import random
+import pytest
+from test_codegen import BLOCKS, expected_result, random_machine, reference_run, run_result
+
+STEPS = 2_000
+# S_l y S_r borran celdas de forma distinta en la referencia y en el motor: las coordenadas
+# absolutas de las celdas vigiladas no se pueden seguir en la referencia
+UNSHIFTED = tuple(block for block in BLOCKS if block not in ("S_l", "S_r"))
+
+
+def first_hit(configurations, hit):
+    """Primer paso k >= 1 con hit(k) verdadero, o None."""
+    return next((k for k in range(1, len(configurations)) if hit(k)), None)
+
+
+def check_stop(machine, stop_on_pause, accelerate, hit, first=()):
+    """La máquina (con sus puntos de parada) se detiene en el primer paso donde la referencia cumple hit.
+
+    Si ese paso termina en un error, o la referencia se detiene ahí con un motivo de 'first',
+    gana la referencia.
+    """
+    status, configurations = reference_run(machine, STEPS, stop_on_pause)
+    step = first_hit(configurations, lambda k: hit(k, configurations))
+    if step is None or configurations[step][3] or (step == len(configurations) - 1 and status in first):
+        expected = expected_result(status, configurations, STEPS)
+    else:
+        state, tape, head, _ = configurations[step]
+        expected = ("breakpoint", step, state, tape, head, False)
+    result = machine.run(max_steps=STEPS, stop_on_pause=stop_on_pause, accelerate=accelerate)
+    assert run_result(result) == expected
+
+
+def setup(seed, blocks=BLOCKS):
+    rng = random.Random(seed)
+    machine = random_machine(rng, blocks)
+    return rng, machine, rng.random() < 0.5
+
+
+@pytest.mark.parametrize("accelerate", [False, True])
+@pytest.mark.parametrize("seed", range(100))
+def test_state_breakpoint(seed, accelerate):
+    rng, machine, stop_on_pause = setup(seed)
+    name = rng.choice(sorted({state for _, state in machine.transitions.values()} - {"halt"}))
+    machine.breakpoints.break_on_state(name)
+    check_stop(machine, stop_on_pause, accelerate, lambda k, configurations: configurations[k][0] == name)
+
+
+@pytest.mark.parametrize("accelerate", [False, True])
+@pytest.mark.parametrize("seed", range(100))
+def test_transition_breakpoint(seed, accelerate):
+    rng, machine, stop_on_pause = setup(seed)
+    key = rng.choice(sorted(machine.transitions))
+    machine.breakpoints.break_on_transition(*key)
+
+    def hit(k, configurations):
+        state, tape, head, _ = configurations[k]
+        return (state, tape[head]) == key
+
+    # Entrar a un estado 'pause' detiene antes de llegar a la transición vigilada
+    check_stop(machine, stop_on_pause, accelerate, hit, ("halt", "pause"))
+
+
+@pytest.mark.parametrize("accelerate", [False, True])
+@pytest.mark.parametrize("seed", range(100))
+def test_tape_length_breakpoint(seed, accelerate):
+    rng, machine, stop_on_pause = setup(seed)
+    threshold = len(machine.tape) + rng.randint(0, 3)
+    machine.breakpoints.break_on_tape_length(threshold)
+    check_stop(machine, stop_on_pause, accelerate, lambda k, configurations: len(configurations[k][1]) > threshold)
+
+
+@pytest.mark.parametrize("accelerate", [False, True])
+@pytest.mark.parametrize("seed", range(100))
+def test_step_breakpoint(seed, accelerate):
+    rng, machine, stop_on_pause = setup(seed)
+    step = rng.randint(1, 64)
+    machine.breakpoints.break_at_step(step)
+    status, configurations = reference_run(machine, step, stop_on_pause)
+    expected = expected_result(status, configurations, step)
+    if expected[0] == "max_steps":
+        expected = ("breakpoint",) + expected[1:]
+    result = machine.run(max_steps=STEPS, stop_on_pause=stop_on_pause, accelerate=accelerate)
+    assert run_result(result) == expected
+
+
+@pytest.mark.parametrize("accelerate", [False, True])
+@pytest.mark.parametrize("seed", range(100))
+def test_watched_cells(seed, accelerate):
+    rng, machine, stop_on_pause = setup(seed, UNSHIFTED)
+    indexes = rng.sample(range(len(machine.tape)), min(3, len(machine.tape)))
+    for index in indexes:
+        machine.watch_cell(index)
+    offsets = [0]  # Celdas agregadas a la izquierda hasta cada configuración: los índices vigilados se corren
+
+    def hit(k, configurations):
+        state, tape, head, _ = configurations[k - 1]
+        block = machine.transitions[(state, tape[head])][0]
+        offsets.append(offsets[-1] + (len(configurations[k][1]) - len(tape) if block.startswith("L") else 0))
+        return block.startswith("X") and head - offsets[k - 1] in indexes
+
+    check_stop(machine, stop_on_pause, accelerate, hit)
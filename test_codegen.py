@@ -0,0 +1,88 @@
+import os
+import random
+import pytest
+from cli import build_machine
+from codegen import verify
+from turing_machine import TuringMachine
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+SYMBOLS = "ab_"
+BLOCKS = ("L", "R", "Xa", "Xb", "X_", "R_a", "R__", "L_b", "L__", "S_l", "S_r")
+
+
+def random_machine(rng, blocks=BLOCKS):
+    """Máquina al azar de 2 a 5 estados (más 'halt' y un 'pause') sobre 'a', 'b' y el vacío."""
+    states = [f"q{index}" for index in range(rng.randint(2, 5))]
+    targets = states * 4 + ["halt", "pause1"]  # Pocas transiciones a "halt": así las ejecuciones son largas
+    transitions = {}
+    for state in states + ["pause1"]:
+        for symbol in SYMBOLS:
+            if rng.random() < 0.9:
+                transitions[(state, symbol)] = (rng.choice(blocks), rng.choice(targets))
+    machine = TuringMachine()
+    machine.set_transitions(transitions)
+    machine.set_initial_state(states[0])
+    tape = [rng.choice(SYMBOLS) for _ in range(rng.randint(1, 12))]
+    machine.set_tape(tape, rng.randrange(len(tape)))
+    return machine
+
+
+def copy_machine(machine):
+    """Otra TuringMachine con la misma tabla y la misma configuración; la original no se toca."""
+    copied = TuringMachine()
+    copied.set_transitions(machine.transitions)
+    copied.blocks = machine.blocks
+    copied.set_initial_state(machine.current_state)
+    copied.set_tape(list(machine.tape), machine.head_position)
+    return copied
+
+
+def reference_run(machine, steps, stop_on_pause=False):
+    """Corre una copia de 'machine' en el intérprete de referencia (TuringMachine.step).
+
+    Devuelve (motivo, configuraciones): la configuración k es (estado, cinta, cabezal, error)
+    después de k pasos, hasta 'steps' pasos o hasta que la máquina se detenga.
+    """
+    reference = copy_machine(machine)
+    configurations = [(reference.current_state, "".join(reference.tape), reference.head_position, False)]
+    status = "max_steps"
+    while status == "max_steps" and len(configurations) <= steps:
+        if not reference.step():
+            status = "no_transition"
+            break
+        configurations.append((reference.current_state, "".join(reference.tape), reference.head_position,
+                               reference.error))
+        if reference.current_state == "halt":
+            status = "halt"
+        elif stop_on_pause and reference.current_state.startswith("pause"):
+            status = "pause"
+    return status, configurations
+
+
+def expected_result(status, configurations, limit):
+    """Lo que debe dar run(max_steps=limit) según reference_run: (motivo, pasos, estado, cinta, cabezal, error)."""
+    steps = min(limit, len(configurations) - 1)
+    # Que falta una transición se sabe recién al intentar un paso más
+    if steps < len(configurations) - 1 or (status == "no_transition" and steps == limit):
+        status = "max_steps"
+    return (status, steps) + configurations[steps]
+
+
+def run_result(result):
+    """Los campos de un RunResult en el orden de expected_result."""
+    return (result.status, result.steps, result.state, result.tape, result.head_position,
+            result.message.startswith("Error"))
+
+
+@pytest.mark.parametrize("name", ["transitions1.csv", "transitions2.csv"])
+def test_generated_code_matches_interpreter(name):
+    machine = build_machine(os.path.join(HERE, name))
+    assert verify(machine, 10_000) is None
+    assert verify(machine, 10_000, stop_on_pause=True) is None
+
+
+@pytest.mark.parametrize("seed", range(100))
+def test_generated_code_matches_interpreter_on_random_tables(seed):
+    rng = random.Random(seed)
+    machine = random_machine(rng)
+    assert verify(machine, 2_000, stop_on_pause=rng.random() < 0.5) is None
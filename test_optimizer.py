@@ -0,0 +1,40 @@
+import os
+import random
+import pytest
+from cli import build_machine
+from codegen import verify_limits
+from test_codegen import HERE, copy_machine, expected_result, random_machine, reference_run, run_result
+
+
+def check_optimized(machine, steps, stop_on_pause, codegen):
+    """run(optimize=True) desde el principio hasta cada límite de verify_limits contra la referencia.
+
+    Una detención en un estado juntado informa el nombre de su representante, así que el
+    estado esperado se traduce con la tabla optimizada antes de comparar.
+    """
+    status, configurations = reference_run(machine, steps, stop_on_pause)
+    for limit in verify_limits(steps):
+        copied = copy_machine(machine)
+        optimized = copied.optimized_machine(fuse=not codegen)
+        result = copied.run(max_steps=limit, stop_on_pause=stop_on_pause, codegen=codegen, optimize=True)
+        expected = list(expected_result(status, configurations, limit))
+        expected[2] = optimized.machine.states[optimized.state_ids[expected[2]]]
+        assert run_result(result) == tuple(expected), f"Hasta {limit} pasos"
+        if expected[0] != "max_steps":
+            break
+
+
+@pytest.mark.parametrize("codegen", [False, True])
+@pytest.mark.parametrize("name", ["transitions1.csv", "transitions2.csv"])
+def test_optimized_machine_matches_interpreter(name, codegen):
+    machine = build_machine(os.path.join(HERE, name))
+    check_optimized(machine, 5_000, False, codegen)
+    check_optimized(machine, 5_000, True, codegen)
+
+
+@pytest.mark.parametrize("codegen", [False, True])
+@pytest.mark.parametrize("seed", range(100))
+def test_optimized_machine_matches_interpreter_on_random_tables(seed, codegen):
+    rng = random.Random(seed)
+    machine = random_machine(rng)
+    check_optimized(machine, 2_000, rng.random() < 0.5, codegen)
@@ -0,0 +1,64 @@
+import mmap
+import os
+import random
+import pytest
+from cli import build_machine
+from codegen import verify_limits
+from paged_tape import PagedTape
+from test_codegen import HERE, SYMBOLS, copy_machine, expected_result, random_machine, reference_run, run_result
+
+PAGE = mmap.ALLOCATIONGRANULARITY  # La página más chica posible: la cinta cruza páginas enseguida
+
+
+def paged(machine, directory, max_pages=1):
+    """Copia de 'machine' con la cinta en una PagedTape de páginas chicas (con una sola mapeada por defecto)."""
+    copied = copy_machine(machine)
+    copied.set_tape(PagedTape(copied.tape, copied.compile(), directory, PAGE, max_pages))
+    return copied
+
+
+def check_paged(machine, directory, steps, stop_on_pause, accelerate):
+    """Corre la máquina sobre una PagedTape de tramo en tramo hasta cada límite de verify_limits."""
+    status, configurations = reference_run(machine, steps, stop_on_pause)
+    copied = paged(machine, directory)
+    try:
+        for limit in verify_limits(steps):
+            result = copied.run(max_steps=limit - copied.steps, stop_on_pause=stop_on_pause, accelerate=accelerate)
+            actual = run_result(result)
+            actual = actual[:1] + (copied.steps,) + actual[2:]
+            expected = expected_result(status, configurations, limit)
+            assert actual == expected, f"Hasta {limit} pasos"
+            if expected[0] != "max_steps":
+                break
+    finally:
+        copied.tape.close()
+
+
+@pytest.mark.parametrize("name", ["transitions1.csv", "transitions2.csv"])
+def test_paged_tape_matches_interpreter(name, tmp_path):
+    machine = build_machine(os.path.join(HERE, name))
+    check_paged(machine, tmp_path, 5_000, False, True)
+    check_paged(machine, tmp_path, 5_000, True, False)
+
+
+@pytest.mark.parametrize("accelerate", [False, True])
+@pytest.mark.parametrize("seed", range(100))
+def test_paged_tape_matches_interpreter_on_random_tables(seed, accelerate, tmp_path):
+    rng = random.Random(seed)
+    machine = random_machine(rng)
+    check_paged(machine, tmp_path, 2_000, rng.random() < 0.5, accelerate)
+
+
+@pytest.mark.parametrize("seed", range(20))
+def test_paged_tape_matches_tape_across_pages(seed, tmp_path):
+    # Cinta de varias páginas y pocas mapeadas: los corrimientos y las búsquedas cruzan páginas desalojadas
+    rng = random.Random(seed)
+    machine = random_machine(rng)
+    tape = [rng.choice(SYMBOLS) for _ in range(3 * PAGE + rng.randrange(PAGE))]
+    machine.set_tape(tape, rng.randrange(len(tape)))
+    copied = paged(machine, tmp_path, max_pages=2)
+    try:
+        expected = run_result(machine.run(max_steps=20_000, stop_on_pause=False))
+        assert run_result(copied.run(max_steps=20_000, stop_on_pause=False)) == expected
+    finally:
+        copied.tape.close()
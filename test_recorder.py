@@ -0,0 +1,53 @@
+import os
+import random
+import pytest
+from cli import build_machine
+from test_codegen import HERE, copy_machine, expected_result, random_machine, reference_run, run_result
+
+CHECKPOINT_INTERVAL = 16  # Fotos seguidas: se prueba la reconstrucción desde la foto y la re-ejecución
+
+
+def traced(machine, steps, stop_on_pause, accelerate, filepath=None):
+    """Copia de 'machine' con la traza activada y ya corrida hasta 'steps' pasos."""
+    copied = copy_machine(machine)
+    copied.start_trace(filepath, CHECKPOINT_INTERVAL)
+    copied.run(max_steps=steps, stop_on_pause=stop_on_pause, accelerate=accelerate)
+    return copied
+
+
+def check_trace(machine, steps, stop_on_pause, accelerate, rng, filepath=None):
+    """Cada paso de la traza reproduce la configuración de la referencia; travel_to y step_back también."""
+    status, configurations = reference_run(machine, steps, stop_on_pause)
+    copied = traced(machine, steps, stop_on_pause, accelerate, filepath)
+    tracer = copied.tracer
+    assert tracer.steps == len(configurations) - 1
+    for step, (state, tape, head, _) in enumerate(configurations):
+        traced_state, traced_tape, traced_head = tracer.configuration(step)
+        assert (tracer.machine.states[traced_state], traced_tape.to_string(), traced_head) == (state, tape, head), \
+            f"Paso {step}"
+
+    if len(configurations) > 1:
+        assert copied.step_back()
+        state, tape, head, _ = configurations[-2]
+        assert (copied.current_state, copied.tape.to_string(), copied.head_position, copied.steps) == (
+            state, tape, head, len(configurations) - 2)
+        # Volver a un paso anterior y seguir desde ahí termina igual que la referencia
+        step = rng.randrange(len(configurations) - 1)
+        copied.travel_to(step)
+        result = run_result(copied.run(max_steps=steps - step, stop_on_pause=stop_on_pause, accelerate=accelerate))
+        assert result[:1] + (copied.steps,) + result[2:] == expected_result(status, configurations, steps)
+    copied.stop_trace()
+
+
+@pytest.mark.parametrize("name", ["transitions1.csv", "transitions2.csv"])
+def test_trace_file_reproduces_every_step(name, tmp_path):
+    machine = build_machine(os.path.join(HERE, name))
+    check_trace(machine, 3_000, False, True, random.Random(0), tmp_path / "run.trace")
+
+
+@pytest.mark.parametrize("accelerate", [False, True])
+@pytest.mark.parametrize("seed", range(100))
+def test_trace_reproduces_every_step_on_random_tables(seed, accelerate):
+    rng = random.Random(seed)
+    machine = random_machine(rng)
+    check_trace(machine, 500, rng.random() < 0.5, accelerate, rng)
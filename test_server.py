@@ -0,0 +1,90 @@
+import asyncio
+import os
+import pytest
+from loader import load_csv_as_dict
+from server import JobClient, JobServer, machine_payload
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+
+def payload(name):
+    return machine_payload(*load_csv_as_dict(os.path.join(HERE, name)))
+
+
+def with_server(tmp_path, session, **limits):
+    """Corre session(client) contra un JobServer de dos procesos en un socket Unix de tmp_path."""
+    async def main():
+        server = JobServer(processes=2, **limits)
+        path = str(tmp_path / "server.sock")
+        await server.start(path)
+        client = await JobClient.connect(path)
+        try:
+            return await session(client)
+        finally:
+            await client.close()
+            await server.close()
+
+    return asyncio.run(main())
+
+
+async def collect(client, job_ids):
+    return [message async for message in client.results(job_ids)]
+
+
+def test_result_matches_the_cli_run(tmp_path):
+    async def session(client):
+        return await collect(client, await client.submit(payload("transitions1.csv")))
+
+    messages = with_server(tmp_path, session)
+    assert [message["type"] for message in messages] == ["result"]
+    assert messages[0]["status"] == "halt"
+    assert messages[0]["steps"] == 312
+    assert messages[0]["tape"] == "_ABABABABCACB_AAAAABBBBBCC"
+
+
+def test_progress_is_streamed_until_the_time_budget(tmp_path):
+    async def session(client):
+        job_ids = await client.submit(payload("transitions2.csv"), stop_on_pause=False, time_budget=1.0,
+                                      progress=0.1)
+        return await collect(client, job_ids)
+
+    messages = with_server(tmp_path, session)
+    progress, result = messages[:-1], messages[-1]
+    assert len(progress) >= 3
+    assert all(message["type"] == "progress" for message in progress)
+    steps = [message["steps"] for message in progress]
+    assert steps == sorted(steps) and steps[0] > 0
+    assert result["type"] == "result"
+    assert result["status"] == "time_budget"
+    assert result["steps"] >= steps[-1]
+
+
+def test_cancel_a_long_job(tmp_path):
+    async def session(client):
+        job_ids = await client.submit(payload("transitions2.csv"), stop_on_pause=False, progress=0.1)
+        messages = []
+        async for message in client.results(job_ids):
+            messages.append(message)
+            if message["type"] == "progress" and len(messages) == 1:
+                assert await client.cancel(job_ids[0]) == job_ids
+        return messages
+
+    messages = with_server(tmp_path, session)
+    assert messages[0]["type"] == "progress"
+    assert messages[-1]["type"] == "result"
+    assert messages[-1]["status"] == "cancelled"
+
+
+def test_jobs_over_the_quota_are_refused(tmp_path):
+    async def session(client):
+        machine = payload("transitions2.csv")
+        with pytest.raises(ValueError, match="cuota"):
+            await client.submit(machine, stop_on_pause=False, max_steps=5000)
+        with pytest.raises(ValueError, match="cuota"):
+            await client.submit(machine, stop_on_pause=False, time_budget=60)
+        # Sin cuota propia, el trabajo recibe la del servidor
+        return await collect(client, await client.submit(machine, stop_on_pause=False))
+
+    messages = with_server(tmp_path, session, max_steps=1000, time_budget=10)
+    assert messages[-1]["status"] == "max_steps"
+    assert messages[-1]["steps"] == 1000
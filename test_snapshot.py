@@ -0,0 +1,73 @@
+import os
+import random
+import pytest
+from cli import build_machine
+from paged_tape import PagedTape
+from test_codegen import HERE, copy_machine, expected_result, random_machine, reference_run, run_result
+
+STEPS = 2_000
+
+
+def resumed(machine, filepath, steps, stop_on_pause, tape_directory=None):
+    """Corre una copia 'steps' pasos, guarda la foto y sigue en otra copia cargada desde ella hasta STEPS.
+
+    Devuelve el motivo de la primera parte y el resultado final (con los pasos totales).
+    """
+    first = copy_machine(machine)
+    status = first.run(max_steps=steps, stop_on_pause=stop_on_pause).status
+    first.save_snapshot(filepath)
+    loaded = copy_machine(machine)
+    if tape_directory is not None:
+        loaded.set_tape(PagedTape(loaded.tape, loaded.compile(), tape_directory))
+    loaded.load_snapshot(filepath)
+    try:
+        result = run_result(loaded.run(max_steps=STEPS - loaded.steps, stop_on_pause=stop_on_pause))
+    finally:
+        if tape_directory is not None:
+            loaded.tape.close()
+    return status, result[:1] + (loaded.steps,) + result[2:]
+
+
+def uninterrupted(machine, steps, stop_on_pause):
+    """Lo mismo que resumed pero en una sola máquina, sin foto."""
+    copied = copy_machine(machine)
+    copied.run(max_steps=steps, stop_on_pause=stop_on_pause)
+    result = run_result(copied.run(max_steps=STEPS - copied.steps, stop_on_pause=stop_on_pause))
+    return result[:1] + (copied.steps,) + result[2:]
+
+
+@pytest.mark.parametrize("paged", [False, True])
+@pytest.mark.parametrize("seed", range(100))
+def test_restored_snapshot_resumes_to_the_same_result(seed, paged, tmp_path):
+    rng = random.Random(seed)
+    machine = random_machine(rng)
+    stop_on_pause = rng.random() < 0.5
+    steps = rng.randint(0, 200)
+    status, result = resumed(machine, tmp_path / "run.snapshot", steps, stop_on_pause, tmp_path if paged else None)
+    # La foto guarda la configuración, no el mensaje: tras un error la copia cargada no lo conoce
+    assert result[:5] == uninterrupted(machine, steps, stop_on_pause)[:5]
+    if status == "max_steps":
+        # La foto se tomó a mitad de camino: el final es el del intérprete de referencia
+        assert result == expected_result(*reference_run(machine, STEPS, stop_on_pause), STEPS)
+
+
+def test_snapshot_of_another_machine_is_refused(tmp_path):
+    machine = build_machine(os.path.join(HERE, "transitions1.csv"))
+    machine.save_snapshot(tmp_path / "run.snapshot")
+    other = build_machine(os.path.join(HERE, "transitions2.csv"))
+    with pytest.raises(ValueError, match="otra máquina"):
+        other.load_snapshot(tmp_path / "run.snapshot")
+
+
+@pytest.mark.parametrize("name", ["transitions1.csv", "transitions2.csv"])
+def test_run_with_snapshots_matches_run(name, tmp_path):
+    machine = build_machine(os.path.join(HERE, name))
+    expected = run_result(copy_machine(machine).run(max_steps=50_000, stop_on_pause=False))
+    # Con un intervalo mínimo la ejecución se parte en muchos tramos, con una foto en cada uno
+    result = run_result(machine.run_with_snapshots(tmp_path / "run.snapshot", 0.001, max_steps=50_000,
+                                                   stop_on_pause=False))
+    assert result == expected
+    restored = copy_machine(build_machine(os.path.join(HERE, name)))
+    restored.load_snapshot(tmp_path / "run.snapshot")
+    assert (restored.current_state, restored.tape.to_string(), restored.head_position, restored.steps) == (
+        expected[2], expected[3], expected[4], expected[1])
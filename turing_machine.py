@@ -1,37 +1,83 @@
-import csv
+import time
+from breakpoints import Breakpoints
+from compiler import BLANK, PAUSE_MESSAGE, compile_machine, expand_block
+from cycles import CycleDetector
+from profiler import Profiler
+from codegen import execute_generated
+from engine import execute
+from loader import load_blocks_table, load_transition_table
+from optimizer import optimize_machine
+from paged_tape import PagedTape
+from recorder import TraceRecorder
+from snapshot import load_snapshot, save_snapshot
+from tape import Tape
+
+# Con una PagedTape más larga que esto, RunResult.tape lleva sólo las celdas alrededor del cabezal
+RESULT_TAPE_LIMIT = 1 << 20
+SNAPSHOT_INTERVAL = 60.0  # Segundos entre fotos en run_with_snapshots
+
+
+class RunResult:
+    """Resultado de una ejecución sin interfaz gráfica."""
+
+    def __init__(self, status, state, tape, head_position, steps, elapsed, message="", cycle=None):
+        self.status = status  # halt, pause, breakpoint, no_transition, max_steps, time_budget, cycle o endless
+        self.state = state
+        self.tape = tape
+        self.head_position = head_position
+        self.steps = steps
+        self.elapsed = elapsed  # Segundos de reloj
+        self.message = message
+        self.cycle = cycle  # (paso, período) si se detectó una configuración repetida
+
+    @property
+    def steps_per_second(self):
+        return self.steps / self.elapsed if self.elapsed > 0 else float("inf")
+
+    def to_dict(self):
+        return {
+            "status": self.status,
+            "state": self.state,
+            "tape": self.tape,
+            "head_position": self.head_position,
+            "steps": self.steps,
+            "elapsed": self.elapsed,
+            "steps_per_second": self.steps_per_second,
+            "message": self.message,
+            "cycle": self.cycle,
+        }
+
 
 class TuringMachine:
     def __init__(self):
         self.initial_state = None  # Estado inicial
         self.current_state = None  # Estado actual
-        self.tape = []  # La cinta de la máquina
+        self.tape = Tape()  # La cinta de la máquina
         self.head_position = 0  # Posición inicial del cabezal
+        self.initial_tape = self.tape.copy()  # Copia de la cinta inicial (para reset)
+        self.initial_head_position = 0
+        self.steps = 0  # Pasos ejecutados desde el estado inicial (se guardan en las fotos)
         self.transitions = {}  # Transiciones
         self.blocks = {}  # Bloques de construcción
+        self.breakpoints = Breakpoints()  # Puntos de parada que respeta run (los estados 'pause' son uno más)
+        self.compiled = None  # Tabla compilada (ver compile)
+        self.optimized = None  # (clave, OptimizedMachine) de la última optimización (ver optimized_machine)
+        self.cycle_detector = None  # CycleDetector de la ejecución en curso (ver run)
+        self.profiler = None  # Profiler acumulado entre ejecuciones (ver run)
+        self.trace_options = None  # (archivo o None, pasos entre fotos) si la traza está activada
+        self.tracer = None  # TraceRecorder de la ejecución en curso (ver start_trace)
         self.tape_update_callback = None  # Callback para actualizar la cinta
         self.error = False
         self.errorMensage = ""
 
     def load_transition_table(self, filename):
-        transition_table = {}
-        with open(filename, mode='r') as file:
-            csv_reader = csv.reader(file)
-            for row in csv_reader:
-                current_state, read_symbol, construction_block, next_state = row
-                transition_table[(current_state, read_symbol)] = (construction_block, next_state)
-        return transition_table
+        return load_transition_table(filename)
 
     def load_blocks_table(self, filename):
-        blocks_table = {}
-        with open(filename, mode='r') as file:
-            csv_reader = csv.reader(file)
-            for row in csv_reader:
-                block, action = row
-                blocks_table[block] = action
-        return blocks_table
+        return load_blocks_table(filename)
     
     def display_tape(self):
-        tape_str = ''.join(self.tape)
+        tape_str = self.tape.to_string()
         head_str = ' ' * self.head_position + '^'
         print("Tape:", tape_str)
         print("Head:", head_str)
@@ -39,11 +85,11 @@ class TuringMachine:
     def ensure_infinite_tape(self):
         # Expande la cinta hacia la izquierda si el cabezal está más allá del inicio
         if self.head_position < 0:
-            self.tape.insert(0, self.blank_symbol)
+            self.tape.insert(0, BLANK)
             self.head_position = 0
         # Expande la cinta hacia la derecha si el cabezal está más allá del final
         elif self.head_position >= len(self.tape):
-            self.tape.append(self.blank_symbol)
+            self.tape.append(BLANK)
     
     def execute_block(self, block):
         """Ejecuta un bloque de construcción."""
@@ -52,6 +98,22 @@ class TuringMachine:
         if block not in self.blocks and not block.startswith(("L", "R", "X", "R_", "L_", "S_l", "S_r")):
             self.errorMensage = f"Error: El bloque '{block}' no está definido en la tabla de bloques."
             self.current_state = "halt"
+            self.error = True
+            return
+
+        # Bloque compuesto de la tabla de bloques: se ejecutan sus partes en orden, como un solo paso
+        try:
+            parts = expand_block(block, self.blocks)
+        except ValueError as e:
+            self.errorMensage = str(e)
+            self.current_state = "halt"
+            self.error = True
+            return
+        if parts != [block]:
+            for part in parts:
+                self.execute_block(part)
+                if self.error:
+                    return
             return
         
         if block == "L":  # Mover a la izquierda
@@ -77,25 +139,23 @@ class TuringMachine:
                 self.current_state = "halt"
                 self.error = True
                 return
-            found = False  # Bandera para verificar si el símbolo fue encontrado
-            while not found:
-                # Validar si el símbolo objetivo está presente desde la posición actual
-                if target != "_" and target not in self.tape[self.head_position:]:
+            # Una sola búsqueda hacia la derecha sobre el buffer de la cinta: O(distancia)
+            found = self.tape.find(target, self.head_position + 1)
+            if found < 0:
+                if target == "_":  # Caso especial: el primer vacío está justo después del final
+                    found = len(self.tape)
+                    self.tape.append("_")
+                else:
+                    if self.tape[self.head_position] == target:
+                        # El símbolo sólo estaba bajo el cabezal: avanza una celda antes de fallar
+                        self.head_position += 1
+                        if self.head_position >= len(self.tape):
+                            self.tape.append("_")
                     self.errorMensage = f"Error: El símbolo '{target}' no se encontró en la cinta hacia la derecha."
                     self.current_state = "halt"
                     self.error = True
                     return
-                self.head_position += 1
-                # Expandir la cinta si el cabezal está fuera de los límites
-                if self.head_position >= len(self.tape):
-                    if target == "_":  # Caso especial: buscar un espacio vacío
-                        self.tape.append("_")
-                        found = True
-                    else:
-                        self.tape.append("_")
-                # Detenerse si encuentra el símbolo objetivo
-                if self.tape[self.head_position] == target:
-                    found = True
+            self.head_position = found
         elif block.startswith("L_"):  # Desplazar a la izquierda hasta encontrar X
             target = block[2:]
             if len(target) != 1:
@@ -103,44 +163,33 @@ class TuringMachine:
                 self.current_state = "halt"
                 self.error = True
                 return
-            found = False  # Bandera para verificar si el símbolo fue encontrado
-            while not found:
-                # Validar si el símbolo objetivo está presente desde la posición actual
-                if target != "_" and target not in self.tape[:self.head_position + 1]:
+            # Una sola búsqueda hacia la izquierda sobre el buffer de la cinta: O(distancia)
+            found = self.tape.rfind(target, 0, self.head_position)
+            if found < 0:
+                if target == "_":  # Caso especial: el primer vacío está justo antes del inicio
+                    found = 0
+                    self.tape.insert(0, "_")
+                else:
+                    if self.tape[self.head_position] == target:
+                        # El símbolo sólo estaba bajo el cabezal: retrocede una celda antes de fallar
+                        self.head_position -= 1
+                        if self.head_position < 0:
+                            self.tape.insert(0, "_")
+                            self.head_position = 0
                     self.errorMensage = f"Error: El símbolo '{target}' no se encontró en la cinta hacia la izquierda."
-                    self.current_state = "halt"
                     self.error = True
+                    self.current_state = "halt"
                     return
-                self.head_position -= 1
-                # Expandir la cinta si el cabezal está fuera de los límites
-                if self.head_position < 0:
-                    if target == "_":  # Caso especial: buscar un espacio vacío
-                        self.tape.insert(0, "_")
-                        self.head_position = 0
-                        found = True
-                    else:
-                        self.tape.insert(0, "_")
-                        self.head_position = 0
-                # Detenerse si encuentra el símbolo objetivo
-                if self.tape[self.head_position] == target:
-                    found = True
-            if not found:
-                self.errorMensage = f"Error: El símbolo '{target}' no se encontró en la cinta hacia la izquierda."
-                self.error = True
-                self.current_state = "halt"
+            self.head_position = found
 
         elif block == "S_l":  # Desplazar a la izquierda los elementos a la derecha del puntero
-            for i in range(self.head_position, len(self.tape) - 1):
-                self.tape[i] = self.tape[i + 1]
-            self.tape.pop()  # Eliminar el último elemento
+            self.tape.pop(self.head_position)  # Movimiento en bloque del lado más corto
 
             # Si el cabezal está fuera de los límites, agregar un espacio vacío
             if self.head_position >= len(self.tape):
                 self.tape.append("_")
         elif block == "S_r":  # Desplazar a la derecha los elementos a la izquierda del puntero
-            for i in range(self.head_position, 0, -1):
-                self.tape[i] = self.tape[i - 1]
-            self.tape.pop(0)  # Eliminar el primer elemento
+            self.tape.pop(self.head_position)  # Movimiento en bloque del lado más corto
             self.head_position -= 1  # Ajustar el puntero
 
             # Si el cabezal está fuera de los límites, agregar un espacio vacío
@@ -151,23 +200,19 @@ class TuringMachine:
     def shift_left(self):
         """Desplaza a la izquierda la cadena desde la posición actual hasta el primer espacio."""
         start = self.head_position
-        end = start
-        while end < len(self.tape) and self.tape[end] != "_":
-            end += 1
+        end = self.tape.find("_", start)
+        if end < 0:
+            end = len(self.tape)
         if end > start:
-            for i in range(start, end - 1):
-                self.tape[i] = self.tape[i + 1]
+            self.tape.move(start + 1, end, start)
             self.tape[end - 1] = "_"
 
     def shift_right(self):
         """Desplaza a la derecha la cadena desde la posición actual hasta el primer espacio."""
-        start = self.head_position
-        end = start
-        while start >= 0 and self.tape[start] != "_":
-            start -= 1
+        end = self.head_position
+        start = self.tape.rfind("_", 0, end + 1)
         if start < end - 1:
-            for i in range(end - 1, start, -1):
-                self.tape[i] = self.tape[i - 1]
+            self.tape.move(start + 1, end - 1, start + 2)
             self.tape[start + 1] = "_"
         
     def get_next_block(self):
@@ -181,28 +226,257 @@ class TuringMachine:
             print("next_state: " + next_state)
             if next_state.startswith("pause"):
                 print(f"Estado especial detectado: {next_state}. Deteniendo la automatización.")
-                self.errorMensage = "La automatización se pausó por un estado nombrado 'pause'."
+                self.errorMensage = PAUSE_MESSAGE
             else:
                 self.errorMensage = ""  # Limpiar mensaje de error si no es un estado "pause"
             self.current_state = next_state  # Actualiza el estado
             return block
         else:
             return None  # No hay transición definida
-        
+
+    def step(self):
+        """Ejecuta un paso sin imprimir nada. Devuelve False si no hay transición definida."""
+        transition = self.transitions.get((self.current_state, self.tape[self.head_position]))
+        if transition is None:
+            return False
+        block, next_state = transition
+        self.errorMensage = PAUSE_MESSAGE if next_state.startswith("pause") else ""
+        self.current_state = next_state
+        self.steps += 1
+        self.cycle_detector = None  # Este paso no pasa por el motor: el hash de la cinta queda viejo
+        self.drop_trace()
+        self.execute_block(block)
+        return True
+
+    def compile(self):
+        """Devuelve la tabla compilada de la máquina (se recompila sólo si cambiaron las transiciones)."""
+        if self.compiled is None:
+            self.compiled = compile_machine(self.transitions, self.blocks)
+        return self.compiled
+
+    def compile_tape(self):
+        """Compila la máquina y deja la cinta codificada con sus ids; devuelve la CompiledMachine."""
+        machine = self.compile()
+        if self.tape.alphabet is not machine:
+            # Recodificar la cinta con los ids de la tabla compilada (sólo tras cambiar transiciones)
+            self.tape = self.tape.recode(machine)
+        return machine
+
+    def run(self, max_steps=None, time_budget=None, stop_on_pause=True, accelerate=True, detect_cycles=False,
+            profile=False, codegen=False, optimize=False):
+        """Ejecuta la máquina hasta 'halt' (o hasta agotar pasos/tiempo) sin interfaz; devuelve un RunResult."""
+        machine = self.compile_tape()
+        state = machine.state_id(self.current_state)
+        if not detect_cycles:
+            self.cycle_detector = None  # Esta ejecución mueve la cinta sin avisarle: el detector quedaría viejo
+        elif self.cycle_detector is None:
+            # Corta con motivo "cycle" si una configuración se repite; sirve entre llamadas mientras la cinta no cambie
+            self.cycle_detector = CycleDetector()
+        detector = self.cycle_detector if detect_cycles else None
+        # Los contadores se acumulan entre llamadas hasta que cambien las transiciones; sin profile no cuestan nada
+        if profile and (self.profiler is None or self.profiler.machine is not machine):
+            self.profiler = Profiler(machine)
+        profiler = self.profiler if profile else None
+        # Con start_trace cada paso queda registrado para step_back / travel_to
+        if self.trace_options is not None and (self.tracer is None or self.tracer.machine is not machine):
+            filepath, checkpoint_interval = self.trace_options
+            file = open(filepath, mode="w+b") if filepath is not None else None
+            self.tracer = TraceRecorder(machine, checkpoint_interval, file)
+        breakpoints = self.breakpoints if self.breakpoints.active else None  # Cortan con motivo "breakpoint"
+        # El punto de parada por cantidad de pasos es sólo un límite más (si ya se pasó, no cuenta)
+        step_break = self.breakpoints.step is not None and self.breakpoints.step > self.steps and (
+            max_steps is None or self.breakpoints.step - self.steps <= max_steps)
+        if step_break:
+            max_steps = self.breakpoints.step - self.steps
+        start = time.perf_counter()
+        deadline = start + time_budget if time_budget is not None else None
+        # optimize y codegen no tienen ganchos: sólo se usan sin detector, perfil, traza ni puntos de parada
+        plain = detector is None and profiler is None and self.tracer is None and breakpoints is None
+        runner = machine
+        if optimize and plain:
+            # Tabla de optimizer.optimize_machine: una detención en un estado juntado informa su representante.
+            # El código generado no sabe ejecutar cadenas: con codegen sólo se quitan y juntan estados
+            optimized = self.optimized_machine(fuse=not codegen)
+            if optimized is not None and self.current_state in optimized.state_ids:
+                runner = optimized.machine
+                state = optimized.state_ids[self.current_state]
+        if codegen and plain:
+            status, state, head, steps, message = execute_generated(runner, self.tape, self.head_position, state,
+                                                                    max_steps, deadline, stop_on_pause)
+        else:
+            # Con accelerate las rachas L/R sobre un mismo estado se saltan de una vez (ver
+            # CompiledMachine.macro_table); una racha que no termina nunca se corta con motivo "endless"
+            status, state, head, steps, message = execute(runner, self.tape, self.head_position, state,
+                                                          max_steps, deadline, stop_on_pause, accelerate, detector,
+                                                          profiler, self.tracer, breakpoints)
+        if status == "max_steps" and step_break:
+            status = "breakpoint"
+            message = f"Punto de parada: se llegó al paso {self.breakpoints.step}."
+        elapsed = time.perf_counter() - start
+
+        self.head_position = head
+        self.current_state = runner.states[state]
+        self.steps += steps
+        if message is not None:
+            self.errorMensage = message
+            self.error = message.startswith("Error")
+        cycle = detector.found if status == "cycle" else None
+        return RunResult(status, self.current_state, self.result_tape(), self.head_position,
+                         steps, elapsed, self.errorMensage, cycle)
+
+    def optimized_machine(self, fuse=True):
+        """OptimizedMachine para el estado inicial (se rehace sólo si cambió la tabla); None sin estado inicial."""
+        if self.initial_state is None:
+            return None
+        machine = self.compile_tape()
+        key = (machine, machine.n_states, machine.n_symbols, self.initial_state, fuse)
+        if self.optimized is None or self.optimized[0] != key:
+            self.optimized = (key, optimize_machine(machine, self.initial_state, fuse))
+        return self.optimized[1]
+
+    def run_with_snapshots(self, filepath, interval=SNAPSHOT_INTERVAL, max_steps=None, time_budget=None, **options):
+        """Como run, pero guarda una foto en 'filepath' cada 'interval' segundos y al terminar.
+
+        La ejecución se parte en tramos de 'interval' segundos (el resultado es el mismo que
+        sin partirla); cada foto reemplaza a la anterior de forma atómica, así que una corrida
+        interrumpida se puede retomar con load_snapshot. Los pasos y el tiempo del RunResult
+        son los de toda la llamada.
+        """
+        start = time.perf_counter()
+        steps = 0
+        while True:
+            budget = interval
+            if time_budget is not None:
+                budget = min(budget, max(start + time_budget - time.perf_counter(), 0))
+            result = self.run(max_steps - steps if max_steps is not None else None, budget, **options)
+            steps += result.steps
+            self.save_snapshot(filepath)
+            if result.status != "time_budget" or (time_budget is not None and
+                                                  time.perf_counter() - start >= time_budget):
+                break
+        result.steps = steps
+        result.elapsed = time.perf_counter() - start
+        return result
+
+    def save_snapshot(self, filepath):
+        """Guarda la configuración actual (estado, cinta, cabezal y pasos) en una foto binaria."""
+        machine = self.compile_tape()
+        save_snapshot(filepath, machine, self.current_state, self.tape, self.head_position, self.steps)
+
+    def load_snapshot(self, filepath):
+        """Salta a la configuración guardada en una foto de esta misma máquina (ValueError si no lo es).
+
+        Si la cinta actual es una PagedTape, la de la foto se carga en otra con las mismas opciones.
+        """
+        machine = self.compile()
+        options = self.tape.options if isinstance(self.tape, PagedTape) else None
+        state, tape, head, steps = load_snapshot(filepath, machine, options)
+        self.tape = tape
+        self.head_position = head
+        self.current_state = state
+        self.steps = steps
+        self.errorMensage = PAUSE_MESSAGE if machine.pause[machine.state_id(state)] else ""
+        self.error = False
+        self.cycle_detector = None
+        self.drop_trace()
+
+    def result_tape(self):
+        """Texto de la cinta para RunResult (recortado alrededor del cabezal si es una PagedTape enorme)."""
+        if not isinstance(self.tape, PagedTape) or len(self.tape) <= RESULT_TAPE_LIMIT:
+            return self.tape.to_string()
+        begin = max(self.head_position - RESULT_TAPE_LIMIT // 2, 0)
+        stop = begin + RESULT_TAPE_LIMIT
+        prefix = "..." if begin > 0 else ""
+        suffix = "..." if stop < len(self.tape) else ""
+        return prefix + self.tape.to_string(begin, stop) + suffix
+
+    def start_trace(self, filepath=None, checkpoint_interval=1024):
+        """Activa la traza: desde la próxima ejecución se registra cada paso (en 'filepath' si se da)."""
+        self.drop_trace()
+        self.trace_options = (filepath, checkpoint_interval)
+
+    def stop_trace(self):
+        self.drop_trace()
+        self.trace_options = None
+
+    def drop_trace(self):
+        """Descarta la traza actual (la cinta o la máquina cambiaron por fuera del motor)."""
+        if self.tracer is not None:
+            self.tracer.close()
+            self.tracer = None
+
+    def travel_to(self, step):
+        """Vuelve la máquina al paso 'step' de la traza; lo posterior se descarta y se vuelve a grabar al seguir."""
+        if self.tracer is None:
+            raise ValueError("No hay una traza registrada (ver start_trace).")
+        state, tape, head = self.tracer.configuration(step)
+        self.steps -= self.tracer.steps - step
+        self.tracer.truncate(step)
+        self.tape = tape
+        self.head_position = head
+        self.current_state = self.tracer.machine.states[state]
+        self.errorMensage = PAUSE_MESSAGE if self.tracer.machine.pause[state] else ""
+        self.error = False
+        self.cycle_detector = None
+
+    def step_back(self):
+        """Deshace el último paso registrado. Devuelve False si ya está en el paso 0."""
+        if self.tracer is None or self.tracer.steps == 0:
+            return False
+        self.travel_to(self.tracer.steps - 1)
+        return True
+
+    def watch_cell(self, index):
+        """Punto de parada en las escrituras a la celda 'index' de la cinta actual (sigue a la celda si la cinta crece)."""
+        self.compile_tape()  # Las coordenadas absolutas cambian si la cinta se recodifica
+        self.breakpoints.watch_cell(index + self.tape.start - self.tape.origin)
+
+    def travel_to_last_write(self, index):
+        """Vuelve al paso que escribió por última vez la celda 'index' de la cinta actual.
+
+        Devuelve el paso o None si la celda no se escribió desde que empezó la traza.
+        """
+        if self.tracer is None:
+            return None
+        step = self.tracer.last_write(index + self.tape.start - self.tape.origin)
+        if step is not None:
+            self.travel_to(step)
+        return step
+
     def set_initial_state(self, state):
         self.initial_state = state
         self.current_state = state 
+        self.steps = 0
+        self.cycle_detector = None
+        self.drop_trace()
 
-    def set_tape(self, tape):
-        self.tape = tape
+    def set_tape(self, tape, head_position=None):
+        """Cambia la cinta (y el cabezal, si se da); reset vuelve a esta configuración."""
+        self.tape = tape if isinstance(tape, Tape) else Tape(tape)
+        if head_position is not None:
+            self.head_position = head_position
+        self.initial_tape = self.tape.copy()
+        self.initial_head_position = self.head_position
+        self.cycle_detector = None
+        self.drop_trace()
 
     def set_transitions(self, transitions):
         self.transitions = transitions
+        self.compiled = None
+        self.cycle_detector = None
+        self.profiler = None
+        self.drop_trace()
 
     def reset(self):
         self.current_state = self.initial_state
-        self.head_position = 0
+        self.tape = self.initial_tape.copy()
+        self.head_position = self.initial_head_position
+        self.steps = 0
+        self.error = False
+        self.errorMensage = ""
         self.halted = False
+        self.cycle_detector = None
+        self.drop_trace()
 
     def set_tape_update_callback(self, callback):
         self.tape_update_callback = callback
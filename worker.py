@@ -0,0 +1,96 @@
+import threading
+import time
+from paged_tape import PagedTape
+
+FRAMES_PER_SECOND = 30  # Frecuencia con la que el motor publica fotos y la interfaz las dibuja
+WINDOW_RADIUS = 256  # Celdas a cada lado del cabezal que viajan en cada foto
+
+
+def tape_memory(tape):
+    """Bytes que ocupa la cinta en memoria (de una PagedTape, sólo las páginas mapeadas)."""
+    if isinstance(tape, PagedTape):
+        return tape.buf.resident_pages * tape.buf.page_size
+    return len(tape.buf)
+
+
+class Snapshot:
+    """Foto liviana del motor para la interfaz: estado, pasos y una ventana de la cinta.
+
+    Se comporta como una cinta de sólo lectura para draw_tape_window: su largo es el de la
+    cinta completa y las celdas fuera de la ventana se devuelven vacías ("").
+    """
+
+    def __init__(self, machine, steps, status=None, message="", engine_time=0.0):
+        tape = machine.tape
+        self.state = machine.current_state
+        self.head_position = machine.head_position
+        self.steps = steps  # Pasos ejecutados por el worker desde que arrancó
+        self.status = status  # None mientras sigue corriendo; si no, el motivo de detención
+        self.message = message
+        self.engine_time = engine_time  # Segundos que el worker pasó dentro de TuringMachine.run
+        self.tape_length = len(tape)
+        self.tape_memory = tape_memory(tape)
+        self.window_start = max(0, self.head_position - WINDOW_RADIUS)
+        self.window = tape.to_string(self.window_start, self.head_position + WINDOW_RADIUS + 1)
+
+    def __len__(self):
+        return self.tape_length
+
+    def __getitem__(self, index):
+        begin, stop, _ = index.indices(self.tape_length)
+        window_end = self.window_start + len(self.window)
+        return [self.window[i - self.window_start] if self.window_start <= i < window_end else ""
+                for i in range(begin, stop)]
+
+
+class SimulationWorker(threading.Thread):
+    """Ejecuta la máquina en segundo plano y publica una Snapshot por frame.
+
+    steps_per_frame puede ser fraccionario (menos de un paso por frame) o None para correr
+    todo lo que entre en cada frame. El hilo termina al llegar a 'halt', a un estado 'pause',
+    a una transición indefinida o cuando se llama a stop(). Con profile (se puede cambiar
+    mientras corre) los contadores del motor se acumulan en machine.profiler.
+    """
+
+    def __init__(self, machine, steps_per_frame=None, profile=False):
+        super().__init__(daemon=True)
+        self.machine = machine
+        self.steps_per_frame = steps_per_frame
+        self.profile = profile
+        self.snapshot = Snapshot(machine, 0)  # La interfaz sólo lee esta referencia
+        self._stop_event = threading.Event()
+
+    def stop(self):
+        """Pide que el hilo se detenga al terminar el frame en curso y espera a que lo haga."""
+        self._stop_event.set()
+        if self.is_alive() and threading.current_thread() is not self:
+            self.join()
+
+    def run(self):
+        frame = 1 / FRAMES_PER_SECOND
+        next_frame = time.perf_counter() + frame
+        credit = 0.0  # Pasos fraccionarios acumulados cuando steps_per_frame < 1
+        steps = 0
+        engine_time = 0.0
+        while not self._stop_event.is_set():
+            if self.steps_per_frame is None:
+                result = self.machine.run(time_budget=max(next_frame - time.perf_counter(), 0.001),
+                                          profile=self.profile)
+            else:
+                credit += self.steps_per_frame
+                budget = int(credit)
+                credit -= budget
+                result = self.machine.run(max_steps=budget, profile=self.profile) if budget else None
+            if result is not None:
+                steps += result.steps
+                engine_time += result.elapsed
+                if result.status not in ("max_steps", "time_budget"):
+                    self.snapshot = Snapshot(self.machine, steps, result.status, result.message, engine_time)
+                    return
+                self.snapshot = Snapshot(self.machine, steps, engine_time=engine_time)
+            # Esperar al próximo frame (sin límite de pasos, el frame ya se usó corriendo)
+            delay = next_frame - time.perf_counter()
+            if delay > 0:
+                self._stop_event.wait(delay)
+            next_frame = max(next_frame + frame, time.perf_counter())
+        self.snapshot = Snapshot(self.machine, steps, "stopped", engine_time=engine_time)